@@ -0,0 +1,96 @@
+"""Compare MemoryStateStore with its previous, unindexed implementation.
+
+Run from the repository root:
+
+    PYTHONPATH=. python benchmarks/bench_memory_state_store.py
+"""
+import time
+from collections.abc import Callable
+
+from livecomponents.manager.stores import MemoryStateStore
+from livecomponents.types import StateAddress
+
+SESSIONS = 10_000
+COMPONENTS_PER_SESSION = 10
+LOOKUPS = 1_000
+
+
+class UnindexedMemoryStateStore:
+    """MemoryStateStore before the per-session index (livecomponents 1.19.0)."""
+
+    def __init__(self):
+        self._store: dict[StateAddress, bytes] = {}
+        self._context: dict[StateAddress, bytes] = {}
+        self._components: dict[StateAddress, bytes] = {}
+
+    def session_exists(self, session_id: str) -> bool:
+        return any(
+            state_addr.session_id == session_id for state_addr in self._store.keys()
+        )
+
+    def save_state(self, state_addr: StateAddress, raw_state: bytes) -> None:
+        self._store[state_addr] = raw_state
+
+    def restore_state(self, state_addr: StateAddress) -> bytes | None:
+        return self._store.get(state_addr)
+
+    def save_component_template(
+        self, state_addr: StateAddress, html_bytes: bytes
+    ) -> None:
+        self._components[state_addr] = html_bytes
+
+    def clear_session(self, session_id: str) -> None:
+        for state_addr in list(self._store.keys()):
+            if state_addr.session_id == session_id:
+                del self._store[state_addr]
+        for state_addr in list(self._context.keys()):
+            if state_addr.session_id == session_id:
+                del self._context[state_addr]
+        for state_addr in list(self._components.keys()):
+            if state_addr.session_id == session_id:
+                del self._components[state_addr]
+
+
+def measure(name: str, func: Callable[[], None], count: int) -> None:
+    started_at = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started_at
+    print(f"  {name:<20} {elapsed * 1e6 / count:10.2f} us/op")
+
+
+def run(store) -> None:
+    addresses = [
+        StateAddress(session_id=f"session-{s}", component_id=f"|root:0|c:{c}")
+        for s in range(SESSIONS)
+        for c in range(COMPONENTS_PER_SESSION)
+    ]
+    lookup_sessions = [f"session-{s}" for s in range(0, SESSIONS, SESSIONS // LOOKUPS)]
+
+    def save():
+        for state_addr in addresses:
+            store.save_state(state_addr, b"x" * 100)
+            store.save_component_template(state_addr, b"<div></div>")
+
+    def restore():
+        for state_addr in addresses:
+            store.restore_state(state_addr)
+
+    def session_exists():
+        for session_id in lookup_sessions:
+            store.session_exists(session_id)
+
+    def clear_session():
+        for session_id in lookup_sessions:
+            store.clear_session(session_id)
+
+    measure("save", save, len(addresses))
+    measure("restore", restore, len(addresses))
+    measure("session_exists", session_exists, len(lookup_sessions))
+    measure("clear_session", clear_session, len(lookup_sessions))
+
+
+if __name__ == "__main__":
+    print(f"{SESSIONS * COMPONENTS_PER_SESSION} components in {SESSIONS} sessions")
+    for store in [UnindexedMemoryStateStore(), MemoryStateStore()]:
+        print(type(store).__name__)
+        run(store)
@@ -0,0 +1,174 @@
+"""Measure a full-page render and a command call with the example project.
+
+Compares the dataclass-based contexts with their previous, Pydantic-based
+implementation (livecomponents 1.19.0). Run from the repository root:
+
+    PYTHONPATH=.:example python benchmarks/bench_page_render.py
+"""
+import logging
+import os
+import time
+from collections.abc import Callable
+from contextlib import contextmanager
+from typing import Any, Generic
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.template import Context, Template  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from pydantic import ConfigDict, Field  # noqa: E402
+
+from livecomponents import component as component_module  # noqa: E402
+from livecomponents.manager import get_state_manager  # noqa: E402
+from livecomponents.manager import manager as manager_module  # noqa: E402
+from livecomponents.manager.execution_results import ExecutionResults  # noqa: E402
+from livecomponents.types import State, StateAddress  # noqa: E402
+from livecomponents.utils import LiveComponentsModel  # noqa: E402
+
+COMPONENTS = 200
+RENDERS = 20
+COMMANDS = 2000
+
+PAGE = Template(
+    "{% load livecomponents %}"
+    "{% for i in items %}"
+    '{% livecomponent "simplecounter" own_id=i %}'
+    "{% endfor %}"
+)
+
+
+class PydanticExecutionResults(LiveComponentsModel):
+    dirty_components: set[StateAddress] = Field(default_factory=set)
+    response_headers: dict[str, str] = Field(default_factory=dict)
+
+    model_config = ConfigDict(frozen=True)
+
+    process_returned_value = ExecutionResults.process_returned_value
+
+
+class PydanticCallContext(LiveComponentsModel, Generic[State]):
+    request: Any
+    state: State
+    state_address: StateAddress
+    state_manager: Any
+    execution_results: PydanticExecutionResults = Field(
+        default_factory=PydanticExecutionResults
+    )
+
+
+class PydanticInitStateContext(LiveComponentsModel):
+    request: Any
+    state_addr: StateAddress
+    state_manager: Any
+    component_kwargs: dict[str, Any]
+    outer_context: Context = Field(default_factory=Context)
+
+
+class PydanticUpdateStateContext(LiveComponentsModel, Generic[State]):
+    request: Any
+    state_addr: StateAddress
+    state_manager: Any
+    component_kwargs: dict[str, Any]
+    outer_context: Context = Field(default_factory=Context)
+    state: State
+
+
+class PydanticExtraContextRequest(LiveComponentsModel, Generic[State]):
+    request: Any
+    state: State
+    state_manager: Any
+    state_addr: StateAddress
+    component_kwargs: dict[str, Any]
+
+
+@contextmanager
+def pydantic_contexts():
+    replaced = [
+        (manager_module, "CallContext", PydanticCallContext),
+        (manager_module, "InitStateContext", PydanticInitStateContext),
+        (manager_module, "UpdateStateContext", PydanticUpdateStateContext),
+        (component_module, "ExtraContextRequest", PydanticExtraContextRequest),
+    ]
+    originals = [(module, name, getattr(module, name)) for module, name, _ in replaced]
+    for module, name, value in replaced:
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for module, name, value in originals:
+            setattr(module, name, value)
+
+
+def measure(name: str, func: Callable[[], None], count: int, verbose: bool) -> None:
+    started_at = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started_at
+    if not verbose:
+        return
+    print(f"  {name:<32} {elapsed * 1e3 / count:10.3f} ms/op")
+
+
+def run(verbose: bool = True) -> None:
+    state_manager = get_state_manager()
+    request = RequestFactory().get("/")
+    context = {"request": request, "items": range(COMPONENTS)}
+
+    def render(session_id: str) -> None:
+        PAGE.render(Context({**context, "LIVECOMPONENTS_SESSION_ID": session_id}))
+
+    def first_render():
+        for i in range(RENDERS):
+            render(f"first-{i}")
+
+    def re_render():
+        for _ in range(RENDERS):
+            render("first-0")
+
+    state_addr = StateAddress(session_id="first-0", component_id="|simplecounter:0")
+
+    def call_command():
+        for _ in range(COMMANDS):
+            state_manager.call_component_command(request, state_addr, "increment")
+
+    def build_contexts():
+        state = state_manager.get_component_state(state_addr)
+        for _ in range(COMMANDS):
+            manager_module.UpdateStateContext(
+                request=request,
+                state=state,
+                state_addr=state_addr,
+                state_manager=state_manager,
+                component_kwargs={},
+            )
+            component_module.ExtraContextRequest(
+                request=request,
+                state=state,
+                state_manager=state_manager,
+                state_addr=state_addr,
+                component_kwargs={},
+            )
+
+    measure(f"first render, {COMPONENTS} components", first_render, RENDERS, verbose)
+    measure(f"re-render, {COMPONENTS} components", re_render, RENDERS, verbose)
+    measure("call_component_command", call_command, COMMANDS, verbose)
+    measure("build render contexts", build_contexts, COMMANDS, verbose)
+    state_manager.store.clear_all_sessions()
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    settings.LIVECOMPONENTS = {
+        **settings.LIVECOMPONENTS,
+        "state_store": {"cls": "livecomponents.manager.stores.MemoryStateStore"},
+    }
+    # Warm up the template and component caches.
+    run(verbose=False)
+    print("Pydantic contexts")
+    with pydantic_contexts():
+        run()
+    print("Dataclass contexts")
+    run()
@@ -0,0 +1,72 @@
+"""Compare SharedMemoryStateStore with RedisStateStore on the loopback interface.
+
+Run from the repository root with a local Redis server:
+
+    REDIS_URL=redis://localhost:6379/0 PYTHONPATH=. \\
+        python benchmarks/bench_shared_memory_state_store.py
+
+Every measurement stops after MAX_SECONDS_PER_MEASUREMENT (override with the
+BENCH_SECONDS environment variable), so the whole run takes well under a minute
+even when Redis round trips are slow.
+"""
+import os
+import tempfile
+import time
+from collections.abc import Callable
+from typing import Any
+
+from livecomponents.manager.stores import (
+    IStateStore,
+    RedisStateStore,
+    SharedMemoryStateStore,
+)
+from livecomponents.types import StateAddress
+
+SESSIONS = 100
+COMPONENTS_PER_SESSION = 20
+STATE = b"x" * 2000
+TEMPLATE = b"{% livecomponent 'row' own_id=bean.id %}" * 10
+MAX_SECONDS_PER_MEASUREMENT = float(os.environ.get("BENCH_SECONDS", "2"))
+
+
+def measure(name: str, func: Callable[[StateAddress], Any]) -> None:
+    addresses = [
+        StateAddress(session_id=f"session-{s}", component_id=f"|root:0|c:{c}")
+        for s in range(SESSIONS)
+        for c in range(COMPONENTS_PER_SESSION)
+    ]
+    started_at = time.perf_counter()
+    deadline = started_at + MAX_SECONDS_PER_MEASUREMENT
+    calls = 0
+    for state_addr in addresses:
+        func(state_addr)
+        calls += 1
+        if time.perf_counter() > deadline:
+            break
+    elapsed = time.perf_counter() - started_at
+    print(f"  {name:<28} {elapsed * 1e6 / calls:10.2f} us/op ({calls} calls)")
+
+
+def run(store: IStateStore) -> None:
+    measure("save_state", lambda addr: store.save_state(addr, STATE))
+    measure("restore_state", store.restore_state)
+    measure(
+        "save_component_template",
+        lambda addr: store.save_component_template(addr, TEMPLATE),
+    )
+    measure("restore_component_template", store.restore_component_template)
+    measure("session_exists", lambda addr: store.session_exists(addr.session_id))
+
+
+if __name__ == "__main__":
+    redis_url = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+    shm_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    with tempfile.TemporaryDirectory(dir=shm_dir) as directory:
+        stores: list[IStateStore] = [
+            RedisStateStore(redis_url=redis_url),
+            SharedMemoryStateStore(directory=directory),
+        ]
+        for store in stores:
+            store.clear_all_sessions()
+            print(type(store).__name__)
+            run(store)
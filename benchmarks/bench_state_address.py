@@ -0,0 +1,99 @@
+"""Compare StateAddress with its previous, Pydantic-based implementation.
+
+Run from the repository root:
+
+    PYTHONPATH=. python benchmarks/bench_state_address.py
+"""
+import time
+from collections.abc import Callable
+
+from pydantic import BaseModel, ConfigDict, field_validator
+
+from livecomponents.types import ComponentId, StateAddress
+from livecomponents.utils import LiveComponentsPath, get_ancestor_id
+
+COMPONENTS = 10_000
+REPEATS = 10
+
+
+class PydanticStateAddress(BaseModel):
+    """StateAddress before the __slots__ rewrite (livecomponents 1.19.0)."""
+
+    session_id: str
+    component_id: ComponentId
+
+    @field_validator("component_id", mode="before")
+    @classmethod
+    def validate_component_id(cls, v):
+        return ComponentId(v)
+
+    def find_ancestor(self, ancestor_type: str) -> "PydanticStateAddress | None":
+        ancestor_component_id = get_ancestor_id(self.component_id, ancestor_type)
+        if not ancestor_component_id:
+            return None
+        return PydanticStateAddress(
+            session_id=self.session_id, component_id=ComponentId(ancestor_component_id)
+        )
+
+    def get_parent(self) -> "PydanticStateAddress | None":
+        parent = LiveComponentsPath(self.component_id).parent
+        if parent == LiveComponentsPath("|"):
+            return None
+        return PydanticStateAddress(
+            session_id=self.session_id, component_id=ComponentId(parent)
+        )
+
+    def get_component_name(self):
+        return LiveComponentsPath(self.component_id).stem
+
+    model_config = ConfigDict(frozen=True, arbitrary_types_allowed=True)
+
+
+def measure(name: str, func: Callable[[], None], count: int) -> None:
+    started_at = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started_at
+    print(f"  {name:<20} {elapsed * 1e6 / count:10.3f} us/op")
+
+
+def run(cls) -> None:
+    component_ids = [f"|page:0|table:0|row:{i}|cell:{i % 7}" for i in range(COMPONENTS)]
+    addresses = [cls(session_id="session", component_id=cid) for cid in component_ids]
+    keyed = dict.fromkeys(addresses, b"")
+    operations: list[tuple[str, Callable, list]] = [
+        (
+            "construct",
+            lambda cid: cls(session_id="session", component_id=cid),
+            component_ids,
+        ),
+        ("dict lookup", keyed.__getitem__, addresses),
+        (
+            "model_copy",
+            lambda state_addr: state_addr.model_copy(
+                update={"component_id": "|page:0"}
+            ),
+            addresses,
+        ),
+        ("get_parent", cls.get_parent, addresses),
+        ("get_component_name", cls.get_component_name, addresses),
+        (
+            "find_ancestor",
+            lambda state_addr: state_addr.find_ancestor("table"),
+            addresses,
+        ),
+    ]
+    for name, operation, args in operations:
+
+        def func(operation=operation, args=args):
+            for _ in range(REPEATS):
+                for arg in args:
+                    operation(arg)
+
+        measure(name, func, len(args) * REPEATS)
+
+
+if __name__ == "__main__":
+    print(f"{COMPONENTS} addresses, {REPEATS} repeats")
+    for cls in [PydanticStateAddress, StateAddress]:
+        print(cls.__name__)
+        run(cls)
@@ -7,6 +7,8 @@ from livecomponents import CallContext, StatelessLiveComponent, command
 class SearchComponent(StatelessLiveComponent):
     template_name = "coffee/search/search.html"
 
+    # The input debounces keystrokes with hx-trigger="... delay:500ms", so the
+    # command doesn't need server-side coalescing.
     @command
     def update_search(self, call_context: CallContext, search: str):
         call_context.parent.update_search(search=search)
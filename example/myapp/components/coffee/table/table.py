@@ -9,6 +9,7 @@ from livecomponents import (
     LiveComponentsModel,
     command,
 )
+from livecomponents.decorators import memoize_extra_context
 from myapp.models import CoffeeBean
 
 
@@ -23,17 +24,23 @@ class TableComponent(LiveComponent[TableState]):
     def get_extra_context_data(
         self, extra_context_request: ExtraContextRequest[TableState]
     ):
+        bean_ids = self.get_bean_ids(extra_context_request)["bean_ids"]
+        return {"beans": CoffeeBean.objects.filter(pk__in=bean_ids)}
+
+    @memoize_extra_context(fields=["search"], invalidate_on=[CoffeeBean])
+    def get_bean_ids(self, extra_context_request: ExtraContextRequest[TableState]):
+        # Memoize only the IDs of the matching beans: the cached value is small,
+        # and the beans are loaded fresh on every render.
         state = extra_context_request.state
+        beans = CoffeeBean.objects.all()
         if state.search:
-            beans = CoffeeBean.objects.filter(
+            beans = beans.filter(
                 Q(name__icontains=state.search)
                 | Q(origin__icontains=state.search)
                 | Q(roast_level__icontains=state.search)
                 | Q(flavor_notes__icontains=state.search)
             )
-        else:
-            beans = CoffeeBean.objects.all()
-        return {"beans": beans}
+        return {"bean_ids": list(beans.values_list("pk", flat=True))}
 
     def init_state(self, context: InitStateContext) -> TableState:
         return TableState(**context.component_kwargs)
@@ -1,15 +1,30 @@
 import abc
-from collections.abc import Callable
-from typing import Any, Generic
+import hashlib
+import inspect
+from collections.abc import Callable, Mapping, Sequence
+from contextvars import ContextVar
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, ClassVar, Generic, Literal, Required
 
 from django.core.exceptions import BadRequest
 from django.http import HttpRequest
+from django.template.context import Context, ContextDict
+from django.utils.safestring import mark_safe
 from django_components import component
 from django_components.component import SimplifiedInterfaceMediaDefiningClass
+from pydantic import ConfigDict, TypeAdapter, ValidationError, with_config
+from typing_extensions import TypedDict
 
 from livecomponents.const import DEFAULT_OWN_ID
+from livecomponents.exceptions import InvalidCommandArguments
+from livecomponents.logging import logger
 from livecomponents.manager import StateManager, get_state_manager
-from livecomponents.manager.manager import InitStateContext, UpdateStateContext
+from livecomponents.manager.manager import (
+    ALL_FIELDS,
+    InitStateContext,
+    UpdateStateContext,
+)
 from livecomponents.sentry_utils import start_span
 from livecomponents.types import State, StateAddress
 from livecomponents.utils import LiveComponentsModel, find_component_id
@@ -17,12 +32,228 @@ from livecomponents.utils import LiveComponentsModel, find_component_id
 DEFAULT_PARENT_ID = ""
 
 COMMAND_MARKER = "__livecomponents_command__"
+COMMAND_COALESCE = "__livecomponents_command_coalesce__"
+COMMAND_COALESCE_WINDOW = "__livecomponents_command_coalesce_window__"
 
+# Number of live components rendered so far, to detect nested live components.
+_render_count: ContextVar[int] = ContextVar("_render_count", default=0)
 
-def command(func):
-    """A decorator to mark the method as a command."""
-    setattr(func, COMMAND_MARKER, True)
-    return func
+
+def command(func=None, *, coalesce: bool = False, coalesce_window: float = 0.0):
+    """A decorator to mark the method as a command.
+
+    Use it as @command, or with options, as @command(coalesce=True).
+
+    Args:
+        coalesce: If True, the last request of the command wins. When the same
+            command of the same component arrives while the command runs, the
+            earlier request doesn't save the state or re-render the component,
+            and returns an empty response with the status 204. Use it for
+            commands sent on every keystroke, like a search box.
+        coalesce_window: If set, a coalesced command additionally waits for this
+            number of seconds before running, and doesn't run at all if a newer
+            request arrives in the meantime. The wait holds a worker, so it's off
+            by default.
+    """
+
+    def decorator(func):
+        setattr(func, COMMAND_MARKER, True)
+        setattr(func, COMMAND_COALESCE, coalesce)
+        setattr(func, COMMAND_COALESCE_WINDOW, coalesce_window)
+        return func
+
+    if func is None:
+        return decorator
+    return decorator(func)
+
+
+@dataclass(frozen=True, slots=True)
+class Command:
+    """A command of a live component class.
+
+    Commands are collected once, when the component class is created.
+
+    Attributes:
+        name: The name of the command.
+        function: The command as defined in the class: a function, a classmethod,
+            or a staticmethod.
+        signature: The signature of the command without the "self" (or "cls")
+            and the call context arguments, i.e. the keyword arguments that the
+            command accepts from the request.
+        kwargs_adapter: The validator of the keyword arguments, built from the
+            signature.
+        coalesce: Whether the last request of the command wins, see command().
+        coalesce_window: The wait before running a coalesced command in seconds.
+    """
+
+    name: str
+    function: Any
+    signature: inspect.Signature
+    kwargs_adapter: TypeAdapter[Any]
+    coalesce: bool = False
+    coalesce_window: float = 0.0
+
+    def bind(self, component: "LiveComponent") -> Callable:
+        """Return the command bound to the component instance."""
+        return self.function.__get__(component, type(component))
+
+    def validate_kwargs(self, kwargs: dict[str, Any]) -> dict[str, Any]:
+        """Validate and coerce the keyword arguments of the command.
+
+        Form posts send all values as strings, so "5" becomes 5 for an argument
+        annotated as int. Arguments without annotations are passed as-is, and so
+        are the arguments that the command accepts with **kwargs.
+
+        Raise InvalidCommandArguments if the arguments don't match the signature.
+        """
+        try:
+            return self.kwargs_adapter.validate_python(kwargs)
+        except ValidationError as error:
+            raise InvalidCommandArguments(self.name, error) from error
+
+
+def build_kwargs_adapter(name: str, signature: inspect.Signature) -> TypeAdapter[Any]:
+    """Build a validator of the keyword arguments that match the signature."""
+    fields: dict[str, Any] = {}
+    extra: Literal["allow", "forbid"] = "forbid"
+    for parameter in signature.parameters.values():
+        if parameter.kind == parameter.VAR_KEYWORD:
+            extra = "allow"
+            continue
+        if parameter.kind == parameter.VAR_POSITIONAL:
+            continue
+        annotation = parameter.annotation
+        # Pass unannotated arguments and unresolved annotations as-is.
+        if annotation is parameter.empty or isinstance(annotation, str):
+            annotation = Any
+        if parameter.default is parameter.empty:
+            annotation = Required[annotation]
+        fields[parameter.name] = annotation
+    # JSON bodies may send numbers for string arguments, e.g. {"search": 42}.
+    config = ConfigDict(
+        extra=extra, arbitrary_types_allowed=True, coerce_numbers_to_str=True
+    )
+    kwargs_type = TypedDict(f"{name}_kwargs", fields, total=False)  # type: ignore
+    return TypeAdapter(with_config(config)(kwargs_type))
+
+
+def get_signature(func: Callable) -> inspect.Signature:
+    try:
+        return inspect.signature(func, eval_str=True)
+    except NameError:
+        # Annotations that refer to names that are not defined yet
+        return inspect.signature(func)
+
+
+def collect_commands(cls: type) -> dict[str, Command]:
+    """Return the commands of the class, including the inherited ones."""
+    commands = {}
+    for name in dir(cls):
+        if name.startswith("__"):
+            continue
+        value = inspect.getattr_static(cls, name)
+        if isinstance(value, (classmethod, staticmethod)):
+            func = value.__func__
+        else:
+            func = value
+        if getattr(func, COMMAND_MARKER, False) is not True:
+            continue
+        parameters = list(get_signature(func).parameters.values())
+        # Skip "self" or "cls", and the call context.
+        skipped = 1 if isinstance(value, staticmethod) else 2
+        signature = inspect.Signature(parameters[skipped:])
+        commands[name] = Command(
+            name=name,
+            function=value,
+            signature=signature,
+            kwargs_adapter=build_kwargs_adapter(name, signature),
+            coalesce=getattr(func, COMMAND_COALESCE, False),
+            coalesce_window=getattr(func, COMMAND_COALESCE_WINDOW, 0.0),
+        )
+    return commands
+
+
+class RecordingContextDict(dict):
+    """Component context that records which state fields the template reads.
+
+    Reading a key added by get_extra_context_data(), or iterating over the
+    context, counts as reading all fields of the state.
+    """
+
+    def __init__(
+        self, data: dict, state_fields: set[str], extra_keys: set[str]
+    ) -> None:
+        super().__init__(data)
+        self.state_fields = state_fields
+        self.extra_keys = extra_keys
+        self.read_fields: set[str] = set()
+
+    def _record(self, key: Any) -> None:
+        if key in self.extra_keys:
+            self.read_fields.add(ALL_FIELDS)
+        elif key in self.state_fields:
+            self.read_fields.add(key)
+
+    def __getitem__(self, key):
+        self._record(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self._record(key)
+        return super().get(key, default)
+
+    def __iter__(self):
+        self.read_fields.add(ALL_FIELDS)
+        return super().__iter__()
+
+    def keys(self):
+        self.read_fields.add(ALL_FIELDS)
+        return super().keys()
+
+    def values(self):
+        self.read_fields.add(ALL_FIELDS)
+        return super().values()
+
+    def items(self):
+        self.read_fields.add(ALL_FIELDS)
+        return super().items()
+
+    def copy(self):
+        self.read_fields.add(ALL_FIELDS)
+        return super().copy()
+
+
+@dataclass(slots=True)
+class RenderDependencies:
+    """What's needed to record the state fields read by a render of a component."""
+
+    state_manager: StateManager
+    state_addr: StateAddress
+    fingerprint: bytes
+    state_fields: set[str]
+    extra_keys: set[str]
+
+    def record(self, context: Context, render: Callable[[Context], str]) -> str:
+        """Render the component and record the state fields its template read.
+
+        Expects the component context to be the last dict of the template context,
+        as ComponentNode puts it there.
+        """
+        component_context = context.dicts[-1]
+        if not (
+            isinstance(component_context, ContextDict)
+            and component_context.get("component_id") == self.state_addr.component_id
+        ):
+            return render(context)
+        recording_context = RecordingContextDict(
+            component_context, self.state_fields, self.extra_keys
+        )
+        context.dicts[-1] = recording_context
+        html = render(context)
+        self.state_manager.record_render_dependencies(
+            self.state_addr, self.fingerprint, recording_context.read_fields
+        )
+        return html
 
 
 class LiveComponentMeta(abc.ABCMeta, SimplifiedInterfaceMediaDefiningClass):
@@ -30,17 +261,41 @@ class LiveComponentMeta(abc.ABCMeta, SimplifiedInterfaceMediaDefiningClass):
 
 
 class LiveComponent(component.Component, Generic[State], metaclass=LiveComponentMeta):
+    # Commands of the class by name, see __init_subclass__().
+    _commands: ClassVar[Mapping[str, Command]] = MappingProxyType({})
+    # If True, the rendered HTML is cached in the render cache of the state
+    # manager. See get_render_cache_key().
+    cache_render: ClassVar[bool] = False
+    # Names of the outer context variables that the rendered HTML depends on.
+    cache_render_context: ClassVar[Sequence[str]] = ()
+
+    # Set by get_context_data() if the state manager tracks render dependencies.
+    _render_dependencies: RenderDependencies | None = None
+    # Set by get_context_data() if cache_render is True.
+    _render_cache_key: str | None = None
+    _cached_html: str | None = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._commands = MappingProxyType(collect_commands(cls))
+
+    @classmethod
+    def get_command_info(cls, command_name: str) -> Command:
+        """Get a command of the class by name.
+
+        Raise a BadRequest if the command does not exist.
+        """
+        try:
+            return cls._commands[command_name]
+        except KeyError:
+            raise BadRequest(f"Command {command_name} does not exist.") from None
+
     def get_command(self, command_name: str) -> Callable:
         """Get a command method by name.
 
-        Raise a ValueError if the command does not exist.
+        Raise a BadRequest if the command does not exist.
         """
-        command_func = getattr(self, command_name, None)
-        if not command_func:
-            raise BadRequest(f"Command {command_name} does not exist.")
-        if not getattr(command_func, COMMAND_MARKER, False):
-            raise BadRequest(f"Command {command_name} does not exist.")
-        return command_func
+        return self.get_command_info(command_name).bind(self)
 
     def get_state(
         self, state_manager: StateManager, state_addr: StateAddress
@@ -101,6 +356,17 @@ class LiveComponent(component.Component, Generic[State], metaclass=LiveComponent
                 state = self.get_or_create_state(
                     state_manager, state_addr, request, component_kwargs
                 )
+            if self.cache_render and state_manager.render_cache is not None:
+                self._render_cache_key = self.get_render_cache_key(
+                    state_manager, state_addr, state, component_kwargs
+                )
+                if self._render_cache_key is not None:
+                    self._cached_html = state_manager.render_cache.get(
+                        self._render_cache_key
+                    )
+                if self._cached_html is not None:
+                    # render() returns the cached HTML without the template.
+                    return state_addr.model_dump()
             extra_context_request: ExtraContextRequest[State] = ExtraContextRequest(
                 request=request,
                 state=state,
@@ -108,18 +374,81 @@ class LiveComponent(component.Component, Generic[State], metaclass=LiveComponent
                 state_addr=state_addr,
                 component_kwargs=component_kwargs,
             )
+            if state_manager.records_render_dependencies:
+                # Take the fingerprint before get_extra_context_data() has
+                # a chance to modify the state.
+                fingerprint = state_manager.get_state_fingerprint(state)
             with start_span(f"get_extra_context_data({self.get_name()})"):
                 extra_context = self.get_extra_context_data(extra_context_request)
+            state_context = state.model_dump()
             context = {
                 **component_kwargs,
-                **state.model_dump(),
+                **state_context,
                 **extra_context,
                 # Put "session_id" and "component_id" last to ensure they are
                 # not overwritten
                 **state_addr.model_dump(),
             }
+            if state_manager.records_render_dependencies:
+                self._render_dependencies = RenderDependencies(
+                    state_manager=state_manager,
+                    state_addr=state_addr,
+                    fingerprint=fingerprint,
+                    state_fields=set(state_context),
+                    extra_keys=set(extra_context),
+                )
             return context
 
+    def get_render_cache_key(
+        self,
+        state_manager: StateManager,
+        state_addr: StateAddress,
+        state: State,
+        component_kwargs: dict[str, Any],
+    ) -> str | None:
+        """Return the key of the rendered HTML in the render cache.
+
+        Used only if the component class has `cache_render = True`. The key is built
+        from the component class, the template source, the state fingerprint, the
+        component address, the component kwargs, and the values of the outer
+        context variables listed in `cache_render_context`. Override the method if
+        the HTML depends on something else, or return None to render the component
+        as usual.
+
+        Components rendered with slot fills are not cached, because the fills come
+        from the parent template.
+        """
+        if self.fill_content:
+            return None
+        cls = type(self)
+        template = self.get_template(self.outer_context)
+        context_values = {
+            name: self.outer_context.get(name) for name in self.cache_render_context
+        }
+        try:
+            raw_inputs = state_manager.serializer.serialize(
+                (component_kwargs, context_values)
+            )
+        except Exception:
+            logger.warning(
+                "Cannot serialize the render cache inputs of %s",
+                state_addr.component_id,
+                exc_info=True,
+            )
+            return None
+        digest = hashlib.blake2b(digest_size=16)
+        for part in [
+            f"{cls.__module__}.{cls.__qualname__}",
+            template.source,
+            state_addr.session_id,
+            state_addr.component_id,
+        ]:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        digest.update(state_manager.get_state_fingerprint(state))
+        digest.update(raw_inputs)
+        return f"{self.get_name()}:{digest.hexdigest()}"
+
     def get_extra_context_data(
         self, extra_context_request: "ExtraContextRequest[State]"
     ) -> dict:
@@ -182,7 +511,26 @@ class LiveComponent(component.Component, Generic[State], metaclass=LiveComponent
 
     def render(self, context):
         with start_span(f"render({self.get_name()})"):
-            return super().render(context)
+            # Count cache hits too: a parent that contains a cached child must not
+            # be cached with the child's HTML.
+            render_count = _render_count.get() + 1
+            _render_count.set(render_count)
+            if self._cached_html is not None:
+                return mark_safe(self._cached_html)
+            if self._render_dependencies is not None:
+                html = self._render_dependencies.record(context, super().render)
+            else:
+                html = super().render(context)
+            # Don't cache the HTML of nested live components: they have to render
+            # themselves to update and keep their own states.
+            render_cache = get_state_manager().render_cache
+            if (
+                self._render_cache_key is not None
+                and render_cache is not None
+                and _render_count.get() == render_count
+            ):
+                render_cache.set(self._render_cache_key, html)
+            return html
 
     def get_name(self):
         return self.__class__.__name__
@@ -226,7 +574,8 @@ class StatelessLiveComponent(LiveComponent[StatelessModel]):
         return StatelessModel()
 
 
-class ExtraContextRequest(LiveComponentsModel, Generic[State]):
+@dataclass(slots=True, kw_only=True)
+class ExtraContextRequest(Generic[State]):
     request: HttpRequest
     state: State
     state_manager: StateManager
@@ -1,9 +1,19 @@
-from functools import wraps
+import datetime
+import uuid
+from collections.abc import Callable, Iterable, Sequence
+from functools import partial, update_wrapper, wraps
+from typing import TYPE_CHECKING, Any
 
+from django.core.cache import BaseCache, caches
 from django.core.exceptions import PermissionDenied
+from django.db.models import Model
+from django.db.models.signals import post_delete, post_save
 
 from livecomponents.manager.manager import CallContext, InitStateContext
 
+if TYPE_CHECKING:
+    from livecomponents.component import ExtraContextRequest
+
 
 def livecomponents_login_required(method):
     """
@@ -45,3 +55,128 @@ def _call_method_login_required(method):
         return method(cls, call_context, **kwargs)
 
     return wrapped
+
+
+def memoize_extra_context(
+    fields: Sequence[str],
+    ttl: datetime.timedelta = datetime.timedelta(minutes=5),
+    invalidate_on: Iterable[type[Model]] = (),
+    cache_alias: str = "default",
+):
+    """
+    A decorator for get_extra_context_data() to cache its values by state fields.
+
+    The values are reused by all renders, and by all sessions, that have the same
+    values of the listed state fields. The method must not depend on anything else,
+    like component kwargs or the current user. The values are pickled on every
+    cache write and read, so return small, picklable values, like the IDs of the
+    matching objects rather than a query set of the whole table.
+
+    class CoffeeTable(LiveComponent):
+
+        @memoize_extra_context(fields=["search"], invalidate_on=[CoffeeBean])
+        def get_extra_context_data(self, extra_context_request):
+            ...
+
+    Args:
+        fields: Names of the state fields that the values depend on.
+        ttl: Time-to-live for cached values.
+        invalidate_on: Models whose post_save and post_delete signals invalidate
+            all cached values of the method.
+        cache_alias: Alias of the cache in the CACHES setting.
+
+    Call `CoffeeTable.get_extra_context_data.invalidate()` to invalidate the cached
+    values explicitly.
+    """
+
+    def decorator(method):
+        memoized = MemoizedExtraContext(method, fields, ttl, cache_alias)
+        for model in invalidate_on:
+            memoized.invalidate_on(model)
+        return memoized
+
+    return decorator
+
+
+class MemoizedExtraContext:
+    """get_extra_context_data() with cached values, see memoize_extra_context().
+
+    Values are cached with the random generation token of the method, which is
+    read in the same get_many() call as the value. Invalidation replaces the
+    token, so that the values of the previous generation are never used again
+    and expire with their TTL.
+    """
+
+    def __init__(
+        self,
+        method: Callable[..., dict[str, Any]],
+        fields: Sequence[str],
+        ttl: datetime.timedelta,
+        cache_alias: str,
+    ):
+        update_wrapper(self, method)
+        self.method = method
+        self.fields = tuple(fields)
+        self.ttl = ttl
+        self.cache_alias = cache_alias
+        self.key_prefix = f"lc:extra_context:{method.__module__}.{method.__qualname__}"
+
+    @property
+    def cache(self) -> BaseCache:
+        # Django keeps a separate cache connection for every thread.
+        return caches[self.cache_alias]
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return partial(self, instance)
+
+    def __call__(
+        self, component: Any, extra_context_request: "ExtraContextRequest"
+    ) -> dict[str, Any]:
+        key = self.get_key(extra_context_request)
+        generation_key = self.get_generation_key()
+        cached = self.cache.get_many([generation_key, key])
+        generation = cached.get(generation_key) or self.create_generation()
+        if key in cached:
+            cached_generation, extra_context = cached[key]
+            if cached_generation == generation:
+                return extra_context
+        extra_context = self.method(component, extra_context_request)
+        self.cache.set(
+            key, (generation, extra_context), timeout=self.ttl.total_seconds()
+        )
+        return extra_context
+
+    def get_key(self, extra_context_request: "ExtraContextRequest") -> str:
+        state = extra_context_request.state
+        values = tuple(getattr(state, name) for name in self.fields)
+        fingerprint = extra_context_request.state_manager.get_state_fingerprint(values)
+        return f"{self.key_prefix}:{fingerprint.hex()}"
+
+    def get_generation_key(self) -> str:
+        return f"{self.key_prefix}:generation"
+
+    def create_generation(self) -> str:
+        """Create the generation token if it's missing and return the current one."""
+        generation_key = self.get_generation_key()
+        self.cache.add(generation_key, uuid.uuid4().hex, timeout=None)
+        return self.cache.get(generation_key)
+
+    def invalidate(self) -> None:
+        """Invalidate all cached values of the method."""
+        self.cache.set(self.get_generation_key(), uuid.uuid4().hex, timeout=None)
+
+    def invalidate_on(self, model: type[Model]) -> None:
+        """Invalidate the cached values when an instance of the model changes."""
+        dispatch_uid = f"{self.key_prefix}:{model._meta.label}"
+        for signal in [post_save, post_delete]:
+            signal.connect(
+                self._invalidate_receiver,
+                sender=model,
+                weak=False,
+                dispatch_uid=dispatch_uid,
+            )
+
+    def _invalidate_receiver(self, sender, **kwargs) -> None:
+        self.invalidate()
@@ -1,3 +1,7 @@
+from django.core.exceptions import BadRequest
+from pydantic import ValidationError
+
+
 class CancelRendering(Exception):
     """Cancel rendering exception.
 
@@ -7,3 +11,50 @@ class CancelRendering(Exception):
     """
 
     pass
+
+
+class SessionQuotaExceeded(Exception):
+    """Saving a component state would exceed the session quota.
+
+    Raised by the state manager when the "reject" quota policy is configured.
+    """
+
+    pass
+
+
+class ComponentStateNotFound(ValueError):
+    """The state of the component that a command targets is not in the store.
+
+    The component may have been evicted by the "evict" quota policy or deleted
+    as an orphan. The call_command view returns the status 410.
+    """
+
+    pass
+
+
+class CommandSuperseded(Exception):
+    """A newer request of the same coalesced command arrived.
+
+    Raised before the component state is saved, see `@command(coalesce=True)`.
+    The call_command view returns an empty response with the status 204.
+    """
+
+    pass
+
+
+class InvalidCommandArguments(BadRequest):
+    """The arguments of a command don't match the command signature.
+
+    Raised before the component state is loaded. The call_command view returns
+    the validation errors as a JSON response with the status 400.
+    """
+
+    def __init__(self, command_name: str, error: ValidationError):
+        super().__init__(f"Invalid arguments of the command {command_name}")
+        self.command_name = command_name
+        self.errors = get_error_list(error)
+
+
+def get_error_list(error: ValidationError) -> list:
+    """Return the validation errors in a JSON-serializable form."""
+    return error.errors(include_url=False, include_context=False, include_input=False)
@@ -0,0 +1,62 @@
+from django.core.management import BaseCommand, CommandError
+
+from livecomponents.manager import get_state_manager
+from livecomponents.manager.stores import CircuitBreakerStateStore, RedisStateStore
+
+
+class Command(BaseCommand):
+    help = "Delete all stored live component sessions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--noinput",
+            "--no-input",
+            action="store_false",
+            dest="interactive",
+            help="Don't ask for confirmation",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of Redis keys to delete at once",
+        )
+        parser.add_argument(
+            "--max-keys-per-second",
+            type=float,
+            default=None,
+            help="Delete at most this many Redis keys per second",
+        )
+
+    def handle(self, *args, **options):
+        store = get_state_manager().store
+        if isinstance(store, CircuitBreakerStateStore):
+            store = store.store
+
+        if options["interactive"]:
+            answer = input(
+                "This will delete all live component sessions. "
+                "Type 'yes' to continue: "
+            )
+            if answer != "yes":
+                raise CommandError("Cancelled")
+
+        if not isinstance(store, RedisStateStore):
+            store.clear_all_sessions()
+            self.stdout.write(self.style.SUCCESS("Deleted all sessions"))
+            return
+
+        deleted_keys = 0
+
+        def progress(deleted: int):
+            nonlocal deleted_keys
+            deleted_keys = deleted
+            if options["verbosity"] > 1:
+                self.stdout.write(f"Deleted {deleted} keys")
+
+        store.clear_all_sessions(
+            batch_size=options["batch_size"],
+            max_keys_per_second=options["max_keys_per_second"],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted_keys} keys"))
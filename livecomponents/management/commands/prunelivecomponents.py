@@ -0,0 +1,58 @@
+from django.core.management import BaseCommand
+
+from livecomponents.const import HIER_SEP
+from livecomponents.manager import get_state_manager
+from livecomponents.utils import LiveComponentsPath
+
+
+class Command(BaseCommand):
+    help = "Report and delete orphaned live components in all stored sessions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report orphaned components, don't delete them",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        store = get_state_manager().store
+
+        total_sessions = 0
+        total_orphans = 0
+        for session_id in store.get_session_ids():
+            orphans = find_orphaned_component_ids(store.get_component_ids(session_id))
+            if not orphans:
+                continue
+            total_sessions += 1
+            total_orphans += len(orphans)
+            if options["verbosity"] > 1:
+                for component_id in sorted(orphans):
+                    self.stdout.write(f"{session_id}: {component_id}")
+            if not dry_run:
+                store.delete_components(session_id, orphans)
+
+        action = "Found" if dry_run else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{action} {total_orphans} orphaned components "
+                f"in {total_sessions} sessions"
+            )
+        )
+
+
+def find_orphaned_component_ids(component_ids: set[str]) -> set[str]:
+    """Return the IDs of components with an ancestor missing from the session.
+
+    For example, "|table:0|row:1" is orphaned if "|table:0" is not stored.
+    """
+    orphans: set[str] = set()
+    # Sorting puts ancestors before their descendants.
+    for component_id in sorted(component_ids):
+        parent_id = str(LiveComponentsPath(component_id).parent)
+        if parent_id == HIER_SEP:
+            continue
+        if parent_id not in component_ids or parent_id in orphans:
+            orphans.add(component_id)
+    return orphans
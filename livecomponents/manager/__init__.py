@@ -7,8 +7,14 @@ from livecomponents.settings import get_config
 @cache
 def get_state_manager() -> StateManager:
     config = get_config()
+    store = config.state_store.get_instance()
+    if config.circuit_breaker is not None:
+        store = config.circuit_breaker.get_instance(store=store)
     state_manager = config.state_manager.get_instance(
         serializer=config.state_serializer.get_instance(),
-        store=config.state_store.get_instance(),
+        store=store,
+        render_cache=(
+            config.render_cache.get_instance() if config.render_cache else None
+        ),
     )
     return state_manager
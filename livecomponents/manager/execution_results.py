@@ -1,9 +1,10 @@
 import abc
 import json
+from dataclasses import dataclass, field
 from enum import Enum
 from typing import Any
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, Field
 
 from livecomponents.types import StateAddress
 
@@ -364,13 +365,12 @@ class TriggerEvents(IExecutionResult):
         return {event.name: event.serialize_value() for event in self.events}
 
 
-class ExecutionResults(BaseModel):
+@dataclass(frozen=True, slots=True, kw_only=True)
+class ExecutionResults:
     """Container for execution results."""
 
-    dirty_components: set[StateAddress] = Field(default_factory=set)
-    response_headers: dict[str, str] = Field(default_factory=dict)
-
-    model_config = ConfigDict(frozen=True)
+    dirty_components: set[StateAddress] = field(default_factory=set)
+    response_headers: dict[str, str] = field(default_factory=dict)
 
     def is_partial_render_necessary(self) -> bool:
         """Check if partial rendering is needed based on response headers."""
@@ -384,13 +384,15 @@ class ExecutionResults(BaseModel):
         self,
         state_address: StateAddress,
         value: list[IExecutionResult] | IExecutionResult | None,
+        state_changed: bool = True,
     ) -> None:
         """Process the command handler's returned value.
 
-        If value is None, defaults to ComponentDirty() to mark the component as dirty.
+        If value is None, defaults to ComponentDirty() to mark the component as dirty,
+        unless state_changed is False (see `skip_unchanged_renders` of StateManager).
         """
         if value is None:
-            value = [ComponentDirty()]
+            value = [ComponentDirty()] if state_changed else []
         if not isinstance(value, list):
             value = [value]
         for command in value:
@@ -1,18 +1,33 @@
-from collections.abc import Callable
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import StrEnum
 from typing import TYPE_CHECKING, Any, Generic
 
+from django.core.exceptions import ImproperlyConfigured
 from django.http import HttpRequest
 from django.template import Context
 from django_components.component_registry import registry
-from pydantic import Field
-
+from pydantic import BaseModel
+
+from livecomponents.const import HIER_SEP
+from livecomponents.exceptions import (
+    CommandSuperseded,
+    ComponentStateNotFound,
+    SessionQuotaExceeded,
+)
 from livecomponents.logging import logger
 from livecomponents.manager.execution_results import ExecutionResults
+from livecomponents.manager.render_cache import IRenderCache
 from livecomponents.manager.serializers import IStateSerializer
-from livecomponents.manager.stores import IStateStore
+from livecomponents.manager.stores import IStateStore, in_interaction
 from livecomponents.sentry_utils import set_span_data, start_span
 from livecomponents.types import State, StateAddress
-from livecomponents.utils import LiveComponentsModel
 
 if TYPE_CHECKING:
     from livecomponents.component import LiveComponent
@@ -27,32 +42,119 @@ DEFAULT_CONTEXT_IGNORE_KEYS = {
     "LIVECOMPONENTS_SESSION_ID",
 }
 
+# IDs of the components rendered inside StateManager.collect_orphaned_components().
+_rendered_component_ids: ContextVar[set[str] | None] = ContextVar(
+    "_rendered_component_ids", default=None
+)
+
+
+class _StateCache:
+    """Component states of the StateManager.state_cache() block.
+
+    Attributes:
+        state_manager: The state manager that owns the cache.
+        states: Deserialized states by address, shared by the commands of the block.
+        pending: Serialized states to save when the block exits.
+    """
+
+    __slots__ = ("state_manager", "states", "pending")
+
+    def __init__(self, state_manager: "StateManager") -> None:
+        self.state_manager = state_manager
+        self.states: dict[StateAddress, Any] = {}
+        self.pending: dict[StateAddress, bytes] = {}
+
+
+_state_cache: ContextVar[_StateCache | None] = ContextVar("_state_cache", default=None)
+
+# Stands for all fields of a state, e.g., when a template iterates over its context.
+ALL_FIELDS = "*"
+
+
+class _RenderDependencies:
+    """State fields read by the renders of components, see StateManager.
+
+    Keys are component addresses together with the fingerprints of the states they
+    were rendered with. The least recently used entries are dropped first.
+    """
+
+    __slots__ = ("max_size", "_entries", "_lock")
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._entries: OrderedDict[
+            tuple[StateAddress, bytes], frozenset[str]
+        ] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self, state_addr: StateAddress, fingerprint: bytes
+    ) -> frozenset[str] | None:
+        key = (state_addr, fingerprint)
+        with self._lock:
+            fields = self._entries.get(key)
+            if fields is not None:
+                self._entries.move_to_end(key)
+            return fields
+
+    def set(
+        self, state_addr: StateAddress, fingerprint: bytes, fields: frozenset[str]
+    ) -> None:
+        key = (state_addr, fingerprint)
+        with self._lock:
+            if ALL_FIELDS in fields:
+                # Same as knowing nothing.
+                self._entries.pop(key, None)
+                return
+            self._entries[key] = fields
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+@dataclass(frozen=True, slots=True)
+class _StateSnapshot:
+    """The state of a component before a command, see skip_unchanged_renders."""
+
+    fingerprint: bytes
+    # Fields read by the last render of the component with this state, if known.
+    dependencies: frozenset[str] | None = None
+    field_fingerprints: dict[str, bytes] | None = None
 
-class CallContext(LiveComponentsModel, Generic[State]):
+
+@dataclass(slots=True, kw_only=True)
+class CallContext(Generic[State]):
     request: HttpRequest
     state: State
     state_address: StateAddress
     state_manager: "StateManager"
-    execution_results: ExecutionResults = Field(default_factory=ExecutionResults)
+    execution_results: ExecutionResults = field(default_factory=ExecutionResults)
+
+    @property
+    def component_id(self) -> str:
+        return self.state_address.component_id
 
     def find_one(self, component_id: str) -> "CallContext":
         """Find a component by its ID."""
-        state = self.state_manager.get_component_state(
-            self.state_address.model_copy(update={"component_id": component_id})
-        )
-        return self.model_copy(update={"component_id": component_id, "state": state})
+        return self._for_address(self.state_address.with_component_id(component_id))
 
     def find_ancestor(self, ancestor_type: str) -> "CallContext":
         """Find the closest ancestor of the given type."""
-        ancestor = self.state_address.must_find_ancestor(ancestor_type)
-        ancestor_state = self.state_manager.get_component_state(ancestor)
-        return self.model_copy(
-            update={"component_id": ancestor.component_id, "state": ancestor_state}
-        )
+        return self._for_address(self.state_address.must_find_ancestor(ancestor_type))
 
     @property
     def parent(self) -> "CallContext":
-        return self.find_one(self.state_address.must_get_parent().component_id)
+        return self._for_address(self.state_address.must_get_parent())
+
+    def _for_address(self, state_addr: StateAddress) -> "CallContext":
+        state = self.state_manager.get_component_state(state_addr)
+        return CallContext(
+            request=self.request,
+            state=state,
+            state_address=state_addr,
+            state_manager=self.state_manager,
+            execution_results=self.execution_results,
+        )
 
     def __getattr__(self, command_name: str):
         """This is called when a method is called on the CallContext."""
@@ -68,27 +170,99 @@ class CallContext(LiveComponentsModel, Generic[State]):
         return call
 
 
-class InitStateContext(LiveComponentsModel):
+@dataclass(slots=True, kw_only=True)
+class InitStateContext:
     request: HttpRequest
     state_addr: StateAddress
     state_manager: "StateManager"
     component_kwargs: dict[str, Any]
-    outer_context: Context = Field(default_factory=Context)
+    outer_context: Context = field(default_factory=Context)
 
 
-class UpdateStateContext(LiveComponentsModel, Generic[State]):
+@dataclass(slots=True, kw_only=True)
+class UpdateStateContext(Generic[State]):
     request: HttpRequest
     state_addr: StateAddress
     state_manager: "StateManager"
     component_kwargs: dict[str, Any]
-    outer_context: Context = Field(default_factory=Context)
+    outer_context: Context = field(default_factory=Context)
     state: State
 
 
+class QuotaPolicy(StrEnum):
+    """What to do when saving a component state would exceed the session quota."""
+
+    # Fail the command with SessionQuotaExceeded.
+    REJECT = "reject"
+    # Delete the least recently saved components of the session.
+    EVICT = "evict"
+    # Only log a warning.
+    LOG = "log"
+
+
 class StateManager:
-    def __init__(self, serializer: IStateSerializer, store: IStateStore):
+    """Load and save component states, contexts, and templates.
+
+    Args:
+        serializer: Serializer for states and contexts.
+        store: Storage for serialized states, contexts, and templates.
+        gc_orphaned_components: If True, after a component re-renders, delete the
+            stored data of its descendants that were not rendered this time (e.g.,
+            rows that were removed from a table). Keep it off if your components
+            rely on the state of hidden children, like inactive tabs.
+        session_quota: Maximum number of bytes of states, contexts, and templates
+            stored in one session. Requires a store that tracks usage (e.g.,
+            RedisStateStore with track_usage=True), or ImproperlyConfigured is
+            raised. By default, there is no quota.
+        session_quota_policy: What to do when saving a component state would
+            exceed the quota: "reject", "evict", or "log". See QuotaPolicy.
+            Outside of commands, e.g., on the initial page render, "reject" only
+            logs a warning.
+        skip_unchanged_renders: If True, a command that returns None doesn't mark
+            its component as dirty unless the command changed the component
+            state, as compared by get_state_fingerprint(). Changes that don't
+            show up in the serialized state, like the fields of saved Django
+            models that the state refers to, are not detected: such commands
+            should return ComponentDirty() explicitly.
+        track_render_dependencies: If True, record which state fields every
+            render of a component reads, and skip the re-render after a command
+            that only changed the fields that the last render didn't read. Has no
+            effect unless skip_unchanged_renders is enabled. The fields are kept
+            in the process memory, so a command handled by another process than
+            the last render re-renders the component as usual.
+        render_dependencies_size: Maximum number of renders whose fields are kept
+            in memory by track_render_dependencies.
+        render_cache: Cache of the rendered HTML of components with
+            `cache_render = True`. If None, such components render as usual.
+    """
+
+    def __init__(
+        self,
+        serializer: IStateSerializer,
+        store: IStateStore,
+        gc_orphaned_components: bool = False,
+        session_quota: int | None = None,
+        session_quota_policy: str = QuotaPolicy.LOG,
+        skip_unchanged_renders: bool = False,
+        track_render_dependencies: bool = False,
+        render_dependencies_size: int = 10_000,
+        render_cache: IRenderCache | None = None,
+    ):
+        if session_quota is not None and not store.tracks_usage:
+            raise ImproperlyConfigured(
+                f"session_quota requires a state store that tracks usage, but "
+                f"{type(store).__name__} doesn't. For RedisStateStore, set "
+                f"track_usage=True."
+            )
         self.serializer = serializer
         self.store = store
+        self.gc_orphaned_components = gc_orphaned_components
+        self.session_quota = session_quota
+        self.session_quota_policy = QuotaPolicy(session_quota_policy)
+        self.skip_unchanged_renders = skip_unchanged_renders
+        self.track_render_dependencies = track_render_dependencies
+        self._render_dependencies = _RenderDependencies(render_dependencies_size)
+        self.render_cache = render_cache
 
     def save_component_template(self, state_addr: StateAddress, html: str):
         self.store.save_component_template(state_addr, html.encode("utf-8"))
@@ -103,6 +277,9 @@ class StateManager:
         return self.store.session_exists(session_id)
 
     def component_initialized(self, state_addr: StateAddress) -> bool:
+        cache = self._get_state_cache()
+        if cache is not None and state_addr in cache.pending:
+            return True
         return self.store.component_initialized(state_addr)
 
     def get_or_create_component_state(
@@ -140,18 +317,223 @@ class StateManager:
         return state
 
     def get_component_state(self, state_addr: StateAddress) -> Any | None:
+        cache = self._get_state_cache()
+        if cache is not None and state_addr in cache.states:
+            return cache.states[state_addr]
         raw_state = self.store.restore_state(state_addr)
         if raw_state is None:
             return None
         state = self.serializer.deserialize(raw_state)
         logger.debug("Getting component state for %r: %r", state_addr, state)
+        if cache is not None:
+            cache.states[state_addr] = state
         return state
 
     def set_component_state(self, state_addr: StateAddress, state: Any):
         logger.debug(
             "Setting component state for %r: %r", state_addr.component_id, state
         )
-        self.store.save_state(state_addr, self.serializer.serialize(state))
+        raw_state = self.serializer.serialize(state)
+        if self.session_quota is not None:
+            self.enforce_session_quota(state_addr, len(raw_state))
+        cache = self._get_state_cache()
+        if cache is not None:
+            # Serialize now to save the state as of this call, even if a later
+            # command of the block changes it in place and fails.
+            cache.states[state_addr] = state
+            cache.pending[state_addr] = raw_state
+            return
+        self.store.save_state(state_addr, raw_state)
+
+    @contextmanager
+    def state_cache(self) -> Iterator[None]:
+        """Share component states between the commands of the block.
+
+        Inside the block, every state is read from the store at most once, and the
+        states saved in the block are written to the store once, when the block
+        exits. If the block raises an exception, none of the states saved in it
+        are written, so a failed batch of commands leaves the stored states as
+        they were. Nested blocks use the cache of the outer block.
+        """
+        if self._get_state_cache() is not None:
+            yield
+            return
+        cache = _StateCache(self)
+        token = _state_cache.set(cache)
+        try:
+            yield
+        finally:
+            _state_cache.reset(token)
+        for state_addr, raw_state in cache.pending.items():
+            self.store.save_state(state_addr, raw_state)
+
+    def _get_state_cache(self) -> _StateCache | None:
+        cache = _state_cache.get()
+        if cache is None or cache.state_manager is not self:
+            return None
+        return cache
+
+    def delete_components(self, session_id: str, component_ids: Iterable[str]):
+        """Delete the states, contexts, and templates of the components."""
+        component_ids = set(component_ids)
+        cache = self._get_state_cache()
+        if cache is not None:
+            for state_addr in list(cache.states):
+                if (
+                    state_addr.session_id == session_id
+                    and state_addr.component_id in component_ids
+                ):
+                    cache.states.pop(state_addr, None)
+                    cache.pending.pop(state_addr, None)
+        self.store.delete_components(session_id, component_ids)
+
+    def get_state_fingerprint(self, state: Any) -> bytes:
+        """Return a short digest of the serialized state.
+
+        Equal states have equal fingerprints as long as the serializer is
+        deterministic.
+        """
+        raw_state = self.serializer.serialize(state)
+        return hashlib.blake2b(raw_state, digest_size=16).digest()
+
+    def get_field_fingerprints(self, state: Any) -> dict[str, bytes]:
+        """Return the fingerprints of the fields of a Pydantic state by name.
+
+        Other states are fingerprinted as a whole, under the ALL_FIELDS name.
+        """
+        if not isinstance(state, BaseModel):
+            return {ALL_FIELDS: self.get_state_fingerprint(state)}
+        values = {name: getattr(state, name) for name in type(state).model_fields}
+        values.update(state.model_extra or {})
+        return {
+            name: self.get_state_fingerprint(value) for name, value in values.items()
+        }
+
+    @property
+    def records_render_dependencies(self) -> bool:
+        return self.skip_unchanged_renders and self.track_render_dependencies
+
+    def record_render_dependencies(
+        self, state_addr: StateAddress, fingerprint: bytes, fields: Iterable[str]
+    ) -> None:
+        """Remember the state fields read by a render of the component.
+
+        Args:
+            state_addr: The address of the rendered component.
+            fingerprint: The fingerprint of the state the component was rendered with.
+            fields: The names of the fields. ALL_FIELDS stands for all of them.
+        """
+        self._render_dependencies.set(state_addr, fingerprint, frozenset(fields))
+
+    def get_render_dependencies(
+        self, state_addr: StateAddress, fingerprint: bytes
+    ) -> frozenset[str] | None:
+        """Return the state fields read by a render of the component, if known."""
+        return self._render_dependencies.get(state_addr, fingerprint)
+
+    def _take_state_snapshot(
+        self, state_addr: StateAddress, state: Any
+    ) -> _StateSnapshot | None:
+        if not self.skip_unchanged_renders:
+            return None
+        fingerprint = self.get_state_fingerprint(state)
+        if not self.track_render_dependencies:
+            return _StateSnapshot(fingerprint)
+        dependencies = self.get_render_dependencies(state_addr, fingerprint)
+        if dependencies is None:
+            return _StateSnapshot(fingerprint)
+        return _StateSnapshot(
+            fingerprint, dependencies, self.get_field_fingerprints(state)
+        )
+
+    def _state_changed(self, state: Any, snapshot: _StateSnapshot | None) -> bool:
+        """Return True if the component has to re-render after the command."""
+        if snapshot is None:
+            return True
+        if self.get_state_fingerprint(state) == snapshot.fingerprint:
+            return False
+        if snapshot.dependencies is None or snapshot.field_fingerprints is None:
+            return True
+        before = snapshot.field_fingerprints
+        after = self.get_field_fingerprints(state)
+        changed_fields = {
+            name
+            for name in before.keys() | after.keys()
+            if before.get(name) != after.get(name)
+        }
+        if ALL_FIELDS in changed_fields:
+            return True
+        return not changed_fields.isdisjoint(snapshot.dependencies)
+
+    def get_session_size(self, session_id: str) -> int:
+        """Return the number of bytes stored in the session.
+
+        Counts states, contexts, and templates. Requires a store that tracks usage.
+        """
+        return sum(self.store.get_session_usage(session_id).values())
+
+    def enforce_session_quota(self, state_addr: StateAddress, state_size: int):
+        """Apply the quota policy if saving the state would exceed the quota."""
+        quota = self.session_quota
+        if quota is None:
+            return
+        usage = self.store.get_session_usage(state_addr.session_id)
+        old_state_size = usage.get(("states", state_addr.component_id), 0)
+        session_size = sum(usage.values()) - old_state_size + state_size
+        if session_size <= quota:
+            return
+
+        if self.session_quota_policy == QuotaPolicy.EVICT:
+            session_size = self._evict_components(
+                state_addr, usage, session_size, quota
+            )
+            if session_size <= quota:
+                return
+        elif self.session_quota_policy == QuotaPolicy.REJECT and in_interaction():
+            raise SessionQuotaExceeded(
+                f"Session {state_addr.session_id} would take {session_size} bytes, "
+                f"over the quota of {quota} bytes"
+            )
+        logger.warning(
+            "Session %s takes %d bytes, over the quota of %d bytes",
+            state_addr.session_id,
+            session_size,
+            quota,
+        )
+
+    def _evict_components(
+        self,
+        state_addr: StateAddress,
+        usage: dict[tuple[str, str], int],
+        session_size: int,
+        quota: int,
+    ) -> int:
+        """Delete the least recently saved components until the session fits.
+
+        The component being saved and its ancestors are never deleted. Return the
+        new session size.
+        """
+        component_sizes: dict[str, int] = {}
+        for (_, component_id), size in usage.items():
+            component_sizes[component_id] = component_sizes.get(component_id, 0) + size
+        evicted = []
+        for component_id, size in component_sizes.items():
+            if session_size <= quota:
+                break
+            if component_id == state_addr.component_id or (
+                state_addr.component_id.startswith(f"{component_id}{HIER_SEP}")
+            ):
+                continue
+            evicted.append(component_id)
+            session_size -= size
+        if evicted:
+            logger.warning(
+                "Evicting components of session %s over the quota: %r",
+                state_addr.session_id,
+                evicted,
+            )
+            self.delete_components(state_addr.session_id, evicted)
+        return session_size
 
     def get_component_context(self, state_addr: StateAddress) -> dict[str, Any]:
         raw_context = self.store.restore_context(state_addr)
@@ -188,47 +570,171 @@ class StateManager:
             if key not in DEFAULT_CONTEXT_IGNORE_KEYS and not key.startswith("_")
         }
 
+    @contextmanager
+    def collect_orphaned_components(self, state_addr: StateAddress) -> Iterator[None]:
+        """Delete the descendants of the component that weren't rendered in the block.
+
+        Does nothing unless gc_orphaned_components is enabled. If the block raises an
+        exception, nothing is deleted.
+        """
+        if not self.gc_orphaned_components:
+            yield
+            return
+        rendered_component_ids: set[str] = set()
+        token = _rendered_component_ids.set(rendered_component_ids)
+        try:
+            yield
+        finally:
+            _rendered_component_ids.reset(token)
+        self.delete_orphaned_components(state_addr, rendered_component_ids)
+
+    def record_rendered_component(self, state_addr: StateAddress):
+        """Mark the component as rendered for collect_orphaned_components()."""
+        rendered_component_ids = _rendered_component_ids.get()
+        if rendered_component_ids is not None:
+            rendered_component_ids.add(state_addr.component_id)
+
+    def delete_orphaned_components(
+        self, state_addr: StateAddress, rendered_component_ids: set[str]
+    ) -> set[str]:
+        """Delete the descendants of the component that are not among the rendered.
+
+        Return the IDs of the deleted components.
+        """
+        descendant_prefix = f"{state_addr.component_id}{HIER_SEP}"
+        orphaned_component_ids = {
+            component_id
+            for component_id in self.store.get_component_ids(state_addr.session_id)
+            if component_id.startswith(descendant_prefix)
+            and component_id not in rendered_component_ids
+        }
+        if orphaned_component_ids:
+            logger.debug(
+                "Deleting orphaned components of %r: %r",
+                state_addr.component_id,
+                orphaned_component_ids,
+            )
+            self.delete_components(state_addr.session_id, orphaned_component_ids)
+        return orphaned_component_ids
+
     def get_component_class(self, component_name: str) -> type["LiveComponent"]:
         return registry.get(component_name)
 
+    def start_coalesced_command(
+        self,
+        state_addr: StateAddress,
+        command_name: str,
+        kwargs: dict[str, Any] | None = None,
+    ) -> int:
+        """Take the sequence number of a request of a coalesced command.
+
+        For commands declared with `@command(coalesce=True)`, return the number
+        to pass to call_component_command(), which checks it before saving the
+        state. Return 0 for other commands and for stores that don't keep
+        command sequence numbers.
+
+        Commands declared with a `coalesce_window` wait for the window here. The
+        arguments are validated before the wait, so invalid requests are
+        rejected without holding a worker.
+
+        Raises:
+            InvalidCommandArguments: The arguments don't match the command.
+            CommandSuperseded: A newer request arrived during the window.
+        """
+        component_cls = self.get_component_class(state_addr.get_component_name())
+        command_info = component_cls.get_command_info(command_name)
+        if not command_info.coalesce:
+            return 0
+        command_info.validate_kwargs(kwargs or {})
+        command_key = f"{state_addr.component_id}:{command_name}"
+        sequence = self.store.next_command_sequence(state_addr.session_id, command_key)
+        if sequence and command_info.coalesce_window:
+            time.sleep(command_info.coalesce_window)
+            if self.is_command_superseded(state_addr, command_name, sequence):
+                raise CommandSuperseded(f"{state_addr}.{command_name}")
+        return sequence
+
+    def is_command_superseded(
+        self, state_addr: StateAddress, command_name: str, sequence: int
+    ) -> bool:
+        """Return True if a newer request of the coalesced command arrived.
+
+        The sequence is the one returned by start_coalesced_command().
+        """
+        if not sequence:
+            return False
+        command_key = f"{state_addr.component_id}:{command_name}"
+        return (
+            self.store.get_command_sequence(state_addr.session_id, command_key)
+            != sequence
+        )
+
     def call_component_command(
         self,
         request: HttpRequest,
         state_addr: StateAddress,
         command_name: str,
         kwargs: dict[str, Any] | None = None,
+        execution_results: ExecutionResults | None = None,
+        command_sequence: int = 0,
     ) -> CallContext:
+        """Call the command of the component and save the component state.
+
+        Pass execution_results to collect the results of several commands in one
+        container (see the call_commands view).
+
+        Pass the command_sequence returned by start_coalesced_command() to
+        coalesce the command: if a newer request of the command arrived while
+        it ran, CommandSuperseded is raised and none of the states that the
+        command changed are saved.
+        """
         component_cls = self.get_component_class(state_addr.get_component_name())
         component_instance = component_cls()
 
         sentry_arg = f"{component_instance.get_name()}.{command_name}"
-        with start_span(f"call_component_command({sentry_arg})"):
+        # Coalesced commands save the states in one go after the check, so a
+        # superseded request saves none of them, including those of other
+        # components that the command calls.
+        states = self.state_cache() if command_sequence else nullcontext()
+        with states, start_span(f"call_component_command({sentry_arg})"):
             set_span_data(
                 lc_component_id=state_addr.component_id,
                 lc_session_id=state_addr.session_id,
                 lc_component=component_instance.get_name(),
                 lc_command_name=command_name,
             )
+            # Reject unknown commands and invalid arguments before loading the state.
+            command_info = component_cls.get_command_info(command_name)
+            kwargs = command_info.validate_kwargs(kwargs or {})
+            command = command_info.bind(component_instance)
+
             # Delegate fetching the state to the component instance because it may
             # want to decide not to fetch the state from Redis.
             with start_span(f"get_state({sentry_arg})"):
                 state = component_instance.get_state(self, state_addr)
                 if state is None:
-                    raise ValueError(f"Component state not found: {state_addr}")
+                    raise ComponentStateNotFound(
+                        f"Component state not found: {state_addr}"
+                    )
 
-            command = component_instance.get_command(command_name)
             call_context: CallContext = CallContext(
                 request=request,
                 state=state,
                 state_address=state_addr,
                 state_manager=self,
+                execution_results=execution_results or ExecutionResults(),
             )
+            snapshot = self._take_state_snapshot(state_addr, state)
             with start_span(f"run_command({sentry_arg})"):
-                returned_value = command(call_context, **(kwargs or {}))
+                returned_value = command(call_context, **kwargs)
             with start_span(f"process_returned_value({sentry_arg})"):
                 call_context.execution_results.process_returned_value(
-                    state_addr, returned_value
+                    state_addr,
+                    returned_value,
+                    state_changed=self._state_changed(state, snapshot),
                 )
+            if self.is_command_superseded(state_addr, command_name, command_sequence):
+                raise CommandSuperseded(f"{state_addr}.{command_name}")
 
             # Delegate saving the state to the component instance
             # because it may want to decide not to save it.
@@ -243,16 +749,14 @@ class StateManager:
         command_name: str,
         kwargs: dict[str, Any] | None = None,
     ):
-        state_addr = call_context.state_address.model_copy(
-            update={"component_id": component_id}
-        )
+        state_addr = call_context.state_address.with_component_id(component_id)
         component_cls = self.get_component_class(state_addr.get_component_name())
         component_instance = component_cls()
+        command = component_instance.get_command(command_name)
 
         state = self.get_component_state(state_addr)
         if state is None:
-            raise ValueError(f"Component state not found: {state_addr}")
-        command = component_instance.get_command(command_name)
+            raise ComponentStateNotFound(f"Component state not found: {state_addr}")
         updated_call_context: CallContext = CallContext(
             request=call_context.request,
             state=state,
@@ -261,12 +765,34 @@ class StateManager:
             execution_results=call_context.execution_results,
         )
 
+        snapshot = self._take_state_snapshot(state_addr, state)
         returned_value = command(updated_call_context, **(kwargs or {}))
         updated_call_context.execution_results.process_returned_value(
-            state_addr, returned_value
+            state_addr,
+            returned_value,
+            state_changed=self._state_changed(state, snapshot),
         )
 
         self.set_component_state(state_addr, state)
 
+    @contextmanager
+    def interaction(self) -> Iterator[None]:
+        """Mark the block as handling a command sent by the user.
+
+        Sessions that started with a short initial TTL get the full TTL.
+        """
+        with self.store.interaction():
+            yield
+
     def clear_session(self, session_id: str):
         self.store.clear_session(session_id=session_id)
+
+    def clear_sessions(self, session_ids: list[str]):
+        self.store.clear_sessions(session_ids)
+
+    def warm_up(self):
+        """Prepare the state store to serve requests.
+
+        Call it from the worker initialization hook of your application server.
+        """
+        self.store.warm_up()
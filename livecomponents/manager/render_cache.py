@@ -0,0 +1,138 @@
+import abc
+import datetime
+import os
+import threading
+from collections import Counter, OrderedDict
+
+from django.core.cache import BaseCache, caches
+
+
+class IRenderCache(abc.ABC):
+    """Cache of the rendered HTML of components with `cache_render = True`.
+
+    Keys are built by LiveComponent.get_render_cache_key(). Every cache counts
+    "hits", "misses", and "sets" in `metrics`.
+    """
+
+    metrics: Counter[str]
+
+    @abc.abstractmethod
+    def get(self, key: str) -> str | None:
+        ...
+
+    @abc.abstractmethod
+    def set(self, key: str, html: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class MemoryRenderCache(IRenderCache):
+    """Render cache in the memory of the process.
+
+    The least recently used entries are evicted first, and the evictions are
+    counted in `metrics["evictions"]`. The cache is thread-safe.
+
+    Args:
+        max_entries: Maximum number of cached fragments.
+        max_bytes: Maximum total length of the cached HTML in characters.
+            By default, only the number of entries is limited.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int | None = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.metrics: Counter[str] = Counter()
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.metrics["hits"] += 1
+            return html
+
+    def set(self, key: str, html: str) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= len(previous)
+            self._entries[key] = html
+            self._total_bytes += len(html)
+            self.metrics["sets"] += 1
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None
+                and self._total_bytes > self.max_bytes
+                and self._entries
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= len(evicted)
+                self.metrics["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+
+class DjangoCacheRenderCache(IRenderCache):
+    """Render cache on top of a Django cache backend (the CACHES setting).
+
+    The cache is shared between processes. Eviction is up to the cache backend.
+
+    Fragments are tagged with a generation token kept in one more key, which is
+    fetched together with the fragment. `clear` replaces the token, so the other
+    entries of the cache are left alone, and the old fragments expire on their own.
+
+    Args:
+        cache_alias: Alias of the cache in the CACHES setting.
+        key_prefix: Prefix for cache keys.
+        timeout: Time-to-live for cached fragments.
+    """
+
+    def __init__(
+        self,
+        cache_alias: str = "default",
+        key_prefix: str = "lc:html:",
+        timeout: datetime.timedelta = datetime.timedelta(hours=1),
+    ):
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+        self.timeout = timeout
+        self.metrics: Counter[str] = Counter()
+
+    @property
+    def cache(self) -> BaseCache:
+        # Django keeps a separate cache connection for every thread.
+        return caches[self.cache_alias]
+
+    def get(self, key: str) -> str | None:
+        generation_key = self._get_generation_key()
+        values = self.cache.get_many([generation_key, self.key_prefix + key])
+        generation, html = values.get(self.key_prefix + key, (None, None))
+        if generation != values.get(generation_key, ""):
+            html = None
+        self.metrics["hits" if html is not None else "misses"] += 1
+        return html
+
+    def set(self, key: str, html: str) -> None:
+        generation = self.cache.get(self._get_generation_key(), "")
+        self.cache.set(
+            self.key_prefix + key,
+            (generation, html),
+            timeout=self.timeout.total_seconds(),
+        )
+        self.metrics["sets"] += 1
+
+    def clear(self) -> None:
+        self.cache.set(self._get_generation_key(), os.urandom(8).hex(), None)
+
+    def _get_generation_key(self) -> str:
+        return f"{self.key_prefix}generation"
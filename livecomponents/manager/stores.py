@@ -1,11 +1,41 @@
 import abc
 import base64
+import bisect
 import datetime
 import hashlib
+import os
+import random
+import shutil
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+import weakref
+from collections import Counter, OrderedDict
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import StrEnum
+from typing import Any
 
-from redis import Redis
+from django.core.cache import BaseCache, caches
+from redis import ConnectionPool, Redis
+from redis.client import Pipeline
+from redis.connection import Connection
 
-from livecomponents.types import StateAddress
+from livecomponents.logging import logger
+from livecomponents.types import ComponentId, StateAddress
+
+# True while the store handles a command sent by the user. See
+# IStateStore.interaction().
+_in_interaction: ContextVar[bool] = ContextVar("_in_interaction", default=False)
+
+
+def in_interaction() -> bool:
+    """Return True if the current request handles a command sent by the user."""
+    return _in_interaction.get()
 
 
 class IStateStore(abc.ABC):
@@ -51,185 +81,2388 @@ class IStateStore(abc.ABC):
     def clear_all_sessions(self) -> None:
         ...
 
+    def clear_sessions(self, session_ids: Iterable[str]) -> None:
+        """Schedule several sessions for deletion, same as clear_session()."""
+        for session_id in session_ids:
+            self.clear_session(session_id)
+
+    def warm_up(self) -> None:
+        """Prepare the store to serve requests, e.g., open connections in advance.
+
+        Called explicitly, usually from the worker initialization hook of the
+        application server. Does nothing by default.
+        """
+        pass
+
+    @contextmanager
+    def interaction(self) -> Iterator[None]:
+        """Mark the block as handling a command sent by the user.
+
+        Stores with a shorter TTL for new sessions (see `ttl_initial` of
+        RedisStateStore) extend the session to the full TTL inside the block.
+        """
+        token = _in_interaction.set(True)
+        try:
+            yield
+        finally:
+            _in_interaction.reset(token)
+
+    def get_session_ids(self) -> Iterator[str]:
+        """Iterate over the IDs of all stored sessions."""
+        raise NotImplementedError(f"{type(self).__name__} can't list sessions")
+
+    def get_component_ids(self, session_id: str) -> set[str]:
+        """Return the IDs of all components stored in the session."""
+        raise NotImplementedError(f"{type(self).__name__} can't list components")
+
+    def delete_components(self, session_id: str, component_ids: Iterable[str]) -> None:
+        """Delete states, contexts, and templates of the session's components."""
+        raise NotImplementedError(f"{type(self).__name__} can't delete components")
+
+    @property
+    def tracks_usage(self) -> bool:
+        """Whether the store supports get_session_usage()."""
+        return False
+
+    def get_session_usage(self, session_id: str) -> dict[tuple[str, str], int]:
+        """Return the sizes of the values stored in the session, in bytes.
+
+        The keys are (key type, component ID) pairs, where the key type is
+        "states", "contexts", or "templates". The values are ordered from the
+        least to the most recently saved.
+        """
+        raise NotImplementedError(f"{type(self).__name__} doesn't track usage")
+
+    def next_command_sequence(self, session_id: str, command_key: str) -> int:
+        """Increment and return the sequence number of the command in the session.
+
+        Used to coalesce commands, see `@command(coalesce=...)`. Stores that don't
+        keep sequence numbers return 0, and the commands are not coalesced.
+        """
+        return 0
+
+    def get_command_sequence(self, session_id: str, command_key: str) -> int:
+        """Return the last sequence number of the command in the session."""
+        return 0
+
+
+class _MemorySession:
+    """Data of one session in MemoryStateStore."""
+
+    __slots__ = (
+        "states",
+        "contexts",
+        "templates",
+        "expires_at",
+        "size",
+        "usage",
+        "sequences",
+    )
+
+    def __init__(self) -> None:
+        self.states: dict[str, bytes] = {}
+        self.contexts: dict[str, bytes] = {}
+        self.templates: dict[str, bytes] = {}
+        self.expires_at = 0.0
+        self.size = 0
+        # (key type, component ID) -> value size, the least recently saved first
+        self.usage: dict[tuple[str, str], int] = {}
+        # Command key -> the last sequence number, see next_command_sequence()
+        self.sequences: dict[str, int] = {}
+
 
 class MemoryStateStore(IStateStore):
-    """In-memory state store. Suitable for tests."""
+    """In-memory state store.
+
+    Suitable for tests and for single-process deployments that don't want to run
+    Redis. The store is thread-safe. The data is not shared between processes.
+
+    Sessions expire the same way as in RedisStateStore: every access to a session
+    extends its lifetime to `ttl`, and `clear_session` schedules the session
+    for deletion in `ttl_gc`.
+
+    Args:
+        ttl: Time-to-live for sessions. See RedisStateStore.
+        ttl_gc: Time-to-live for sessions after "clear_session". See RedisStateStore.
+        max_bytes: Upper limit for the total size of the stored data. When the limit
+            is exceeded, the least recently used sessions are deleted. Only the
+            sizes of component IDs and stored values are counted, so the actual
+            memory usage is higher. By default, the size is not limited.
+    """
+
+    def __init__(
+        self,
+        ttl: datetime.timedelta = datetime.timedelta(days=1),
+        ttl_gc: datetime.timedelta = datetime.timedelta(hours=1),
+        max_bytes: int | None = None,
+    ):
+        self.ttl = ttl
+        self.ttl_gc = ttl_gc
+        self.max_bytes = max_bytes
+        # Sessions in the order of access, the least recently used first.
+        self._sessions: OrderedDict[str, _MemorySession] = OrderedDict()
+        # Sessions scheduled for deletion by "clear_session", in the order of calls.
+        # As ttl_gc is the same for all of them, it's also the order of expiration.
+        self._cleared_sessions: OrderedDict[str, None] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
 
-    def __init__(self):
-        self._store: dict[StateAddress, bytes] = {}
-        self._context: dict[StateAddress, bytes] = {}
-        self._components: dict[StateAddress, bytes] = {}
+    @property
+    def tracks_usage(self) -> bool:
+        return True
+
+    @property
+    def total_bytes(self) -> int:
+        """Total size of the stored component IDs and values."""
+        return self._total_bytes
 
     def session_exists(self, session_id: str) -> bool:
-        return any(
-            state_addr.session_id == session_id for state_addr in self._store.keys()
-        )
+        with self._lock:
+            session = self._find_session(session_id)
+            return session is not None and bool(session.states)
 
     def component_initialized(self, state_addr: StateAddress) -> bool:
-        return state_addr in self._store
+        with self._lock:
+            session = self._find_session(state_addr.session_id)
+            return session is not None and state_addr.component_id in session.states
 
     def save_state(self, state_addr: StateAddress, raw_state: bytes) -> None:
-        self._store[state_addr] = raw_state
+        self._save(state_addr, "states", raw_state)
 
     def restore_state(self, state_addr: StateAddress) -> bytes | None:
-        return self._store.get(state_addr)
+        return self._restore(state_addr, "states")
 
     def save_context(self, state_addr: StateAddress, raw_context: bytes) -> None:
-        self._context[state_addr] = raw_context
+        self._save(state_addr, "contexts", raw_context)
 
     def restore_context(self, state_addr: StateAddress) -> bytes | None:
-        return self._context.get(state_addr)
+        return self._restore(state_addr, "contexts")
 
     def save_component_template(
         self, state_addr: StateAddress, html_bytes: bytes
     ) -> None:
-        self._components[state_addr] = html_bytes
+        self._save(state_addr, "templates", html_bytes)
 
     def restore_component_template(self, state_addr: StateAddress) -> bytes | None:
-        return self._components.get(state_addr)
+        return self._restore(state_addr, "templates")
 
     def clear_session(self, session_id: str) -> None:
-        for state_addr in list(self._store.keys()):
-            if state_addr.session_id == session_id:
-                del self._store[state_addr]
-        for state_addr in list(self._context.keys()):
-            if state_addr.session_id == session_id:
-                del self._context[state_addr]
-        for state_addr in list(self._components.keys()):
-            if state_addr.session_id == session_id:
-                del self._components[state_addr]
+        with self._lock:
+            session = self._find_session(session_id)
+            if session is None:
+                return
+            # Same as in RedisStateStore, delete the session later in case the
+            # client comes back. Until then, evict it first if memory is short.
+            session.expires_at = time.monotonic() + self.ttl_gc.total_seconds()
+            self._cleared_sessions[session_id] = None
+            self._cleared_sessions.move_to_end(session_id)
 
     def clear_all_sessions(self) -> None:
-        self._store.clear()
-        self._context.clear()
-        self._components.clear()
+        with self._lock:
+            self._sessions.clear()
+            self._cleared_sessions.clear()
+            self._total_bytes = 0
 
+    def get_session_ids(self) -> Iterator[str]:
+        with self._lock:
+            self._delete_expired_sessions()
+            session_ids = list(self._sessions)
+        yield from session_ids
 
-class RedisStateStore(IStateStore):
-    """Redis-based state store.
+    def get_component_ids(self, session_id: str) -> set[str]:
+        with self._lock:
+            session = self._find_session(session_id)
+            if session is None:
+                return set()
+            return {*session.states, *session.contexts, *session.templates}
+
+    def delete_components(self, session_id: str, component_ids: Iterable[str]) -> None:
+        with self._lock:
+            session = self._find_session(session_id)
+            if session is None:
+                return
+            for component_id in component_ids:
+                for key_type in ("states", "contexts", "templates"):
+                    value = getattr(session, key_type).pop(component_id, None)
+                    if value is not None:
+                        self._add_size(session, -len(component_id) - len(value))
+                        del session.usage[(key_type, component_id)]
+
+    def get_session_usage(self, session_id: str) -> dict[tuple[str, str], int]:
+        with self._lock:
+            session = self._find_session(session_id)
+            return dict(session.usage) if session is not None else {}
+
+    def next_command_sequence(self, session_id: str, command_key: str) -> int:
+        with self._lock:
+            session = self._find_session(session_id)
+            if session is None:
+                return 0
+            sequence = session.sequences.get(command_key, 0) + 1
+            session.sequences[command_key] = sequence
+            return sequence
+
+    def get_command_sequence(self, session_id: str, command_key: str) -> int:
+        with self._lock:
+            session = self._find_session(session_id)
+            if session is None:
+                return 0
+            return session.sequences.get(command_key, 0)
+
+    def _save(self, state_addr: StateAddress, key_type: str, value: bytes) -> None:
+        with self._lock:
+            session = self._touch_session(state_addr.session_id)
+            values: dict[str, bytes] = getattr(session, key_type)
+            component_id = state_addr.component_id
+            old_value = values.get(component_id)
+            if old_value is not None:
+                self._add_size(session, -len(component_id) - len(old_value))
+            values[component_id] = value
+            self._add_size(session, len(component_id) + len(value))
+            session.usage.pop((key_type, component_id), None)
+            session.usage[(key_type, component_id)] = len(value)
+            self._evict_sessions()
+
+    def _restore(self, state_addr: StateAddress, key_type: str) -> bytes | None:
+        with self._lock:
+            session = self._find_session(state_addr.session_id)
+            if session is None:
+                return None
+            self._sessions.move_to_end(state_addr.session_id)
+            self._cleared_sessions.pop(state_addr.session_id, None)
+            session.expires_at = time.monotonic() + self.ttl.total_seconds()
+            return getattr(session, key_type).get(state_addr.component_id)
+
+    def _find_session(self, session_id: str) -> _MemorySession | None:
+        """Return the session if it exists and has not expired."""
+        session = self._sessions.get(session_id)
+        if session is not None and session.expires_at <= time.monotonic():
+            self._delete_session(session_id)
+            return None
+        return session
+
+    def _touch_session(self, session_id: str) -> _MemorySession:
+        """Return the session, create it if necessary, and extend its lifetime."""
+        session = self._find_session(session_id)
+        if session is None:
+            self._delete_expired_sessions()
+            session = _MemorySession()
+            self._sessions[session_id] = session
+        else:
+            self._sessions.move_to_end(session_id)
+            self._cleared_sessions.pop(session_id, None)
+        session.expires_at = time.monotonic() + self.ttl.total_seconds()
+        return session
+
+    def _delete_session(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id)
+        self._cleared_sessions.pop(session_id, None)
+        self._total_bytes -= session.size
+
+    def _add_size(self, session: _MemorySession, size: int) -> None:
+        session.size += size
+        self._total_bytes += size
+
+    def _delete_expired_sessions(self) -> None:
+        """Delete expired sessions.
+
+        Every access extends the session's lifetime to the same TTL, so sessions
+        expire in the order of access, and cleared sessions expire in the order of
+        clearing. Both queues are checked from the front only.
+        """
+        now = time.monotonic()
+        for queue in (self._cleared_sessions, self._sessions):
+            while queue:
+                session_id = next(iter(queue))
+                if self._sessions[session_id].expires_at > now:
+                    break
+                self._delete_session(session_id)
+
+    def _evict_sessions(self) -> None:
+        """Delete the least recently used sessions to fit into max_bytes.
+
+        The most recently used session, which is being written to, is never evicted.
+        """
+        if self.max_bytes is None:
+            return
+        while self._total_bytes > self.max_bytes and len(self._sessions) > 1:
+            session_id = next(iter(self._cleared_sessions or self._sessions))
+            logger.debug("Evicting session %s from memory state store", session_id)
+            self._delete_session(session_id)
+
+
+def _get_default_shared_memory_directory() -> str:
+    base_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base_dir, "livecomponents")
+
+
+class SharedMemoryStateStore(IStateStore):
+    """State store that shares the data between processes of a single host.
+
+    The data is kept in files in a directory on a memory-backed file system
+    (/dev/shm by default), so the workers of one application server can share
+    sessions without running Redis, and the sessions survive worker restarts.
+
+    Every stored value is a separate file, written to a temporary file first and
+    then atomically renamed, so readers never see a partially written value.
+    Cached templates are stored once per template, the same way as in
+    RedisStateStore.
+
+    Sessions expire the same way as in RedisStateStore: every access to a session
+    extends its lifetime to `ttl`, and `clear_session` schedules the session
+    for deletion in `ttl_gc`. Expired sessions are deleted by the process that
+    first notices that `gc_interval` has passed. A file lock makes sure that only
+    one process collects garbage at a time.
+
+    The store relies on POSIX file locks and doesn't work on Windows.
 
     Args:
-        redis_url: URL of the Redis server.
-        state_prefix: Prefix for keys that store component states.
-        context_prefix: Prefix for keys that store component contexts.
-        templates_prefix: Prefix for keys that store component templates.
-        template_cache_prefix: Prefix for keys that store cached component templates.
-        ttl: Time-to-live for session keys. Each time the session is accessed, the TTL
-            is reset. If the session is not accessed for this time, it is deleted, and
-            subsequent accesses will result in a "Session not found" error and a 410
-            status code in the response. How this status is handled is up to the
-            client. There is no default behavior, but the client can choose to reload
-            the page, for example.
-        ttl_gc: Time-to-live for garbage collection. This TTL is lower than the session
-            TTL, and it's set for sessions scheduled for deletion in response to
-            a "clear_session" call. We don't delete the session immediately in case the
-            client decides to access the page again when clicking the back button,
-            for example.
+        directory: Directory for the data. All processes that share sessions must
+            use the same directory. It's created if it doesn't exist.
+        ttl: Time-to-live for sessions. See RedisStateStore.
+        ttl_gc: Time-to-live for sessions after "clear_session". See RedisStateStore.
+        gc_interval: How often to delete expired sessions and templates.
     """
 
     def __init__(
         self,
-        redis_url: str = "redis://localhost:6379/0",
-        state_prefix: str = "lc:states:",
-        context_prefix: str = "lc:ctxs:",
-        templates_prefix: str = "lc:templates:",
-        template_cache_prefix: str = "lc:template_cache:",
+        directory: str | None = None,
         ttl: datetime.timedelta = datetime.timedelta(days=1),
         ttl_gc: datetime.timedelta = datetime.timedelta(hours=1),
+        gc_interval: datetime.timedelta = datetime.timedelta(minutes=1),
     ):
-        self.client = Redis.from_url(redis_url)  # type: ignore
-        self.key_prefix = state_prefix
-        self.context_prefix = context_prefix
-        self.templates_prefix = templates_prefix
-        self.template_cache_prefix = template_cache_prefix
+        self.directory = directory or _get_default_shared_memory_directory()
         self.ttl = ttl
         self.ttl_gc = ttl_gc
+        self.gc_interval = gc_interval
+        self._sessions_dir = os.path.join(self.directory, "sessions")
+        self._template_cache_dir = os.path.join(self.directory, "template_cache")
+        self._last_gc = time.time()
+        os.makedirs(self._sessions_dir, exist_ok=True)
+        os.makedirs(self._template_cache_dir, exist_ok=True)
 
     def session_exists(self, session_id: str) -> bool:
-        key_name = self._get_key_name(self.key_prefix, session_id)
-        return bool(self.client.exists(key_name))
+        if not self._session_alive(session_id):
+            return False
+        states_dir = os.path.join(self._get_session_dir(session_id), "states")
+        try:
+            with os.scandir(states_dir) as entries:
+                return any(True for _ in entries)
+        except FileNotFoundError:
+            return False
 
     def component_initialized(self, state_addr: StateAddress) -> bool:
-        key_name = self._get_key_name(self.key_prefix, state_addr.session_id)
-        return self.client.hexists(key_name, state_addr.component_id)
+        return self._session_alive(state_addr.session_id) and os.path.exists(
+            self._get_component_path(state_addr, "states")
+        )
 
     def save_state(self, state_addr: StateAddress, raw_state: bytes) -> None:
-        return self._save_by_prefix(state_addr, self.key_prefix, raw_state)
+        self._save(state_addr, "states", raw_state)
 
     def restore_state(self, state_addr: StateAddress) -> bytes | None:
-        return self._restore_by_prefix(state_addr, self.key_prefix)
+        return self._restore(state_addr, "states")
 
     def save_context(self, state_addr: StateAddress, raw_context: bytes) -> None:
-        return self._save_by_prefix(state_addr, self.context_prefix, raw_context)
+        self._save(state_addr, "contexts", raw_context)
 
     def restore_context(self, state_addr: StateAddress) -> bytes | None:
-        return self._restore_by_prefix(state_addr, self.context_prefix)
-
-    def _save_by_prefix(
-        self, state_addr: StateAddress, prefix: str, raw_state: bytes
-    ) -> None:
-        key_name = self._get_key_name(prefix, state_addr.session_id)
-        with self.client.pipeline() as pipe:
-            pipe.hset(key_name, state_addr.component_id, raw_state)
-            pipe.expire(key_name, self.ttl)
-            pipe.execute()
-
-    def _restore_by_prefix(self, state_addr: StateAddress, prefix: str) -> bytes | None:
-        key_name = self._get_key_name(prefix, state_addr.session_id)
-        with self.client.pipeline() as pipe:
-            pipe.hget(key_name, state_addr.component_id)
-            pipe.expire(key_name, self.ttl)
-            raw_state, _ = pipe.execute()
-        return raw_state
+        return self._restore(state_addr, "contexts")
 
     def save_component_template(
         self, state_addr: StateAddress, html_bytes: bytes
     ) -> None:
-        """Save serialized LiveComponentNode to Redis.
+        hashed_value = hashlib.sha1(html_bytes).hexdigest()
+        cache_path = os.path.join(self._template_cache_dir, hashed_value)
+        try:
+            # Templates are immutable. Only extend the lifetime of the cached one.
+            os.utime(cache_path)
+        except FileNotFoundError:
+            self._write_file(cache_path, html_bytes)
+        self._save(state_addr, "templates", hashed_value.encode("ascii"))
 
-        Because live component nodes repeat themselves often, we cache them
-        separately to avoid storing the same data multiple times.
+    def restore_component_template(self, state_addr: StateAddress) -> bytes | None:
+        hashed_value = self._restore(state_addr, "templates")
+        if hashed_value is None:
+            return None
+        return self._read_file(
+            os.path.join(self._template_cache_dir, hashed_value.decode("ascii"))
+        )
+
+    def clear_session(self, session_id: str) -> None:
+        # Move the last access time back, so that the session expires in ttl_gc.
+        access_time = (
+            time.time() - self.ttl.total_seconds() + self.ttl_gc.total_seconds()
+        )
+        try:
+            os.utime(self._get_session_file(session_id), (access_time, access_time))
+        except FileNotFoundError:
+            pass
+
+    def clear_all_sessions(self) -> None:
+        shutil.rmtree(self._sessions_dir, ignore_errors=True)
+        shutil.rmtree(self._template_cache_dir, ignore_errors=True)
+        os.makedirs(self._sessions_dir, exist_ok=True)
+        os.makedirs(self._template_cache_dir, exist_ok=True)
+
+    def get_session_ids(self) -> Iterator[str]:
+        with os.scandir(self._sessions_dir) as entries:
+            session_files = [os.path.join(entry.path, "session") for entry in entries]
+        for session_file in session_files:
+            raw_session_id = self._read_file(session_file)
+            if raw_session_id is not None:
+                session_id = raw_session_id.decode("utf-8")
+                if self._session_alive(session_id):
+                    yield session_id
+
+    def get_component_ids(self, session_id: str) -> set[str]:
+        if not self._session_alive(session_id):
+            return set()
+        session_dir = self._get_session_dir(session_id)
+        component_ids = set()
+        for key_type in ("states", "contexts", "templates"):
+            try:
+                with os.scandir(os.path.join(session_dir, key_type)) as entries:
+                    paths = [entry.path for entry in entries]
+            except FileNotFoundError:
+                continue
+            for path in paths:
+                content = self._read_file(path)
+                if content is not None:
+                    component_ids.add(self._unpack(content)[0])
+        return component_ids
+
+    def delete_components(self, session_id: str, component_ids: Iterable[str]) -> None:
+        for component_id in component_ids:
+            state_addr = StateAddress(
+                session_id=session_id, component_id=ComponentId(component_id)
+            )
+            for key_type in ("states", "contexts", "templates"):
+                try:
+                    os.unlink(self._get_component_path(state_addr, key_type))
+                except FileNotFoundError:
+                    pass
+
+    def collect_garbage(self) -> None:
+        """Delete expired sessions and cached templates.
+
+        Does nothing if another process is collecting garbage at the moment.
         """
-        hashed_value = self._get_hashed_value(html_bytes)
-        cache_key = self._get_key_name(self.template_cache_prefix, hashed_value)
-        nodes_key = self._get_key_name(self.templates_prefix, state_addr.session_id)
-        with self.client.pipeline() as pipe:
-            pipe.set(cache_key, html_bytes)
-            pipe.expire(cache_key, self.ttl)
+        import fcntl
 
-            pipe.hset(nodes_key, state_addr.component_id, hashed_value)
-            pipe.expire(nodes_key, self.ttl)
-            pipe.execute()
+        lock_path = os.path.join(self.directory, "gc.lock")
+        with open(lock_path, "wb") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+            now = time.time()
+            ttl = self.ttl.total_seconds()
+            with os.scandir(self._sessions_dir) as entries:
+                session_dirs = [entry.path for entry in entries]
+            for session_dir in session_dirs:
+                try:
+                    access_time = os.stat(os.path.join(session_dir, "session")).st_mtime
+                except FileNotFoundError:
+                    access_time = 0
+                if access_time + ttl <= now:
+                    shutil.rmtree(session_dir, ignore_errors=True)
+            with os.scandir(self._template_cache_dir) as entries:
+                for entry in entries:
+                    try:
+                        if entry.stat().st_mtime + ttl <= now:
+                            os.unlink(entry.path)
+                    except FileNotFoundError:
+                        pass
+
+    def _save(self, state_addr: StateAddress, key_type: str, value: bytes) -> None:
+        self._touch_session(state_addr.session_id)
+        path = self._get_component_path(state_addr, key_type)
+        self._write_file(path, self._pack(state_addr.component_id, value))
+        self._maybe_collect_garbage()
+
+    def _restore(self, state_addr: StateAddress, key_type: str) -> bytes | None:
+        session_file = self._get_session_file(state_addr.session_id)
+        try:
+            if self._is_expired(os.stat(session_file).st_mtime):
+                return None
+            os.utime(session_file)
+        except FileNotFoundError:
+            return None
+        content = self._read_file(self._get_component_path(state_addr, key_type))
+        if content is None:
+            return None
+        component_id, value = self._unpack(content)
+        if component_id != state_addr.component_id:
+            return None
+        return value
+
+    def _touch_session(self, session_id: str) -> None:
+        """Extend the session's lifetime. Start a new session if it's expired."""
+        session_file = self._get_session_file(session_id)
+        try:
+            if not self._is_expired(os.stat(session_file).st_mtime):
+                os.utime(session_file)
+                return
+            # Same as an expired Redis key: the new session starts empty.
+            shutil.rmtree(self._get_session_dir(session_id), ignore_errors=True)
+        except FileNotFoundError:
+            pass
+        self._write_file(session_file, session_id.encode("utf-8"))
+
+    def _session_alive(self, session_id: str) -> bool:
+        try:
+            access_time = os.stat(self._get_session_file(session_id)).st_mtime
+        except FileNotFoundError:
+            return False
+        return not self._is_expired(access_time)
+
+    def _is_expired(self, access_time: float) -> bool:
+        return access_time + self.ttl.total_seconds() <= time.time()
+
+    def _maybe_collect_garbage(self) -> None:
+        if time.time() - self._last_gc < self.gc_interval.total_seconds():
+            return
+        self._last_gc = time.time()
+        self.collect_garbage()
+
+    def _get_session_dir(self, session_id: str) -> str:
+        # Session IDs come from requests, so we never use them in paths as is.
+        session_hash = hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+        return os.path.join(self._sessions_dir, session_hash)
+
+    def _get_session_file(self, session_id: str) -> str:
+        """Return the path of the file with the session ID.
+
+        The file's modification time is the time of the last session access.
+        """
+        return os.path.join(self._get_session_dir(session_id), "session")
+
+    def _get_component_path(self, state_addr: StateAddress, key_type: str) -> str:
+        component_hash = hashlib.sha1(state_addr.component_id.encode("utf-8"))
+        return os.path.join(
+            self._get_session_dir(state_addr.session_id),
+            key_type,
+            component_hash.hexdigest(),
+        )
+
+    @staticmethod
+    def _pack(component_id: str, value: bytes) -> bytes:
+        raw_component_id = component_id.encode("utf-8")
+        return struct.pack(">H", len(raw_component_id)) + raw_component_id + value
+
+    @staticmethod
+    def _unpack(content: bytes) -> tuple[str, bytes]:
+        (length,) = struct.unpack_from(">H", content)
+        return content[2 : 2 + length].decode("utf-8"), content[2 + length :]
+
+    @staticmethod
+    def _read_file(path: str) -> bytes | None:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _write_file(path: str, content: bytes) -> None:
+        """Write the file atomically. Create the parent directories if necessary."""
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            f = open(tmp_path, "wb")
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            f = open(tmp_path, "wb")
+        with f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lc_sessions (
+    session_id TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lc_sessions_expires_at ON lc_sessions (expires_at);
+CREATE TABLE IF NOT EXISTS lc_values (
+    session_id TEXT NOT NULL,
+    key_type TEXT NOT NULL,
+    component_id TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (session_id, key_type, component_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS lc_template_cache (
+    hashed_value TEXT PRIMARY KEY,
+    html BLOB NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class SQLiteStateStore(IStateStore):
+    """State store that keeps the data in an SQLite database.
+
+    Use it for single-host deployments that don't want to run Redis. All
+    processes that share sessions must use the same database file on a local
+    file system.
+
+    The database runs in WAL mode, so readers don't block the writer. Every
+    thread uses its own connection, and the connections cache the prepared
+    statements. Cached templates are stored once per template, the same way as
+    in RedisStateStore.
+
+    Inside `write_batch()`, and so inside `interaction()`, states, contexts, and
+    templates are buffered and written in one transaction at the end of the
+    block. Reads in the block see the buffered values. Outside of it, every
+    write is a separate transaction.
+
+    Sessions expire the same way as in RedisStateStore: every access to a session
+    extends its lifetime to `ttl`, and `clear_session` schedules the session
+    for deletion in `ttl_gc`. To keep reads from writing to the database, the
+    lifetime is extended at most once per `touch_interval`. Expired sessions are
+    deleted by a background thread every `gc_interval`.
+
+    Args:
+        path: Path of the database file. It's created if it doesn't exist.
+        ttl: Time-to-live for sessions. See RedisStateStore.
+        ttl_gc: Time-to-live for sessions after "clear_session". See RedisStateStore.
+        touch_interval: How often reads extend the session lifetime.
+        gc_interval: How often to delete expired sessions and templates. If None,
+            call collect_garbage() yourself.
+        timeout: How many seconds to wait for the database lock.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        ttl: datetime.timedelta = datetime.timedelta(days=1),
+        ttl_gc: datetime.timedelta = datetime.timedelta(hours=1),
+        touch_interval: datetime.timedelta = datetime.timedelta(minutes=1),
+        gc_interval: datetime.timedelta | None = datetime.timedelta(minutes=1),
+        timeout: float = 5.0,
+    ):
+        self.path = path or os.path.join(
+            tempfile.gettempdir(), "livecomponents.sqlite3"
+        )
+        self.ttl = ttl
+        self.ttl_gc = ttl_gc
+        self.touch_interval = touch_interval
+        self.gc_interval = gc_interval
+        self.timeout = timeout
+        self._local = threading.local()
+        self._gc_thread_pid: int | None = None
+        self._get_connection().executescript(_SQLITE_SCHEMA)
+
+    @contextmanager
+    def interaction(self) -> Iterator[None]:
+        with super().interaction(), self.write_batch():
+            yield
+
+    @contextmanager
+    def write_batch(self) -> Iterator[None]:
+        """Buffer the writes of the block and save them in one transaction.
+
+        The buffered writes are saved when the block exits, even if it raises.
+        Nested blocks join the outer one.
+        """
+        if self._get_pending_writes() is not None:
+            yield
+            return
+        self._local.pending_writes = _SQLitePendingWrites()
+        try:
+            yield
+        finally:
+            try:
+                self._flush_pending_writes()
+            finally:
+                self._local.pending_writes = None
+
+    def session_exists(self, session_id: str) -> bool:
+        pending = self._get_pending_writes()
+        if pending is not None and any(
+            key[0] == session_id and key[1] == "states" for key in pending.values
+        ):
+            return True
+        row = self._get_connection().execute(
+            "SELECT 1 FROM lc_sessions s JOIN lc_values v USING (session_id) "
+            "WHERE s.session_id = ? AND s.expires_at > ? AND v.key_type = 'states' "
+            "LIMIT 1",
+            (session_id, time.time()),
+        )
+        return row.fetchone() is not None
+
+    def component_initialized(self, state_addr: StateAddress) -> bool:
+        pending = self._get_pending_writes()
+        if pending is not None and (
+            _sqlite_value_key(state_addr, "states") in pending.values
+        ):
+            return True
+        row = self._get_connection().execute(
+            "SELECT 1 FROM lc_sessions s JOIN lc_values v USING (session_id) "
+            "WHERE s.session_id = ? AND s.expires_at > ? AND v.key_type = 'states' "
+            "AND v.component_id = ?",
+            (state_addr.session_id, time.time(), state_addr.component_id),
+        )
+        return row.fetchone() is not None
+
+    def save_state(self, state_addr: StateAddress, raw_state: bytes) -> None:
+        self._save(state_addr, "states", raw_state)
+
+    def restore_state(self, state_addr: StateAddress) -> bytes | None:
+        return self._restore(state_addr, "states")
+
+    def save_context(self, state_addr: StateAddress, raw_context: bytes) -> None:
+        self._save(state_addr, "contexts", raw_context)
+
+    def restore_context(self, state_addr: StateAddress) -> bytes | None:
+        return self._restore(state_addr, "contexts")
+
+    def save_component_template(
+        self, state_addr: StateAddress, html_bytes: bytes
+    ) -> None:
+        hashed_value = hashlib.sha1(html_bytes).hexdigest()
+        pending = self._get_pending_writes()
+        if pending is not None:
+            pending.templates[hashed_value] = html_bytes
+            pending.values[
+                _sqlite_value_key(state_addr, "templates")
+            ] = hashed_value.encode("ascii")
+            return
+        connection = self._get_connection()
+        with self._transaction(connection):
+            now = time.time()
+            self._save_template(connection, hashed_value, html_bytes, now)
+            self._save_value(
+                connection,
+                state_addr,
+                "templates",
+                hashed_value.encode("ascii"),
+                now,
+            )
 
     def restore_component_template(self, state_addr: StateAddress) -> bytes | None:
-        templates_key = self._get_key_name(self.templates_prefix, state_addr.session_id)
-        with self.client.pipeline() as pipe:
-            pipe.hget(templates_key, state_addr.component_id)
-            pipe.expire(templates_key, self.ttl)
-            hashed_value, _ = pipe.execute()
+        hashed_value = self._restore(state_addr, "templates")
         if hashed_value is None:
             return None
-        cache_key = self._get_key_name(
-            self.template_cache_prefix, hashed_value.decode("ascii")
+        pending = self._get_pending_writes()
+        if pending is not None and hashed_value.decode("ascii") in pending.templates:
+            return pending.templates[hashed_value.decode("ascii")]
+        row = (
+            self._get_connection()
+            .execute(
+                "SELECT html FROM lc_template_cache "
+                "WHERE hashed_value = ? AND expires_at > ?",
+                (hashed_value.decode("ascii"), time.time()),
+            )
+            .fetchone()
         )
-        return self.client.get(cache_key)
+        return row[0] if row else None
 
     def clear_session(self, session_id: str) -> None:
-        with self.client.pipeline() as pipe:
-            # Instead of deleting the keys, we set a TTL for garbage collection.
-            pipe.expire(self._get_key_name(self.key_prefix, session_id), self.ttl_gc)
-            pipe.expire(
-                self._get_key_name(self.templates_prefix, session_id), self.ttl_gc
+        self.clear_sessions([session_id])
+
+    def clear_sessions(self, session_ids: Iterable[str]) -> None:
+        self._flush_pending_writes()
+        now = time.time()
+        expires_at = now + self.ttl_gc.total_seconds()
+        connection = self._get_connection()
+        with self._transaction(connection):
+            connection.executemany(
+                "UPDATE lc_sessions SET expires_at = ? "
+                "WHERE session_id = ? AND expires_at > ?",
+                [(expires_at, session_id, now) for session_id in session_ids],
             )
-            pipe.execute()
 
     def clear_all_sessions(self) -> None:
-        self.client.flushdb()
+        self._flush_pending_writes()
+        connection = self._get_connection()
+        with self._transaction(connection):
+            connection.execute("DELETE FROM lc_values")
+            connection.execute("DELETE FROM lc_sessions")
+            connection.execute("DELETE FROM lc_template_cache")
 
-    @staticmethod
-    def _get_key_name(key_prefix: str, session_id: str) -> str:
-        return f"{key_prefix}{session_id}"
+    def get_session_ids(self) -> Iterator[str]:
+        self._flush_pending_writes()
+        rows = (
+            self._get_connection()
+            .execute(
+                "SELECT session_id FROM lc_sessions WHERE expires_at > ?",
+                (time.time(),),
+            )
+            .fetchall()
+        )
+        for (session_id,) in rows:
+            yield session_id
+
+    def get_component_ids(self, session_id: str) -> set[str]:
+        self._flush_pending_writes()
+        rows = self._get_connection().execute(
+            "SELECT DISTINCT v.component_id "
+            "FROM lc_sessions s JOIN lc_values v USING (session_id) "
+            "WHERE s.session_id = ? AND s.expires_at > ?",
+            (session_id, time.time()),
+        )
+        return {component_id for (component_id,) in rows}
+
+    def delete_components(self, session_id: str, component_ids: Iterable[str]) -> None:
+        self._flush_pending_writes()
+        connection = self._get_connection()
+        with self._transaction(connection):
+            connection.executemany(
+                "DELETE FROM lc_values WHERE session_id = ? AND component_id = ?",
+                [(session_id, component_id) for component_id in component_ids],
+            )
+
+    def collect_garbage(self) -> None:
+        """Delete expired sessions and cached templates."""
+        now = time.time()
+        connection = self._get_connection()
+        with self._transaction(connection):
+            connection.execute(
+                "DELETE FROM lc_values WHERE session_id IN "
+                "(SELECT session_id FROM lc_sessions WHERE expires_at <= ?)",
+                (now,),
+            )
+            connection.execute("DELETE FROM lc_sessions WHERE expires_at <= ?", (now,))
+            connection.execute(
+                "DELETE FROM lc_template_cache WHERE expires_at <= ?", (now,)
+            )
+
+    def _save(self, state_addr: StateAddress, key_type: str, value: bytes) -> None:
+        pending = self._get_pending_writes()
+        if pending is not None:
+            pending.values[_sqlite_value_key(state_addr, key_type)] = value
+            return
+        connection = self._get_connection()
+        with self._transaction(connection):
+            self._save_value(connection, state_addr, key_type, value, time.time())
+
+    def _get_pending_writes(self) -> "_SQLitePendingWrites | None":
+        return getattr(self._local, "pending_writes", None)
+
+    def _flush_pending_writes(self) -> None:
+        """Save the writes buffered by write_batch() in one transaction."""
+        pending = self._get_pending_writes()
+        if pending is None or not (pending.values or pending.templates):
+            return
+        values, templates = pending.values, pending.templates
+        pending.values, pending.templates = {}, {}
+        connection = self._get_connection()
+        with self._transaction(connection):
+            now = time.time()
+            for hashed_value, html_bytes in templates.items():
+                self._save_template(connection, hashed_value, html_bytes, now)
+            for (session_id, key_type, component_id), value in values.items():
+                state_addr = StateAddress(
+                    session_id=session_id, component_id=component_id
+                )
+                self._save_value(connection, state_addr, key_type, value, now)
+
+    def _save_template(
+        self,
+        connection: sqlite3.Connection,
+        hashed_value: str,
+        html_bytes: bytes,
+        now: float,
+    ) -> None:
+        # Templates are immutable. Only extend the lifetime of the cached one.
+        connection.execute(
+            "INSERT INTO lc_template_cache VALUES (?, ?, ?) "
+            "ON CONFLICT (hashed_value) DO UPDATE "
+            "SET expires_at = excluded.expires_at",
+            (hashed_value, html_bytes, now + self.ttl.total_seconds()),
+        )
+
+    def _save_value(
+        self,
+        connection: sqlite3.Connection,
+        state_addr: StateAddress,
+        key_type: str,
+        value: bytes,
+        now: float,
+    ) -> None:
+        """Save the value and extend the session's lifetime.
+
+        Must be called inside a transaction.
+        """
+        row = connection.execute(
+            "SELECT expires_at FROM lc_sessions WHERE session_id = ?",
+            (state_addr.session_id,),
+        ).fetchone()
+        if row is not None and row[0] <= now:
+            # Same as an expired Redis key: the new session starts empty.
+            connection.execute(
+                "DELETE FROM lc_values WHERE session_id = ?", (state_addr.session_id,)
+            )
+        if row is None or self._needs_touch(row[0], now):
+            connection.execute(
+                "INSERT INTO lc_sessions VALUES (?, ?) ON CONFLICT (session_id) "
+                "DO UPDATE SET expires_at = excluded.expires_at",
+                (state_addr.session_id, now + self.ttl.total_seconds()),
+            )
+        connection.execute(
+            "INSERT INTO lc_values VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (session_id, key_type, component_id) "
+            "DO UPDATE SET value = excluded.value",
+            (state_addr.session_id, key_type, state_addr.component_id, value),
+        )
+
+    def _restore(self, state_addr: StateAddress, key_type: str) -> bytes | None:
+        pending = self._get_pending_writes()
+        if pending is not None:
+            value = pending.values.get(_sqlite_value_key(state_addr, key_type))
+            if value is not None:
+                return value
+        now = time.time()
+        connection = self._get_connection()
+        row = connection.execute(
+            "SELECT s.expires_at, v.value FROM lc_sessions s LEFT JOIN lc_values v "
+            "ON v.session_id = s.session_id AND v.key_type = ? "
+            "AND v.component_id = ? "
+            "WHERE s.session_id = ? AND s.expires_at > ?",
+            (key_type, state_addr.component_id, state_addr.session_id, now),
+        ).fetchone()
+        if row is None:
+            return None
+        expires_at, value = row
+        if self._needs_touch(expires_at, now):
+            connection.execute(
+                "UPDATE lc_sessions SET expires_at = ? "
+                "WHERE session_id = ? AND expires_at > ?",
+                (now + self.ttl.total_seconds(), state_addr.session_id, now),
+            )
+        return value
+
+    def _needs_touch(self, expires_at: float, now: float) -> bool:
+        max_expires_at = now + self.ttl.total_seconds()
+        return expires_at < max_expires_at - self.touch_interval.total_seconds()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Return the connection of the current thread.
+
+        Connections are not shared with child processes after fork.
+        """
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            connection = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,
+                cached_statements=256,
+            )
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            self._local.connection = connection
+            self._local.pid = pid
+            self._start_gc_thread()
+        return self._local.connection
 
     @staticmethod
-    def _get_hashed_value(value: bytes) -> str:
-        return base64.urlsafe_b64encode(hashlib.md5(value).digest()).decode("ascii")[:8]
+    @contextmanager
+    def _transaction(connection: sqlite3.Connection) -> Iterator[None]:
+        # Take the write lock right away. Upgrading a read transaction to a write
+        # one fails immediately if another connection is writing.
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _start_gc_thread(self) -> None:
+        if self.gc_interval is None or self._gc_thread_pid == os.getpid():
+            return
+        self._gc_thread_pid = os.getpid()
+        thread = threading.Thread(
+            target=_collect_sqlite_garbage_periodically,
+            args=(weakref.ref(self), self.gc_interval.total_seconds()),
+            name="livecomponents-sqlite-gc",
+            daemon=True,
+        )
+        thread.start()
+
+
+class _SQLitePendingWrites:
+    """Writes buffered by SQLiteStateStore.write_batch()."""
+
+    __slots__ = ("values", "templates")
+
+    def __init__(self) -> None:
+        # (session ID, key type, component ID) -> value
+        self.values: dict[tuple[str, str, str], bytes] = {}
+        # Hashed value -> template
+        self.templates: dict[str, bytes] = {}
+
+
+def _sqlite_value_key(state_addr: StateAddress, key_type: str) -> tuple[str, str, str]:
+    return (state_addr.session_id, key_type, state_addr.component_id)
+
+
+def _collect_sqlite_garbage_periodically(
+    store_ref: "weakref.ref[SQLiteStateStore]", interval: float
+) -> None:
+    """Run SQLiteStateStore.collect_garbage() until the store is deleted."""
+    while True:
+        time.sleep(interval)
+        store = store_ref()
+        if store is None:
+            return
+        try:
+            store.collect_garbage()
+        except sqlite3.Error:
+            logger.exception("Failed to delete expired livecomponents sessions")
+        del store
+
+
+class DjangoCacheStateStore(IStateStore):
+    """State store on top of a Django cache backend (the CACHES setting).
+
+    Use it to keep sessions in the cache tier the project already runs, such as
+    memcached, instead of a dedicated Redis server.
+
+    Every session has an index entry with the session generation, the time of
+    the last TTL refresh, and the list of the stored components. Values are
+    tagged with the generation of the session that wrote them. Reads fetch the
+    index and the value with one get_many() call and ignore values of other
+    generations, so when a session expires, its values are never read again,
+    without deleting them one by one. `clear_session` only shortens the lifetime
+    of the index.
+
+    The same way, every index is tagged with the store generation, which is kept
+    in one more key and fetched with the index. `clear_all_sessions` replaces the
+    store generation, so all sessions disappear at once, while the rest of the
+    cache is left alone. The entries of the cleared sessions expire on their own.
+
+    Cache backends can't extend the lifetime of many keys at once. Reads and
+    writes extend the lifetime of the index and of all session values at most
+    once per `touch_interval`. The values are touched one by one in a background
+    thread, so requests don't wait for a round trip per stored value.
+
+    The index is updated with read-modify-write. If two processes add new
+    components to the same session at the same time, one of them may be missing
+    from the index until it's saved again. Such a component is not reported by
+    get_component_ids(), and its lifetime isn't extended in the meantime.
+
+    Args:
+        cache_alias: Alias of the cache in the CACHES setting.
+        key_prefix: Prefix for cache keys.
+        ttl: Time-to-live for sessions. See RedisStateStore.
+        ttl_gc: Time-to-live for sessions after "clear_session". See RedisStateStore.
+        touch_interval: How often to extend the lifetime of session values.
+    """
+
+    def __init__(
+        self,
+        cache_alias: str = "default",
+        key_prefix: str = "lc:",
+        ttl: datetime.timedelta = datetime.timedelta(days=1),
+        ttl_gc: datetime.timedelta = datetime.timedelta(hours=1),
+        touch_interval: datetime.timedelta = datetime.timedelta(minutes=1),
+    ):
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+        self.ttl_gc = ttl_gc
+        self.touch_interval = touch_interval
+        self._touch_executor: ThreadPoolExecutor | None = None
+        self._touch_executor_pid: int | None = None
+        self._touch_executor_lock = threading.Lock()
+
+    @property
+    def cache(self) -> BaseCache:
+        # Django keeps a separate cache connection for every thread.
+        return caches[self.cache_alias]
+
+    def session_exists(self, session_id: str) -> bool:
+        index = self._get_index(session_id)
+        return index is not None and any(
+            key_type == "states" for key_type, _ in index["keys"]
+        )
+
+    def component_initialized(self, state_addr: StateAddress) -> bool:
+        return self._restore(state_addr, "states") is not None
+
+    def save_state(self, state_addr: StateAddress, raw_state: bytes) -> None:
+        self._save(state_addr, "states", raw_state)
+
+    def restore_state(self, state_addr: StateAddress) -> bytes | None:
+        return self._restore(state_addr, "states")
+
+    def save_context(self, state_addr: StateAddress, raw_context: bytes) -> None:
+        self._save(state_addr, "contexts", raw_context)
+
+    def restore_context(self, state_addr: StateAddress) -> bytes | None:
+        return self._restore(state_addr, "contexts")
+
+    def save_component_template(
+        self, state_addr: StateAddress, html_bytes: bytes
+    ) -> None:
+        hashed_value = hashlib.sha1(html_bytes).hexdigest()
+        template_key = f"{self.key_prefix}template_cache:{hashed_value}"
+        timeout = self._get_timeout()
+        # Templates are immutable. Only extend the lifetime of the cached one.
+        if not self.cache.add(template_key, html_bytes, timeout):
+            self.cache.touch(template_key, timeout)
+        self._save(state_addr, "templates", hashed_value.encode("ascii"))
+
+    def restore_component_template(self, state_addr: StateAddress) -> bytes | None:
+        hashed_value = self._restore(state_addr, "templates")
+        if hashed_value is None:
+            return None
+        return self.cache.get(
+            f"{self.key_prefix}template_cache:{hashed_value.decode('ascii')}"
+        )
+
+    def clear_session(self, session_id: str) -> None:
+        self.cache.touch(self._get_index_key(session_id), self.ttl_gc.total_seconds())
+
+    def clear_all_sessions(self) -> None:
+        self.cache.set(self._get_generation_key(), os.urandom(8).hex(), None)
+
+    def get_component_ids(self, session_id: str) -> set[str]:
+        index = self._get_index(session_id)
+        if index is None:
+            return set()
+        return {component_id for _, component_id in index["keys"]}
+
+    def delete_components(self, session_id: str, component_ids: Iterable[str]) -> None:
+        component_ids = set(component_ids)
+        index_key = self._get_index_key(session_id)
+        index = self._get_index(session_id)
+        if index is None:
+            return
+        deleted_keys = {
+            (key_type, component_id)
+            for key_type, component_id in index["keys"]
+            if component_id in component_ids
+        }
+        self.cache.delete_many(
+            [self._get_value_key(session_id, *key) for key in deleted_keys]
+        )
+        index["keys"] -= deleted_keys
+        self.cache.set(index_key, index, self._get_timeout())
+
+    def _save(self, state_addr: StateAddress, key_type: str, value: bytes) -> None:
+        session_id = state_addr.session_id
+        index_key = self._get_index_key(session_id)
+        generation_key = self._get_generation_key()
+        values = self.cache.get_many([generation_key, index_key])
+        index = self._get_live_index(values, index_key)
+        if index is None:
+            # Same as an expired Redis key: the new session starts empty.
+            index = {
+                "generation": os.urandom(8).hex(),
+                "store_generation": values.get(generation_key, ""),
+                "touched_at": 0,
+                "keys": set(),
+            }
+        index["keys"].add((key_type, state_addr.component_id))
+        self._touch_values(session_id, index)
+        value_key = self._get_value_key(session_id, key_type, state_addr.component_id)
+        self.cache.set_many(
+            {value_key: (index["generation"], value), index_key: index},
+            self._get_timeout(),
+        )
+
+    def _restore(self, state_addr: StateAddress, key_type: str) -> bytes | None:
+        session_id = state_addr.session_id
+        index_key = self._get_index_key(session_id)
+        value_key = self._get_value_key(session_id, key_type, state_addr.component_id)
+        values = self.cache.get_many([self._get_generation_key(), index_key, value_key])
+        index = self._get_live_index(values, index_key)
+        if index is None:
+            return None
+        if self._touch_values(session_id, index):
+            self.cache.set(index_key, index, self._get_timeout())
+        generation, value = values.get(value_key, (None, None))
+        if generation != index["generation"]:
+            return None
+        return value
+
+    def _get_index(self, session_id: str) -> dict[str, Any] | None:
+        index_key = self._get_index_key(session_id)
+        values = self.cache.get_many([self._get_generation_key(), index_key])
+        return self._get_live_index(values, index_key)
+
+    def _get_live_index(
+        self, values: dict[str, Any], index_key: str
+    ) -> dict[str, Any] | None:
+        """Return the index from get_many() results unless all sessions were cleared.
+
+        The results must include the store generation key.
+        """
+        index = values.get(index_key)
+        if index is None:
+            return None
+        store_generation = values.get(self._get_generation_key(), "")
+        if index.get("store_generation", "") != store_generation:
+            return None
+        return index
+
+    def _touch_values(self, session_id: str, index: dict[str, Any]) -> bool:
+        """Extend the lifetime of the session values if it's time to.
+
+        Return True if the index has changed and must be saved.
+        """
+        now = time.time()
+        if now - index["touched_at"] < self.touch_interval.total_seconds():
+            return False
+        value_keys = [self._get_value_key(session_id, *key) for key in index["keys"]]
+        self._get_touch_executor().submit(
+            self._touch_keys, value_keys, self._get_timeout()
+        )
+        index["touched_at"] = now
+        return True
+
+    def _touch_keys(self, keys: list[str], timeout: float) -> None:
+        try:
+            cache = self.cache
+            for key in keys:
+                cache.touch(key, timeout)
+        except Exception:
+            logger.exception("Failed to extend the lifetime of livecomponents values")
+
+    def _get_touch_executor(self) -> ThreadPoolExecutor:
+        """Return the executor of the current process.
+
+        Executor threads are not copied to child processes on fork.
+        """
+        with self._touch_executor_lock:
+            if self._touch_executor is None or self._touch_executor_pid != os.getpid():
+                self._touch_executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="livecomponents-cache-touch"
+                )
+                self._touch_executor_pid = os.getpid()
+            return self._touch_executor
+
+    def next_command_sequence(self, session_id: str, command_key: str) -> int:
+        key = self._get_sequence_key(session_id, command_key)
+        self.cache.add(key, 0, timeout=self.ttl_gc.total_seconds())
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # The key expired between add() and incr().
+            return 0
+
+    def get_command_sequence(self, session_id: str, command_key: str) -> int:
+        return self.cache.get(self._get_sequence_key(session_id, command_key), 0)
+
+    def _get_timeout(self) -> float:
+        # Values are touched at most once per touch_interval, so we give them
+        # a bit more time to make sure they outlive the index.
+        return (self.ttl + self.touch_interval).total_seconds()
+
+    def _get_generation_key(self) -> str:
+        return f"{self.key_prefix}generation"
+
+    def _get_index_key(self, session_id: str) -> str:
+        return f"{self.key_prefix}{session_id}:index"
+
+    def _get_value_key(self, session_id: str, key_type: str, component_id: str) -> str:
+        # Component IDs can be long, and some backends (e.g., memcached) limit
+        # the key length.
+        component_hash = hashlib.sha1(component_id.encode("utf-8")).hexdigest()
+        return f"{self.key_prefix}{session_id}:{key_type}:{component_hash}"
+
+    def _get_sequence_key(self, session_id: str, command_key: str) -> str:
+        return self._get_value_key(session_id, "sequences", command_key)
+
+
+# Key types of RedisStateStore that can be read from replicas.
+REPLICA_KEY_TYPES = {"templates", "states", "contexts"}
+
+# How many recently written sessions RedisStateStore keeps track of to read them
+# from the primary. Expired entries are purged when the limit is reached.
+MAX_TRACKED_SESSION_WRITES = 10_000
+
+
+class RedisStateStore(IStateStore):
+    """Redis-based state store.
+
+    Args:
+        redis_url: URL of the Redis server.
+        state_prefix: Prefix for keys that store component states.
+        context_prefix: Prefix for keys that store component contexts.
+        templates_prefix: Prefix for keys that store component templates.
+        template_cache_prefix: Prefix for keys that store cached component templates.
+        ttl: Time-to-live for session keys. Each time the session is accessed, the TTL
+            is reset. If the session is not accessed for this time, it is deleted, and
+            subsequent accesses will result in a "Session not found" error and a 410
+            status code in the response. How this status is handled is up to the
+            client. There is no default behavior, but the client can choose to reload
+            the page, for example.
+        ttl_gc: Time-to-live for garbage collection. This TTL is lower than the session
+            TTL, and it's set for sessions scheduled for deletion in response to
+            a "clear_session" call. We don't delete the session immediately in case the
+            client decides to access the page again when clicking the back button,
+            for example.
+        ttl_initial: If set, time-to-live for sessions that haven't received any
+            commands yet. Most page views never send a command, so their sessions
+            can expire much earlier than `ttl`. The first command extends the
+            session to `ttl`.
+        replica_urls: URLs of read replicas of the Redis server. If set, reads of the
+            key types listed in `replica_reads` go to a randomly chosen replica. If
+            the value is not found on the replica (e.g., because of the replication
+            lag), it's read from the primary.
+        replica_reads: Key types to read from replicas: "templates", "states",
+            and "contexts". By default, only templates are read from replicas.
+            For templates, only the blobs are read from replicas, and the
+            per-session references to them are read from the primary. Blobs are
+            immutable and addressed by their hash, so replica lag can only result
+            in a miss, and not in a stale value. Reads served by
+            a replica don't refresh the session TTL on the primary. The next write
+            to the session, e.g., saving the state after a command, does.
+        replica_sticky_window: After this process writes to a session, it reads the
+            session's states and contexts from the primary for this time, so that
+            the command that follows a render doesn't see stale data.
+        max_connections: Maximum number of connections in the pool of every Redis
+            server. If the limit is reached, the command fails with a ConnectionError.
+            By default, the pool size is not limited.
+        socket_timeout: Timeout in seconds for socket reads and writes.
+        socket_connect_timeout: Timeout in seconds for establishing a connection.
+        socket_keepalive: Enable TCP keepalive on the connections.
+        health_check_interval: If a connection has been idle for more than this
+            number of seconds, it's checked with PING before use. 0 disables checks.
+        warm_up_connections: Number of connections per Redis server that warm_up()
+            opens in advance.
+        template_blob_cache_size: Maximum number of template blobs cached in the
+            process memory. Template blobs are immutable, so every process reads
+            each of them from Redis only once. 0 disables the cache.
+        track_usage: If True, keep the sizes of stored values in a separate hash
+            for every session, so that get_session_usage() works. Every write
+            updates the hash in the same pipeline.
+        usage_prefix: Prefix for keys that store the sizes of values.
+        sequence_prefix: Prefix for keys that store the sequence numbers of
+            coalesced commands. The keys expire after `ttl_gc`.
+
+    Connection pools are reset in child processes after fork, so the store can be
+    created before a pre-fork server (e.g., gunicorn with preload_app) spawns
+    its workers.
+    """
+
+    def __init__(
+        self,
+        redis_url: str = "redis://localhost:6379/0",
+        state_prefix: str = "lc:states:",
+        context_prefix: str = "lc:ctxs:",
+        templates_prefix: str = "lc:templates:",
+        template_cache_prefix: str = "lc:template_cache:",
+        ttl: datetime.timedelta = datetime.timedelta(days=1),
+        ttl_gc: datetime.timedelta = datetime.timedelta(hours=1),
+        ttl_initial: datetime.timedelta | None = None,
+        replica_urls: list[str] | None = None,
+        replica_reads: Iterable[str] = ("templates",),
+        replica_sticky_window: datetime.timedelta = datetime.timedelta(seconds=5),
+        max_connections: int | None = None,
+        socket_timeout: float | None = None,
+        socket_connect_timeout: float | None = None,
+        socket_keepalive: bool = False,
+        health_check_interval: int = 0,
+        warm_up_connections: int = 1,
+        template_blob_cache_size: int = 1000,
+        track_usage: bool = False,
+        usage_prefix: str = "lc:usage:",
+        sequence_prefix: str = "lc:sequences:",
+    ):
+        unknown_key_types = set(replica_reads) - REPLICA_KEY_TYPES
+        if unknown_key_types:
+            raise ValueError(f"Unknown replica_reads key types: {unknown_key_types}")
+        self.connection_options: dict[str, Any] = {
+            "max_connections": max_connections,
+            "socket_timeout": socket_timeout,
+            "socket_connect_timeout": socket_connect_timeout,
+            "socket_keepalive": socket_keepalive,
+            "health_check_interval": health_check_interval,
+        }
+        self.warm_up_connections = warm_up_connections
+        self.client = self._create_client(redis_url)
+        self.replica_clients = [self._create_client(url) for url in replica_urls or []]
+        self.replica_reads = set(replica_reads)
+        self.replica_sticky_window = replica_sticky_window
+        self._session_writes: dict[str, float] = {}
+        self._session_writes_lock = threading.Lock()
+        _redis_state_stores.add(self)
+        self.key_prefix = state_prefix
+        self.context_prefix = context_prefix
+        self.templates_prefix = templates_prefix
+        self.template_cache_prefix = template_cache_prefix
+        self.ttl = ttl
+        self.ttl_gc = ttl_gc
+        self.ttl_initial = ttl_initial
+        self.template_blob_cache_size = template_blob_cache_size
+        self._template_blobs: OrderedDict[str, bytes] = OrderedDict()
+        self._template_blobs_lock = threading.Lock()
+        self.track_usage = track_usage
+        self.usage_prefix = usage_prefix
+        self.sequence_prefix = sequence_prefix
+
+    def session_exists(self, session_id: str) -> bool:
+        key_name = self._get_key_name(self.key_prefix, session_id)
+        return bool(self._get_session_client(session_id).exists(key_name))
+
+    def component_initialized(self, state_addr: StateAddress) -> bool:
+        key_name = self._get_key_name(self.key_prefix, state_addr.session_id)
+        client = self._get_session_client(state_addr.session_id)
+        return client.hexists(key_name, state_addr.component_id)
+
+    def save_state(self, state_addr: StateAddress, raw_state: bytes) -> None:
+        return self._save_by_prefix(state_addr, self.key_prefix, raw_state)
+
+    def restore_state(self, state_addr: StateAddress) -> bytes | None:
+        return self._restore_by_prefix(state_addr, self.key_prefix, "states")
+
+    def save_context(self, state_addr: StateAddress, raw_context: bytes) -> None:
+        return self._save_by_prefix(state_addr, self.context_prefix, raw_context)
+
+    def restore_context(self, state_addr: StateAddress) -> bytes | None:
+        return self._restore_by_prefix(state_addr, self.context_prefix, "contexts")
+
+    def _save_by_prefix(
+        self,
+        state_addr: StateAddress,
+        prefix: str,
+        raw_state: bytes,
+        size: int | None = None,
+        template_blob: tuple[str, bytes] | None = None,
+    ) -> None:
+        """Save the value to the hash of the session.
+
+        If template_blob (hashed value, HTML bytes) is set, the blob is saved in
+        the same round trip when possible. See _queue_template_blob().
+        """
+        if size is None:
+            size = len(raw_state)
+        key_name = self._get_key_name(prefix, state_addr.session_id)
+        client = self._get_session_client(state_addr.session_id)
+        with client.pipeline() as pipe:
+            pipe.hset(key_name, state_addr.component_id, raw_state)
+            self._expire_session(pipe, state_addr.session_id, key_name)
+            self._record_usage(pipe, state_addr, prefix, size)
+            blob_refresh = self._queue_template_blob(pipe, client, template_blob)
+            results = pipe.execute()
+        self._finish_template_blob(template_blob, blob_refresh, results)
+        self._record_session_write(state_addr.session_id)
+
+    def _restore_by_prefix(
+        self, state_addr: StateAddress, prefix: str, key_type: str
+    ) -> bytes | None:
+        key_name = self._get_key_name(prefix, state_addr.session_id)
+        client = self._get_session_client(state_addr.session_id)
+
+        replica = self._get_replica_client(key_type, state_addr.session_id)
+        if replica is not None:
+            raw_state = replica.hget(key_name, state_addr.component_id)
+            if raw_state is not None:
+                # Don't refresh the TTL on the primary: that would be a round trip
+                # to the primary for every read. The next write refreshes it.
+                return raw_state
+
+        with client.pipeline() as pipe:
+            pipe.hget(key_name, state_addr.component_id)
+            self._expire_session(pipe, state_addr.session_id, key_name)
+            return pipe.execute()[0]
+
+    def save_component_template(
+        self, state_addr: StateAddress, html_bytes: bytes
+    ) -> None:
+        """Save serialized LiveComponentNode to Redis.
+
+        Because live component nodes repeat themselves often, we cache them
+        separately to avoid storing the same data multiple times.
+        """
+        hashed_value = self._get_hashed_value(html_bytes)
+        self._save_by_prefix(
+            state_addr,
+            self.templates_prefix,
+            hashed_value.encode("ascii"),
+            size=len(html_bytes),
+            template_blob=(hashed_value, html_bytes),
+        )
+
+    def restore_component_template(self, state_addr: StateAddress) -> bytes | None:
+        templates_key = self._get_key_name(self.templates_prefix, state_addr.session_id)
+        client = self._get_session_client(state_addr.session_id)
+
+        # The reference changes on every re-render, so a lagging replica could
+        # return the hash of the previous template. Only the blob, which is
+        # addressed by its hash, is read from replicas.
+        with client.pipeline() as pipe:
+            pipe.hget(templates_key, state_addr.component_id)
+            self._expire_session(pipe, state_addr.session_id, templates_key)
+            hashed_value = pipe.execute()[0]
+        if hashed_value is None:
+            return None
+        return self._get_template_blob(hashed_value.decode("ascii"))
+
+    def _queue_template_blob(
+        self,
+        pipe: Pipeline,
+        client: Redis,
+        template_blob: tuple[str, bytes] | None,
+    ) -> bool:
+        """Queue saving the template blob to the pipeline of the session.
+
+        Blobs stored on another server are saved separately. Return True if only
+        the TTL of a blob known to this process was refreshed. Then the result of
+        the last command tells if the blob is still in Redis.
+        """
+        if template_blob is None:
+            return False
+        hashed_value, html_bytes = template_blob
+        if self._get_template_cache_client(hashed_value) is not client:
+            self._save_template_blob(hashed_value, html_bytes)
+            return False
+        cache_key = self._get_key_name(self.template_cache_prefix, hashed_value)
+        if self._get_cached_template_blob(hashed_value) is not None:
+            pipe.expire(cache_key, self.ttl)
+            return True
+        pipe.set(cache_key, html_bytes, ex=self.ttl)
+        self._cache_template_blob(hashed_value, html_bytes)
+        return False
+
+    def _finish_template_blob(
+        self,
+        template_blob: tuple[str, bytes] | None,
+        blob_refresh: bool,
+        results: list,
+    ) -> None:
+        if template_blob is not None and blob_refresh and not results[-1]:
+            # The blob has expired or was evicted from Redis. Send it again.
+            self._upload_template_blob(*template_blob)
+
+    def _save_template_blob(self, hashed_value: str, html_bytes: bytes) -> None:
+        cache_key = self._get_key_name(self.template_cache_prefix, hashed_value)
+        client = self._get_template_cache_client(hashed_value)
+        if self._get_cached_template_blob(hashed_value) is not None:
+            # The blob was already saved by this process. If it's still in Redis,
+            # refreshing the TTL is enough, and we don't need to send it again.
+            if client.expire(cache_key, self.ttl):
+                return
+        self._upload_template_blob(hashed_value, html_bytes)
+
+    def _upload_template_blob(self, hashed_value: str, html_bytes: bytes) -> None:
+        cache_key = self._get_key_name(self.template_cache_prefix, hashed_value)
+        client = self._get_template_cache_client(hashed_value)
+        with client.pipeline() as pipe:
+            pipe.set(cache_key, html_bytes)
+            pipe.expire(cache_key, self.ttl)
+            pipe.execute()
+        self._cache_template_blob(hashed_value, html_bytes)
+
+    def _get_template_blob(self, hashed_value: str) -> bytes | None:
+        html_bytes = self._get_cached_template_blob(hashed_value)
+        if html_bytes is not None:
+            return html_bytes
+        html_bytes = self._restore_template_blob(hashed_value)
+        if html_bytes is not None:
+            self._cache_template_blob(hashed_value, html_bytes)
+        return html_bytes
+
+    def _restore_template_blob(self, hashed_value: str) -> bytes | None:
+        cache_key = self._get_key_name(self.template_cache_prefix, hashed_value)
+        if "templates" in self.replica_reads and self.replica_clients:
+            html_bytes = random.choice(self.replica_clients).get(cache_key)
+            if html_bytes is not None:
+                return html_bytes
+        return self._get_template_cache_client(hashed_value).get(cache_key)
+
+    def _get_cached_template_blob(self, hashed_value: str) -> bytes | None:
+        with self._template_blobs_lock:
+            html_bytes = self._template_blobs.get(hashed_value)
+            if html_bytes is not None:
+                self._template_blobs.move_to_end(hashed_value)
+            return html_bytes
+
+    def _cache_template_blob(self, hashed_value: str, html_bytes: bytes) -> None:
+        if not self.template_blob_cache_size:
+            return
+        with self._template_blobs_lock:
+            self._template_blobs[hashed_value] = html_bytes
+            self._template_blobs.move_to_end(hashed_value)
+            while len(self._template_blobs) > self.template_blob_cache_size:
+                self._template_blobs.popitem(last=False)
+
+    def clear_session(self, session_id: str) -> None:
+        self.clear_sessions([session_id])
+
+    def clear_sessions(self, session_ids: Iterable[str]) -> None:
+        """Schedule the sessions for deletion with one pipeline per Redis server."""
+        pipelines: dict[int, Pipeline] = {}
+        for session_id in session_ids:
+            client = self._get_session_client(session_id)
+            pipe = pipelines.get(id(client))
+            if pipe is None:
+                pipe = pipelines[id(client)] = client.pipeline()
+            self._expire_cleared_session(pipe, session_id)
+        for pipe in pipelines.values():
+            with pipe:
+                pipe.execute()
+
+    def _expire_cleared_session(self, pipe: Pipeline, session_id: str) -> None:
+        # Instead of deleting the keys, we set a TTL for garbage collection.
+        pipe.expire(self._get_key_name(self.key_prefix, session_id), self.ttl_gc)
+        pipe.expire(self._get_key_name(self.templates_prefix, session_id), self.ttl_gc)
+        if self.track_usage:
+            usage_key = self._get_key_name(self.usage_prefix, session_id)
+            pipe.expire(usage_key, self.ttl_gc)
+
+    def clear_all_sessions(
+        self,
+        batch_size: int = 1000,
+        max_keys_per_second: float | None = None,
+        progress: Callable[[int], None] | None = None,
+    ) -> None:
+        """Delete all keys of the store, leaving other data in the database alone.
+
+        The keys are found with SCAN and deleted with UNLINK in batches, so Redis
+        keeps serving other clients in the meantime.
+
+        Args:
+            batch_size: Number of keys to delete at once. Also used as the COUNT
+                hint for SCAN.
+            max_keys_per_second: If set, sleep between batches to delete at most
+                this many keys per second.
+            progress: Called after every batch with the total number of keys
+                deleted so far.
+        """
+        with self._template_blobs_lock:
+            self._template_blobs.clear()
+        deleted = 0
+        started_at = time.monotonic()
+        for client in self._get_all_clients():
+            for keys in self._scan_key_batches(client, batch_size):
+                client.unlink(*keys)
+                deleted += len(keys)
+                if progress is not None:
+                    progress(deleted)
+                if max_keys_per_second:
+                    delay = deleted / max_keys_per_second - (
+                        time.monotonic() - started_at
+                    )
+                    if delay > 0:
+                        time.sleep(delay)
+
+    def get_session_ids(self) -> Iterator[str]:
+        for client in self._get_all_clients():
+            seen: set[str] = set()
+            for prefix in (self.key_prefix, self.templates_prefix):
+                for key in client.scan_iter(match=f"{prefix}*"):
+                    session_id = key.decode()[len(prefix) :]
+                    if session_id not in seen:
+                        seen.add(session_id)
+                        yield session_id
+
+    def get_component_ids(self, session_id: str) -> set[str]:
+        with self._get_session_client(session_id).pipeline() as pipe:
+            for prefix in self._get_session_prefixes():
+                pipe.hkeys(self._get_key_name(prefix, session_id))
+            results = pipe.execute()
+        return {field.decode() for fields in results for field in fields}
+
+    def delete_components(self, session_id: str, component_ids: Iterable[str]) -> None:
+        component_ids = list(component_ids)
+        if not component_ids:
+            return
+        with self._get_session_client(session_id).pipeline() as pipe:
+            for prefix in self._get_session_prefixes():
+                pipe.hdel(self._get_key_name(prefix, session_id), *component_ids)
+            if self.track_usage:
+                pipe.hdel(
+                    self._get_key_name(self.usage_prefix, session_id),
+                    *[
+                        f"{key_type}:{component_id}"
+                        for key_type in ("states", "contexts", "templates")
+                        for component_id in component_ids
+                    ],
+                )
+            pipe.execute()
+
+    @property
+    def tracks_usage(self) -> bool:
+        return self.track_usage
+
+    def get_session_usage(self, session_id: str) -> dict[tuple[str, str], int]:
+        if not self.track_usage:
+            return super().get_session_usage(session_id)
+        usage_key = self._get_key_name(self.usage_prefix, session_id)
+        entries = []
+        for field, value in (
+            self._get_session_client(session_id).hgetall(usage_key).items()
+        ):
+            key_type, component_id = field.decode().split(":", 1)
+            size, saved_at = value.decode().split(":")
+            entries.append((float(saved_at), key_type, component_id, int(size)))
+        entries.sort()
+        return {
+            (key_type, component_id): size
+            for _, key_type, component_id, size in entries
+        }
+
+    def next_command_sequence(self, session_id: str, command_key: str) -> int:
+        key_name = self._get_key_name(self.sequence_prefix, session_id)
+        with self._get_session_client(session_id).pipeline() as pipe:
+            pipe.hincrby(key_name, command_key)
+            pipe.expire(key_name, self.ttl_gc)
+            return pipe.execute()[0]
+
+    def get_command_sequence(self, session_id: str, command_key: str) -> int:
+        key_name = self._get_key_name(self.sequence_prefix, session_id)
+        sequence = self._get_session_client(session_id).hget(key_name, command_key)
+        return int(sequence or 0)
+
+    def warm_up(self) -> None:
+        """Open `warm_up_connections` connections to every Redis server."""
+        for client in self._get_all_clients() + self.replica_clients:
+            pool = client.connection_pool
+            connections = [
+                _get_pool_connection(pool) for _ in range(self.warm_up_connections)
+            ]
+            for connection in connections:
+                pool.release(connection)
+
+    def reset_connections(self) -> None:
+        """Drop all connections without closing them.
+
+        Called in the child process after fork, because the sockets inherited from
+        the parent process can't be shared.
+        """
+        for client in self._get_all_clients() + self.replica_clients:
+            client.connection_pool.reset()
+
+    def _get_session_prefixes(self) -> list[str]:
+        return [self.key_prefix, self.context_prefix, self.templates_prefix]
+
+    def _get_session_ttl(self) -> datetime.timedelta:
+        if self.ttl_initial is None or _in_interaction.get():
+            return self.ttl
+        return self.ttl_initial
+
+    def _expire_session(self, pipe: Pipeline, session_id: str, key_name: str) -> None:
+        """Add commands that extend the lifetime of the session key to the pipeline.
+
+        When a command arrives for a session that started with `ttl_initial`, it
+        may not touch all the session keys. We extend them all, so that none of
+        them expires early.
+        """
+        ttl = self._get_session_ttl()
+        if self.track_usage:
+            pipe.expire(self._get_key_name(self.usage_prefix, session_id), ttl)
+        if self.ttl_initial is None or not _in_interaction.get():
+            pipe.expire(key_name, ttl)
+            return
+        for prefix in self._get_session_prefixes():
+            pipe.expire(self._get_key_name(prefix, session_id), ttl)
+
+    def _record_usage(
+        self, pipe: Pipeline, state_addr: StateAddress, prefix: str, size: int
+    ) -> None:
+        if not self.track_usage:
+            return
+        key_types = {
+            self.key_prefix: "states",
+            self.context_prefix: "contexts",
+            self.templates_prefix: "templates",
+        }
+        pipe.hset(
+            self._get_key_name(self.usage_prefix, state_addr.session_id),
+            f"{key_types[prefix]}:{state_addr.component_id}",
+            f"{size}:{time.time()}",
+        )
+
+    def _get_all_prefixes(self) -> list[str]:
+        """Return the prefixes of all keys that the store creates."""
+        return self._get_session_prefixes() + [
+            self.template_cache_prefix,
+            self.usage_prefix,
+            self.sequence_prefix,
+        ]
+
+    def _scan_key_batches(
+        self, client: Redis, batch_size: int
+    ) -> Iterator[list[bytes]]:
+        for prefix in self._get_all_prefixes():
+            batch: list[bytes] = []
+            for key in client.scan_iter(
+                match=f"{_escape_glob(prefix)}*", count=batch_size
+            ):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+    def _create_client(self, redis_url: str) -> Redis:
+        pool = ConnectionPool.from_url(redis_url, **self.connection_options)
+        return Redis(connection_pool=pool)
+
+    def _get_session_client(self, session_id: str) -> Redis:
+        """Return the client that stores the keys of the given session."""
+        return self.client
+
+    def _get_template_cache_client(self, hashed_value: str) -> Redis:
+        """Return the client that stores the cached template with the given hash."""
+        return self.client
+
+    def _get_all_clients(self) -> list[Redis]:
+        return [self.client]
+
+    def _get_replica_client(self, key_type: str, session_id: str) -> Redis | None:
+        """Return a replica to read the key type of the session from, or None.
+
+        None means that the key has to be read from the primary.
+        """
+        if not self.replica_clients or key_type not in self.replica_reads:
+            return None
+        if key_type != "templates":
+            with self._session_writes_lock:
+                last_write = self._session_writes.get(session_id)
+            sticky_seconds = self.replica_sticky_window.total_seconds()
+            if (
+                last_write is not None
+                and time.monotonic() - last_write < sticky_seconds
+            ):
+                return None
+        return random.choice(self.replica_clients)
+
+    def _record_session_write(self, session_id: str) -> None:
+        if not self.replica_clients:
+            return
+        now = time.monotonic()
+        with self._session_writes_lock:
+            if len(self._session_writes) >= MAX_TRACKED_SESSION_WRITES:
+                sticky_seconds = self.replica_sticky_window.total_seconds()
+                self._session_writes = {
+                    key: value
+                    for key, value in self._session_writes.items()
+                    if now - value < sticky_seconds
+                }
+            self._session_writes[session_id] = now
+
+    @staticmethod
+    def _get_key_name(key_prefix: str, session_id: str) -> str:
+        return f"{key_prefix}{session_id}"
+
+    @staticmethod
+    def _get_hashed_value(value: bytes) -> str:
+        return base64.urlsafe_b64encode(hashlib.md5(value).digest()).decode("ascii")[:8]
+
+
+def _escape_glob(value: str) -> str:
+    """Escape the special characters of a Redis glob-style pattern."""
+    return "".join(f"\\{char}" if char in "*?[]\\" else char for char in value)
+
+
+def _get_pool_connection(pool: ConnectionPool) -> Connection:
+    try:
+        return pool.get_connection()  # type: ignore[call-arg]
+    except TypeError:
+        # redis-py before 5.3 requires the command name
+        return pool.get_connection("PING")
+
+
+_redis_state_stores: "weakref.WeakSet[RedisStateStore]" = weakref.WeakSet()
+
+
+def _reset_redis_state_stores_after_fork() -> None:
+    for store in list(_redis_state_stores):
+        store.reset_connections()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_redis_state_stores_after_fork)
+
+
+class ConsistentHashRing:
+    """Consistent hash ring that maps keys to nodes.
+
+    Every node is placed on the ring multiple times ("virtual nodes") to spread
+    the keys evenly. A key belongs to the first node that follows the key's hash
+    on the ring. When a node is added, it only takes over the keys from the ring
+    segments it lands on, which is about 1/N of all keys for N nodes. The rest of
+    the keys stay where they were.
+
+    Args:
+        nodes: Names of the nodes.
+        virtual_nodes: Number of virtual nodes per node.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), virtual_nodes: int = 128):
+        self.virtual_nodes = virtual_nodes
+        self._hashes: list[int] = []
+        self._nodes: list[str] = []
+        for node in nodes:
+            self.add_node(node)
+
+    def add_node(self, node: str) -> None:
+        for i in range(self.virtual_nodes):
+            node_hash = self._hash(f"{node}#{i}")
+            index = bisect.bisect(self._hashes, node_hash)
+            self._hashes.insert(index, node_hash)
+            self._nodes.insert(index, node)
+
+    def remove_node(self, node: str) -> None:
+        pairs = [
+            (node_hash, ring_node)
+            for node_hash, ring_node in zip(self._hashes, self._nodes)
+            if ring_node != node
+        ]
+        self._hashes = [node_hash for node_hash, _ in pairs]
+        self._nodes = [ring_node for _, ring_node in pairs]
+
+    def get_node(self, key: str) -> str:
+        if not self._nodes:
+            raise ValueError("The hash ring is empty")
+        index = bisect.bisect(self._hashes, self._hash(key)) % len(self._hashes)
+        return self._nodes[index]
+
+    @property
+    def nodes(self) -> list[str]:
+        return list(dict.fromkeys(self._nodes))
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+class ShardedRedisStateStore(RedisStateStore):
+    """Redis-based state store that spreads sessions across several Redis nodes.
+
+    Session keys (states, contexts, and template references) are routed to a node
+    by consistent hashing of the session ID, so all keys of one session live on the
+    same node. Cached template blobs are shared between sessions and routed by their
+    hash instead.
+
+    Adding a node moves about 1/N of the sessions to the new node. These sessions
+    are effectively lost and return a "Session not found" error (410) on the next
+    command, the same way as expired sessions do. Cached template blobs that moved
+    are looked up on the other nodes and copied to the new location on first
+    access, so existing sessions keep re-rendering.
+
+    Args:
+        redis_urls: URLs of the Redis nodes. The order doesn't matter.
+        virtual_nodes: Number of virtual nodes per Redis node on the hash ring.
+        **kwargs: Other arguments are the same as for RedisStateStore, except for
+            the replica settings, which are not supported.
+    """
+
+    def __init__(
+        self,
+        redis_urls: list[str],
+        virtual_nodes: int = 128,
+        **kwargs,
+    ):
+        if not redis_urls:
+            raise ValueError("At least one Redis URL is required")
+        if kwargs.get("replica_urls"):
+            raise ValueError("ShardedRedisStateStore doesn't support replica_urls")
+        super().__init__(redis_url=redis_urls[0], **kwargs)
+        self.clients: dict[str, Redis] = {redis_urls[0]: self.client}
+        for redis_url in redis_urls[1:]:
+            self.clients[redis_url] = self._create_client(redis_url)
+        self.ring = ConsistentHashRing(redis_urls, virtual_nodes=virtual_nodes)
+
+    def _get_session_client(self, session_id: str) -> Redis:
+        return self.clients[self.ring.get_node(session_id)]
+
+    def _get_template_cache_client(self, hashed_value: str) -> Redis:
+        return self.clients[self.ring.get_node(hashed_value)]
+
+    def _get_all_clients(self) -> list[Redis]:
+        return list(self.clients.values())
+
+    def _restore_template_blob(self, hashed_value: str) -> bytes | None:
+        html_bytes = super()._restore_template_blob(hashed_value)
+        if html_bytes is not None:
+            return html_bytes
+
+        # The blob may have been saved before the node set changed. Look for it on
+        # the other nodes, and move it to where it belongs now.
+        cache_key = self._get_key_name(self.template_cache_prefix, hashed_value)
+        owner = self._get_template_cache_client(hashed_value)
+        for client in self._get_all_clients():
+            if client is owner:
+                continue
+            html_bytes = client.get(cache_key)
+            if html_bytes is not None:
+                self._save_template_blob(hashed_value, html_bytes)
+                return html_bytes
+        return None
+
+
+class _CachedSession:
+    """Session data cached by TieredRedisStateStore, valid for one version."""
+
+    __slots__ = ("version", "values")
+
+    def __init__(self, version: int):
+        self.version = version
+        # (key prefix, component ID) -> value
+        self.values: dict[tuple[str, str], bytes] = {}
+
+
+class TieredRedisStateStore(RedisStateStore):
+    """Redis-based state store with an in-process cache in front of it.
+
+    The cache keeps states, contexts, and template references of recently used
+    sessions, together with the session version. Every write to a session
+    increments the session version in Redis. Before returning a cached value, the
+    store compares its version with the one in Redis. This check replaces the
+    read of the value itself and doesn't transfer the value over the network. If
+    another process has written to the session in between, the whole cached
+    session is dropped and the value is read from Redis.
+
+    When the same process serves most commands of a session (e.g., with sticky
+    sessions), the state is sent to Redis but almost never read back.
+
+    Args:
+        l1_max_sessions: Maximum number of sessions in the cache.
+        version_prefix: Prefix for keys that store session versions.
+        **kwargs: Other arguments are the same as for RedisStateStore, except for
+            the replica settings, which are not supported.
+    """
+
+    def __init__(
+        self,
+        l1_max_sessions: int = 1000,
+        version_prefix: str = "lc:versions:",
+        **kwargs,
+    ):
+        if kwargs.get("replica_urls"):
+            raise ValueError("TieredRedisStateStore doesn't support replica_urls")
+        super().__init__(**kwargs)
+        self.l1_max_sessions = l1_max_sessions
+        self.version_prefix = version_prefix
+        self.metrics: Counter[str] = Counter()
+        self._l1_sessions: OrderedDict[str, _CachedSession] = OrderedDict()
+        self._l1_lock = threading.Lock()
+
+    def save_component_template(
+        self, state_addr: StateAddress, html_bytes: bytes
+    ) -> None:
+        hashed_value = self._get_hashed_value(html_bytes)
+        self._save_by_prefix(
+            state_addr,
+            self.templates_prefix,
+            hashed_value.encode("ascii"),
+            size=len(html_bytes),
+            template_blob=(hashed_value, html_bytes),
+        )
+
+    def restore_component_template(self, state_addr: StateAddress) -> bytes | None:
+        hashed_value = self._restore_by_prefix(
+            state_addr, self.templates_prefix, "templates"
+        )
+        if hashed_value is None:
+            return None
+        return self._get_template_blob(hashed_value.decode("ascii"))
+
+    def _expire_cleared_session(self, pipe: Pipeline, session_id: str) -> None:
+        super()._expire_cleared_session(pipe, session_id)
+        version_key = self._get_key_name(self.version_prefix, session_id)
+        pipe.expire(version_key, self.ttl_gc)
+
+    def clear_all_sessions(
+        self,
+        batch_size: int = 1000,
+        max_keys_per_second: float | None = None,
+        progress: Callable[[int], None] | None = None,
+    ) -> None:
+        super().clear_all_sessions(batch_size, max_keys_per_second, progress)
+        with self._l1_lock:
+            self._l1_sessions.clear()
+
+    def delete_components(self, session_id: str, component_ids: Iterable[str]) -> None:
+        super().delete_components(session_id, component_ids)
+        version_key = self._get_key_name(self.version_prefix, session_id)
+        with self._get_session_client(session_id).pipeline() as pipe:
+            pipe.incr(version_key)
+            pipe.expire(version_key, self._get_session_ttl())
+            pipe.execute()
+        with self._l1_lock:
+            self._l1_sessions.pop(session_id, None)
+
+    def _save_by_prefix(
+        self,
+        state_addr: StateAddress,
+        prefix: str,
+        raw_state: bytes,
+        size: int | None = None,
+        template_blob: tuple[str, bytes] | None = None,
+    ) -> None:
+        if size is None:
+            size = len(raw_state)
+        key_name = self._get_key_name(prefix, state_addr.session_id)
+        version_key = self._get_key_name(self.version_prefix, state_addr.session_id)
+        client = self._get_session_client(state_addr.session_id)
+        with client.pipeline() as pipe:
+            pipe.incr(version_key)
+            pipe.hset(key_name, state_addr.component_id, raw_state)
+            pipe.expire(version_key, self._get_session_ttl())
+            self._expire_session(pipe, state_addr.session_id, key_name)
+            self._record_usage(pipe, state_addr, prefix, size)
+            blob_refresh = self._queue_template_blob(pipe, client, template_blob)
+            results = pipe.execute()
+        self._finish_template_blob(template_blob, blob_refresh, results)
+        version = results[0]
+
+        with self._l1_lock:
+            session = self._l1_sessions.get(state_addr.session_id)
+            if session is None or session.version != version - 1:
+                # Another process has written to the session since we cached it.
+                session = _CachedSession(version)
+            session.version = version
+            session.values[(prefix, state_addr.component_id)] = raw_state
+            self._cache_session(state_addr.session_id, session)
+
+    def _restore_by_prefix(
+        self, state_addr: StateAddress, prefix: str, key_type: str
+    ) -> bytes | None:
+        key_name = self._get_key_name(prefix, state_addr.session_id)
+        version_key = self._get_key_name(self.version_prefix, state_addr.session_id)
+        client = self._get_session_client(state_addr.session_id)
+
+        with self._l1_lock:
+            session = self._l1_sessions.get(state_addr.session_id)
+            cached_version = session.version if session else None
+            cached_value = (
+                session.values.get((prefix, state_addr.component_id))
+                if session
+                else None
+            )
+
+        if cached_value is not None:
+            with client.pipeline() as pipe:
+                pipe.get(version_key)
+                pipe.expire(version_key, self._get_session_ttl())
+                self._expire_session(pipe, state_addr.session_id, key_name)
+                raw_version = pipe.execute()[0]
+            if raw_version is not None and int(raw_version) == cached_version:
+                self.metrics["l1_hits"] += 1
+                return cached_value
+
+        self.metrics["l1_misses"] += 1
+        # Read the version before the value. If the session changes in between,
+        # we cache the new value with the old version, and the next read
+        # fetches it again.
+        with client.pipeline() as pipe:
+            pipe.get(version_key)
+            pipe.hget(key_name, state_addr.component_id)
+            pipe.expire(version_key, self._get_session_ttl())
+            self._expire_session(pipe, state_addr.session_id, key_name)
+            raw_version, raw_state = pipe.execute()[:2]
+        if raw_version is None or raw_state is None:
+            return raw_state
+
+        version = int(raw_version)
+        with self._l1_lock:
+            session = self._l1_sessions.get(state_addr.session_id)
+            if session is None or session.version != version:
+                session = _CachedSession(version)
+            session.values[(prefix, state_addr.component_id)] = raw_state
+            self._cache_session(state_addr.session_id, session)
+        return raw_state
+
+    def _get_all_prefixes(self) -> list[str]:
+        return super()._get_all_prefixes() + [self.version_prefix]
+
+    def _cache_session(self, session_id: str, session: _CachedSession) -> None:
+        # Called with the lock held.
+        self._l1_sessions[session_id] = session
+        self._l1_sessions.move_to_end(session_id)
+        while len(self._l1_sessions) > self.l1_max_sessions:
+            self._l1_sessions.popitem(last=False)
+
+
+class CircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreakerStateStore(IStateStore):
+    """State store wrapper that stops calling a failing store for a while.
+
+    Every call to the wrapped store is checked against its latency budget. Calls
+    that raise an exception or exceed the budget are failures. After
+    `failure_threshold` failures in a row, the circuit opens, and for
+    `reset_timeout` the wrapped store is not called at all. Instead, the wrapper
+    behaves as if all sessions have expired: reads return None or False, and
+    writes are dropped. The "call_command" view then responds with 410, the same
+    way as for an expired session, and pages still render with freshly
+    initialized components.
+
+    After `reset_timeout`, the circuit becomes half-open and lets one call through.
+    If it succeeds, the circuit closes; otherwise, it opens again.
+
+    Latency budgets don't interrupt the calls. Use the socket timeouts of the
+    wrapped store (e.g., `socket_timeout` of RedisStateStore) to limit how long
+    a single call may hang.
+
+    Args:
+        store: The wrapped state store.
+        failure_threshold: Number of consecutive failures that opens the circuit.
+        reset_timeout: How long the circuit stays open before a trial call.
+        latency_budget: Default latency budget for a call, in seconds.
+        latency_budgets: Latency budgets for individual operations, in seconds.
+            Keys are method names, e.g., {"restore_component_template": 0.05}.
+    """
+
+    def __init__(
+        self,
+        store: IStateStore,
+        failure_threshold: int = 5,
+        reset_timeout: datetime.timedelta = datetime.timedelta(seconds=30),
+        latency_budget: float = 0.5,
+        latency_budgets: dict[str, float] | None = None,
+    ):
+        self.store = store
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latency_budget = latency_budget
+        self.latency_budgets = latency_budgets or {}
+        self.metrics: Counter[str] = Counter()
+        self._state = CircuitState.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            if self._state == CircuitState.OPEN and self._reset_timeout_passed():
+                self._set_state(CircuitState.HALF_OPEN)
+            return self._state
+
+    def session_exists(self, session_id: str) -> bool:
+        return self._call("session_exists", False, session_id)
+
+    def component_initialized(self, state_addr: StateAddress) -> bool:
+        return self._call("component_initialized", False, state_addr)
+
+    def save_state(self, state_addr: StateAddress, raw_state: bytes) -> None:
+        return self._call("save_state", None, state_addr, raw_state)
+
+    def restore_state(self, state_addr: StateAddress) -> bytes | None:
+        return self._call("restore_state", None, state_addr)
+
+    def save_context(self, state_addr: StateAddress, raw_context: bytes) -> None:
+        return self._call("save_context", None, state_addr, raw_context)
+
+    def restore_context(self, state_addr: StateAddress) -> bytes | None:
+        return self._call("restore_context", None, state_addr)
+
+    def save_component_template(
+        self, state_addr: StateAddress, html_bytes: bytes
+    ) -> None:
+        return self._call("save_component_template", None, state_addr, html_bytes)
+
+    def restore_component_template(self, state_addr: StateAddress) -> bytes | None:
+        return self._call("restore_component_template", None, state_addr)
+
+    def clear_session(self, session_id: str) -> None:
+        return self._call("clear_session", None, session_id)
+
+    def clear_sessions(self, session_ids: Iterable[str]) -> None:
+        return self._call("clear_sessions", None, list(session_ids))
+
+    def clear_all_sessions(self) -> None:
+        return self.store.clear_all_sessions()
+
+    def warm_up(self) -> None:
+        return self.store.warm_up()
+
+    @contextmanager
+    def interaction(self) -> Iterator[None]:
+        with self.store.interaction():
+            yield
+
+    def get_session_ids(self) -> Iterator[str]:
+        return self.store.get_session_ids()
+
+    def get_component_ids(self, session_id: str) -> set[str]:
+        return self._call("get_component_ids", set(), session_id)
+
+    def delete_components(self, session_id: str, component_ids: Iterable[str]) -> None:
+        return self._call("delete_components", None, session_id, component_ids)
+
+    @property
+    def tracks_usage(self) -> bool:
+        return self.store.tracks_usage
+
+    def get_session_usage(self, session_id: str) -> dict[tuple[str, str], int]:
+        return self._call("get_session_usage", {}, session_id)
+
+    def next_command_sequence(self, session_id: str, command_key: str) -> int:
+        return self._call("next_command_sequence", 0, session_id, command_key)
+
+    def get_command_sequence(self, session_id: str, command_key: str) -> int:
+        return self._call("get_command_sequence", 0, session_id, command_key)
+
+    def _call(self, operation: str, fallback: Any, *args) -> Any:
+        if not self._allow_call():
+            self.metrics["rejected_calls"] += 1
+            return fallback
+
+        started_at = time.monotonic()
+        try:
+            result = getattr(self.store, operation)(*args)
+        except Exception:
+            self.metrics["failed_calls"] += 1
+            self._record_failure()
+            raise
+
+        elapsed = time.monotonic() - started_at
+        if elapsed > self.latency_budgets.get(operation, self.latency_budget):
+            logger.warning(
+                "State store call %s took %.3fs, which exceeds its latency budget",
+                operation,
+                elapsed,
+            )
+            self.metrics["slow_calls"] += 1
+            self._record_failure()
+        else:
+            self._record_success()
+        return result
+
+    def _allow_call(self) -> bool:
+        with self._lock:
+            if self._state == CircuitState.CLOSED:
+                return True
+            if self._state == CircuitState.OPEN:
+                if not self._reset_timeout_passed():
+                    return False
+                self._set_state(CircuitState.HALF_OPEN)
+            # Half-open: let only one trial call through.
+            if self._trial_in_progress:
+                return False
+            self._trial_in_progress = True
+            return True
+
+    def _record_success(self) -> None:
+        with self._lock:
+            self._consecutive_failures = 0
+            self._trial_in_progress = False
+            if self._state != CircuitState.CLOSED:
+                self._set_state(CircuitState.CLOSED)
+
+    def _record_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            self._trial_in_progress = False
+            if self._state == CircuitState.HALF_OPEN or (
+                self._state == CircuitState.CLOSED
+                and self._consecutive_failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+                self._set_state(CircuitState.OPEN)
+
+    def _reset_timeout_passed(self) -> bool:
+        elapsed = time.monotonic() - self._opened_at
+        return elapsed >= self.reset_timeout.total_seconds()
+
+    def _set_state(self, state: CircuitState) -> None:
+        logger.warning("State store circuit breaker: %s -> %s", self._state, state)
+        self._state = state
+        self.metrics[f"transitions_to_{state.value}"] += 1
@@ -5,6 +5,7 @@ from django.utils.module_loading import import_string
 from pydantic import BaseModel, Field
 
 from livecomponents.manager import StateManager
+from livecomponents.manager.render_cache import IRenderCache
 from livecomponents.manager.serializers import IStateSerializer
 from livecomponents.manager.stores import IStateStore
 
@@ -44,14 +45,51 @@ class LivecomponentsConfig(BaseModel):
         )
     )
 
+    circuit_breaker: ClassConfig[IStateStore] | None = Field(
+        default=None,
+        description=(
+            "Optional wrapper around the state store that fails fast when the store "
+            "is unavailable. For example, "
+            "livecomponents.manager.stores.CircuitBreakerStateStore. The wrapper "
+            "receives the state store as the 'store' argument."
+        ),
+    )
+
     state_manager: ClassConfig[StateManager] = Field(
         default_factory=lambda: ClassConfig(
             cls="livecomponents.manager.manager.StateManager"
         )
     )
 
+    render_cache: ClassConfig[IRenderCache] | None = Field(
+        default_factory=lambda: ClassConfig(
+            cls="livecomponents.manager.render_cache.MemoryRenderCache"
+        ),
+        description=(
+            "Cache of the rendered HTML of components with cache_render = True. "
+            "For example, livecomponents.manager.render_cache.DjangoCacheRenderCache "
+            "to share the cache between processes. None disables the cache."
+        ),
+    )
+
     createlivecomponent: CreateLiveComponentConfig = CreateLiveComponentConfig()
 
+    max_cleared_sessions: int = Field(
+        default=100,
+        description=(
+            "Maximum number of session IDs accepted by one request to the "
+            "clear_session view."
+        ),
+    )
+
+    max_batch_commands: int = Field(
+        default=20,
+        description=(
+            "Maximum number of commands accepted by one request to the "
+            "call_commands view."
+        ),
+    )
+
     xframe_options_exempt: bool = Field(
         default=False,
         description=(
@@ -240,6 +240,7 @@ class LiveComponentNode(ComponentNode):
             context["full_component_id"] = None
 
         state_addr = self.get_state_addr(context)
+        self.record_rendered_component(state_addr)
         sentry_arg = f"[{state_addr.component_id}]"
         if self.component_template is not None:
             with start_span(f"save_component_template({sentry_arg})"):
@@ -255,6 +256,11 @@ class LiveComponentNode(ComponentNode):
                 )
         return super().render(context)
 
+    def record_rendered_component(self, state_addr: StateAddress):
+        from livecomponents.manager import get_state_manager
+
+        get_state_manager().record_rendered_component(state_addr)
+
     def save_component_template(
         self, state_addr: StateAddress, component_template: str
     ):
@@ -1,6 +1,7 @@
-from typing import TypeVar
+from typing import Any, TypeVar
 
-from pydantic import BaseModel, ConfigDict, field_validator
+from pydantic import BaseModel, Field
+from pydantic_core import core_schema
 
 from livecomponents.const import DEFAULT_OWN_ID, HIER_SEP, TYPE_SEP
 from livecomponents.utils import LiveComponentsPath, get_ancestor_id
@@ -29,14 +30,131 @@ class ComponentId(str):
             return NotImplemented
 
 
-class StateAddress(BaseModel):
+_MISSING = object()
+_setattr = object.__setattr__
+
+
+class StateAddress:
+    """The address of a component state: a session ID and a component ID.
+
+    Addresses are immutable and hashable, and are used as dict and set keys all
+    over the stores and the execution results, so the class uses ``__slots__``
+    instead of a Pydantic model. The hash is computed once, and the parsed path
+    segments, the parent, the component name and the ancestor lookups are
+    memoized on the instance.
+
+    The class keeps the subset of the Pydantic API the previous implementation
+    was used with: keyword construction, ``model_copy(update=...)`` and
+    ``model_dump()``. It can also be used as a field type in Pydantic models.
+    """
+
+    __slots__ = (
+        "session_id",
+        "component_id",
+        "_hash",
+        "_segments",
+        "_parent",
+        "_ancestors",
+    )
+
     session_id: str
     component_id: ComponentId
+    _hash: int
+    _segments: tuple[str, ...]
+    _parent: "StateAddress | None"
+    _ancestors: "dict[str, StateAddress | None]"
+
+    def __init__(self, session_id: str, component_id: str):
+        if type(component_id) is not ComponentId:
+            component_id = ComponentId(component_id)
+        _setattr(self, "session_id", session_id)
+        _setattr(self, "component_id", component_id)
+        # The remaining slots are filled in lazily, see _get_segments() etc.
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __eq__(self, other):
+        if not isinstance(other, StateAddress):
+            return NotImplemented
+        return (
+            self.session_id == other.session_id
+            and self.component_id == other.component_id
+        )
+
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            value = hash((self.session_id, self.component_id))
+            _setattr(self, "_hash", value)
+            return value
+
+    def __repr__(self):
+        return (
+            f"{type(self).__name__}(session_id={self.session_id!r}, "
+            f"component_id={str(self.component_id)!r})"
+        )
+
+    def __reduce__(self):
+        return type(self), (self.session_id, str(self.component_id))
+
+    def __setstate__(self, state):
+        # Only called for pickles of the previous Pydantic model, which restore
+        # the state dict of BaseModel.__getstate__() on an empty instance.
+        fields = state.get("__dict__", state)
+        _setattr(self, "session_id", fields["session_id"])
+        _setattr(self, "component_id", ComponentId(fields["component_id"]))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
-    @field_validator("component_id", mode="before")
     @classmethod
-    def validate_component_id(cls, v):
-        return ComponentId(v)
+    def __get_pydantic_core_schema__(cls, source_type, handler):
+        return core_schema.no_info_plain_validator_function(
+            cls._validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda value: value.model_dump()
+            ),
+        )
+
+    @classmethod
+    def _validate(cls, value) -> "StateAddress":
+        if isinstance(value, StateAddress):
+            return value
+        if isinstance(value, dict):
+            return cls(**value)
+        raise ValueError(f"Cannot convert {value!r} to {cls.__name__}")
+
+    def model_copy(
+        self, *, update: dict | None = None, deep: bool = False
+    ) -> "StateAddress":
+        """Return a copy of the address with the given fields replaced."""
+        if not update:
+            return self
+        return type(self)(
+            session_id=update.get("session_id", self.session_id),
+            component_id=update.get("component_id", self.component_id),
+        )
+
+    def model_dump(self, **kwargs) -> dict[str, str]:
+        """Return the address as a dict of its fields."""
+        return {"session_id": self.session_id, "component_id": self.component_id}
+
+    def _get_segments(self) -> tuple[str, ...]:
+        segments = getattr(self, "_segments", None)
+        if segments is None:
+            # Validates the component ID the same way the path helpers do.
+            LiveComponentsPath(self.component_id)
+            segments = tuple(self.component_id.split(HIER_SEP)[1:])
+            _setattr(self, "_segments", segments)
+        return segments
 
     def __or__(self, other: str | tuple[str, str]):
         new_component_id = self.component_id | other
@@ -50,6 +168,17 @@ class StateAddress(BaseModel):
 
     def find_ancestor(self, ancestor_type: str) -> "StateAddress | None":
         """Find the closest ancestor of the given type."""
+        ancestors = getattr(self, "_ancestors", None)
+        if ancestors is None:
+            ancestors = {}
+            _setattr(self, "_ancestors", ancestors)
+        ancestor = ancestors.get(ancestor_type, _MISSING)
+        if ancestor is _MISSING:
+            ancestor = self._find_ancestor(ancestor_type)
+            ancestors[ancestor_type] = ancestor
+        return ancestor  # type: ignore[return-value]
+
+    def _find_ancestor(self, ancestor_type: str) -> "StateAddress | None":
         ancestor_component_id = get_ancestor_id(self.component_id, ancestor_type)
         if not ancestor_component_id:
             return None
@@ -67,12 +196,18 @@ class StateAddress(BaseModel):
         """Returns the parent of this component or None.
 
         Reutrn None if this component is a root component."""
-        parent = LiveComponentsPath(self.component_id).parent
-        if parent == LiveComponentsPath("|"):
-            return None
-        return StateAddress(
-            session_id=self.session_id, component_id=ComponentId(parent)
-        )
+        parent = getattr(self, "_parent", _MISSING)
+        if parent is _MISSING:
+            segments = self._get_segments()
+            if len(segments) <= 1:
+                parent = None
+            else:
+                parent = StateAddress(
+                    session_id=self.session_id,
+                    component_id=HIER_SEP + HIER_SEP.join(segments[:-1]),
+                )
+            _setattr(self, "_parent", parent)
+        return parent  # type: ignore[return-value]
 
     def must_get_parent(self) -> "StateAddress":
         """Returns the parent of this component or raises ValueError.
@@ -85,9 +220,7 @@ class StateAddress(BaseModel):
         return parent
 
     def get_component_name(self):
-        return LiveComponentsPath(self.component_id).stem
-
-    model_config = ConfigDict(frozen=True, arbitrary_types_allowed=True)
+        return self._get_segments()[-1].split(TYPE_SEP)[0]
 
 
 class CallMethodRequestArgs(BaseModel):
@@ -97,3 +230,16 @@ class CallMethodRequestArgs(BaseModel):
 
     def get_state_address(self) -> StateAddress:
         return StateAddress(session_id=self.session_id, component_id=self.component_id)
+
+
+class BatchCommandArgs(BaseModel):
+    component_id: str
+    command_name: str
+    kwargs: dict[str, Any] = Field(default_factory=dict)
+
+    def get_state_address(self, session_id: str) -> StateAddress:
+        return StateAddress(session_id=session_id, component_id=self.component_id)
+
+
+class CallCommandsRequestBody(BaseModel):
+    commands: list[BatchCommandArgs]
@@ -1,10 +1,11 @@
 from django.urls import path
 
-from livecomponents.views import call_command, clear_session
+from livecomponents.views import call_command, call_commands, clear_session
 
 app_name = "livecomponents"
 
 urlpatterns = [
     path("call_command/", call_command, name="call-command"),
+    path("call_commands/", call_commands, name="call-commands"),
     path("clear_session/", clear_session, name="clear-session"),
 ]
@@ -2,19 +2,32 @@ import json
 from typing import Any
 
 from django.core.exceptions import BadRequest
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.template import RequestContext, Template
 from django.views.decorators.clickjacking import xframe_options_exempt
 from django.views.decorators.http import require_POST
 from django_components.component_registry import NotRegistered
+from pydantic import ValidationError
 
-from livecomponents.exceptions import CancelRendering
+from livecomponents.exceptions import (
+    CancelRendering,
+    CommandSuperseded,
+    ComponentStateNotFound,
+    InvalidCommandArguments,
+    SessionQuotaExceeded,
+    get_error_list,
+)
 from livecomponents.logging import logger
 from livecomponents.manager import get_state_manager
-from livecomponents.manager.manager import CallContext
+from livecomponents.manager.execution_results import ExecutionResults
+from livecomponents.manager.manager import CallContext, StateManager
 from livecomponents.sentry_utils import set_transaction_name, start_span
 from livecomponents.settings import get_config
-from livecomponents.types import CallMethodRequestArgs, StateAddress
+from livecomponents.types import (
+    CallCommandsRequestBody,
+    CallMethodRequestArgs,
+    StateAddress,
+)
 
 
 def maybe_xframe_exempt(view_func):
@@ -40,16 +53,123 @@ def call_command(request: HttpRequest):
         )
         return HttpResponse("Session does not exist. It may have expired", status=410)
 
+    # The first command extends the session from the initial TTL to the full one.
+    with state_manager.interaction():
+        try:
+            command_sequence = state_manager.start_coalesced_command(
+                args.get_state_address(), args.command_name, kwargs
+            )
+            call_context = state_manager.call_component_command(
+                request,
+                args.get_state_address(),
+                args.command_name,
+                kwargs=kwargs,
+                command_sequence=command_sequence,
+            )
+        except CommandSuperseded:
+            # A newer request of the same command will render the component.
+            return HttpResponse(status=204)
+        except NotRegistered as error:
+            raise BadRequest(
+                f"Component {args.component_id} is not registered"
+            ) from error
+        except InvalidCommandArguments as error:
+            return invalid_arguments_response(error)
+        except SessionQuotaExceeded as error:
+            logger.warning("Command %s rejected: %s", sentry_arg, error)
+            return HttpResponse("Session quota exceeded", status=413)
+        except ComponentStateNotFound as error:
+            logger.warning("Command %s rejected: %s", sentry_arg, error)
+            return component_state_not_found_response()
+
+        return render_execution_results(call_context, sentry_arg)
+
+
+@maybe_xframe_exempt
+@require_POST
+def call_commands(request: HttpRequest):
+    """Call several commands of one session and re-render the dirty components once.
+
+    The session ID is passed in the query string, and the commands in a JSON body:
+    {"commands": [{"component_id": ..., "command_name": ..., "kwargs": {...}}]}.
+    The commands run in order and share the component states, which are saved
+    once at the end. If any command is unknown or has invalid arguments, none of
+    them runs.
+    """
+    session_id = request.GET.get("session_id")
+    if not session_id:
+        return HttpResponse("session_id is required", status=400)
+    if request.content_type != "application/json":
+        return HttpResponse("The request body must be JSON", status=400)
     try:
-        call_context = state_manager.call_component_command(
-            request,
-            args.get_state_address(),
-            args.command_name,
-            kwargs=kwargs,
+        body = CallCommandsRequestBody.model_validate(parse_body(request))
+    except ValidationError as error:
+        return JsonResponse(
+            {"error": "invalid_request", "errors": get_error_list(error)}, status=400
         )
-    except NotRegistered as error:
-        raise BadRequest(f"Component {args.component_id} is not registered") from error
+    max_batch_commands = get_config().max_batch_commands
+    if not body.commands or len(body.commands) > max_batch_commands:
+        return HttpResponse(
+            f"From 1 to {max_batch_commands} commands are allowed", status=400
+        )
+
+    state_manager = get_state_manager()
+    sentry_arg = ", ".join(
+        f"[{command.component_id}].{command.command_name}" for command in body.commands
+    )
+    set_transaction_name(f"lc.call_commands({sentry_arg})")
+    if not state_manager.session_exists(session_id):
+        logger.warning("Session %s does not exist. It may have expired", session_id)
+        return HttpResponse("Session does not exist. It may have expired", status=410)
+
+    commands = [
+        (command.get_state_address(session_id), command.command_name, command.kwargs)
+        for command in body.commands
+    ]
+    try:
+        validate_batch_commands(state_manager, commands)
+    except InvalidCommandArguments as error:
+        return invalid_arguments_response(error)
+
+    execution_results = ExecutionResults()
+    # Rejected batches raise through state_cache(), so none of their states is saved.
+    try:
+        with state_manager.interaction(), state_manager.state_cache():
+            for state_addr, command_name, kwargs in commands:
+                call_context = state_manager.call_component_command(
+                    request,
+                    state_addr,
+                    command_name,
+                    kwargs=kwargs,
+                    execution_results=execution_results,
+                )
+            return render_execution_results(call_context, sentry_arg)
+    except SessionQuotaExceeded as error:
+        logger.warning("Commands %s rejected: %s", sentry_arg, error)
+        return HttpResponse("Session quota exceeded", status=413)
+    except ComponentStateNotFound as error:
+        logger.warning("Commands %s rejected: %s", sentry_arg, error)
+        return component_state_not_found_response()
+
+
+def validate_batch_commands(
+    state_manager: StateManager, commands: list[tuple[StateAddress, str, dict]]
+):
+    """Reject the whole batch before running any of its commands."""
+    for state_addr, command_name, kwargs in commands:
+        try:
+            component_cls = state_manager.get_component_class(
+                state_addr.get_component_name()
+            )
+        except NotRegistered as error:
+            raise BadRequest(
+                f"Component {state_addr.component_id} is not registered"
+            ) from error
+        component_cls.get_command_info(command_name).validate_kwargs(kwargs)
+
 
+def render_execution_results(call_context: CallContext, sentry_arg: str):
+    """Re-render the dirty components of the execution results."""
     headers = call_context.execution_results.response_headers
 
     if not call_context.execution_results.is_partial_render_necessary():
@@ -58,28 +178,90 @@ def call_command(request: HttpRequest):
             headers=call_context.execution_results.response_headers,
         )
 
+    if (
+        call_context.state_manager.skip_unchanged_renders
+        and not call_context.execution_results.dirty_components
+    ):
+        # Nothing to re-render, e.g., the command didn't change the state.
+        # Without the option, the response stays a 200 with an empty body.
+        return HttpResponse(status=204, headers=headers)
+
     dirty_components = deduplicate_dirty_components(
         call_context.execution_results.dirty_components
     )
 
     with start_span(f"re_render_components({sentry_arg})"):
-        rendered_components = re_render_components(
-            component_addresses=dirty_components,
-            call_context=call_context,
-        )
+        try:
+            rendered_components = re_render_components(
+                component_addresses=dirty_components,
+                call_context=call_context,
+            )
+        except SessionQuotaExceeded as error:
+            logger.warning("Command %s rejected: %s", sentry_arg, error)
+            return HttpResponse("Session quota exceeded", status=413)
     return HttpResponse("\n".join(rendered_components), headers=headers)
 
 
+def invalid_arguments_response(error: InvalidCommandArguments) -> JsonResponse:
+    return JsonResponse(
+        {
+            "error": "invalid_arguments",
+            "command": error.command_name,
+            "errors": error.errors,
+        },
+        status=400,
+    )
+
+
+def component_state_not_found_response() -> HttpResponse:
+    # The component was evicted or deleted. Like an expired session, the client
+    # should reload the page.
+    return HttpResponse(
+        "Component state not found. It may have been evicted", status=410
+    )
+
+
 @maybe_xframe_exempt
 @require_POST
 def clear_session(request: HttpRequest):
-    session_id = request.GET.get("session_id")
-    if not session_id:
+    """Schedule sessions for deletion.
+
+    Accepts one or more "session_id" parameters in the query string or in the
+    form body, so that a page can clear the sessions of several closed pages at
+    once.
+    """
+    session_ids = list(
+        dict.fromkeys(
+            request.GET.getlist("session_id") + get_posted_session_ids(request)
+        )
+    )
+    if not session_ids:
         return HttpResponse("session_id is required", status=400)
-    get_state_manager().clear_session(session_id)
+    max_cleared_sessions = get_config().max_cleared_sessions
+    if len(session_ids) > max_cleared_sessions:
+        return HttpResponse(
+            f"At most {max_cleared_sessions} session IDs are allowed", status=400
+        )
+    get_state_manager().clear_sessions(session_ids)
     return HttpResponse("")
 
 
+def get_posted_session_ids(request: HttpRequest) -> list[str]:
+    if request.content_type == "application/json":
+        body = parse_body(request)
+        if not isinstance(body, dict):
+            raise BadRequest("Invalid clear_session request body")
+        session_ids = body.get("session_id", [])
+        if isinstance(session_ids, str):
+            return [session_ids]
+        if not isinstance(session_ids, list) or not all(
+            isinstance(session_id, str) for session_id in session_ids
+        ):
+            raise BadRequest("session_id must be a string or a list of strings")
+        return session_ids
+    return request.POST.getlist("session_id")
+
+
 def parse_body(request: HttpRequest) -> dict[str, Any]:
     if request.content_type == "application/json":
         if request.body == b"":
@@ -151,4 +333,6 @@ def re_render_component(call_context: CallContext, state_address: StateAddress)
             raise ValueError(error_message)
 
         template = "{% load livecomponents component_tags %}" + html
-        return Template(template).render(context)
+        state_manager = call_context.state_manager
+        with state_manager.collect_orphaned_components(state_address):
+            return Template(template).render(context)
@@ -1,9 +1,17 @@
 import os
+from urllib.parse import urlsplit, urlunsplit
 
 import pytest
 
 from livecomponents.manager import get_state_manager
-from livecomponents.manager.stores import RedisStateStore
+from livecomponents.manager.stores import (
+    DjangoCacheStateStore,
+    MemoryStateStore,
+    RedisStateStore,
+    ShardedRedisStateStore,
+    SharedMemoryStateStore,
+    SQLiteStateStore,
+)
 
 # Playwright runs the async loop which makes Django raising a SynchronousOnlyOperation
 # exception. This is a workaround to allow async code in tests.
@@ -25,3 +33,49 @@ def redis_state_store():
     if not redis_url:
         pytest.skip("Redis URL not provided")
     return RedisStateStore(redis_url=redis_url)
+
+
+@pytest.fixture
+def redis_node_urls():
+    """URLs of three "Redis nodes" that are separate databases of REDIS_URL."""
+    redis_url = os.environ.get("REDIS_URL")
+    if not redis_url:
+        pytest.skip("Redis URL not provided")
+    parts = urlsplit(redis_url)
+    return [urlunsplit(parts._replace(path=f"/{db}")) for db in (1, 2, 3)]
+
+
+@pytest.fixture
+def sharded_redis_state_store(redis_node_urls):
+    store = ShardedRedisStateStore(redis_urls=redis_node_urls)
+    store.clear_all_sessions()
+    return store
+
+
+@pytest.fixture
+def memory_state_store():
+    return MemoryStateStore()
+
+
+@pytest.fixture
+def shared_memory_state_store(tmp_path):
+    return SharedMemoryStateStore(directory=str(tmp_path))
+
+
+@pytest.fixture
+def sqlite_state_store(tmp_path):
+    return SQLiteStateStore(path=str(tmp_path / "lc.sqlite3"), gc_interval=None)
+
+
+@pytest.fixture
+def django_cache_state_store(settings):
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "livecomponents": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "livecomponents-tests",
+        },
+    }
+    store = DjangoCacheStateStore(cache_alias="livecomponents")
+    store.clear_all_sessions()
+    return store
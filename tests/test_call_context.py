@@ -0,0 +1,55 @@
+import pytest
+
+from livecomponents.manager.execution_results import ExecutionResults
+from livecomponents.manager.manager import CallContext, StateManager
+from livecomponents.manager.serializers import PickleStateSerializer
+from livecomponents.manager.stores import MemoryStateStore
+from livecomponents.types import StateAddress
+
+TABLE = StateAddress(session_id="session_id", component_id="|table:0")
+ROW = TABLE | ("row", "1")
+CELL = ROW | ("cell", "2")
+
+
+@pytest.fixture
+def call_context(rf) -> CallContext:
+    state_manager = StateManager(
+        serializer=PickleStateSerializer(), store=MemoryStateStore()
+    )
+    for state_addr in [TABLE, ROW, CELL]:
+        state_manager.set_component_state(state_addr, {"id": state_addr.component_id})
+    return CallContext(
+        request=rf.get("/"),
+        state=state_manager.get_component_state(CELL),
+        state_address=CELL,
+        state_manager=state_manager,
+    )
+
+
+def test_call_context_find_one(call_context):
+    found = call_context.find_one(ROW.component_id)
+    assert found.state_address == ROW
+    assert found.component_id == ROW.component_id
+    assert found.state == {"id": ROW.component_id}
+    assert found.execution_results is call_context.execution_results
+
+
+def test_call_context_find_ancestor(call_context):
+    found = call_context.find_ancestor("table")
+    assert found.state_address == TABLE
+    assert found.state == {"id": TABLE.component_id}
+
+
+def test_call_context_parent(call_context):
+    assert call_context.parent.state_address == ROW
+    assert call_context.parent.parent.state_address == TABLE
+
+
+def test_call_context_is_generic():
+    assert CallContext[dict] is not CallContext
+
+
+def test_execution_results_are_not_shared():
+    first, second = ExecutionResults(), ExecutionResults()
+    first.dirty_components.add(TABLE)
+    assert second.dirty_components == set()
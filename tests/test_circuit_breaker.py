@@ -0,0 +1,103 @@
+import datetime
+
+import pytest
+
+from livecomponents.manager.manager import StateManager
+from livecomponents.manager.serializers import PickleStateSerializer
+from livecomponents.manager.stores import (
+    CircuitBreakerStateStore,
+    CircuitState,
+    MemoryStateStore,
+)
+from livecomponents.types import StateAddress
+
+STATE_ADDR = StateAddress(session_id="session_id", component_id="|root:0")
+
+
+class FlakyStateStore(MemoryStateStore):
+    def __init__(self):
+        super().__init__()
+        self.failing = False
+
+    def restore_state(self, state_addr: StateAddress) -> bytes | None:
+        if self.failing:
+            raise ConnectionError("Store is unavailable")
+        return super().restore_state(state_addr)
+
+
+@pytest.fixture
+def flaky_store():
+    return FlakyStateStore()
+
+
+def test_circuit_opens_after_failure_threshold(flaky_store):
+    store = CircuitBreakerStateStore(flaky_store, failure_threshold=2)
+    flaky_store.failing = True
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            store.restore_state(STATE_ADDR)
+    assert store.state == CircuitState.OPEN
+
+    # Fails fast and behaves as if the session has expired
+    assert store.restore_state(STATE_ADDR) is None
+    assert store.session_exists("session_id") is False
+    assert store.metrics["rejected_calls"] == 2
+
+
+def test_circuit_closes_after_successful_trial_call(flaky_store):
+    store = CircuitBreakerStateStore(
+        flaky_store, failure_threshold=1, reset_timeout=datetime.timedelta(0)
+    )
+    flaky_store.save_state(STATE_ADDR, b"state")
+    flaky_store.failing = True
+    with pytest.raises(ConnectionError):
+        store.restore_state(STATE_ADDR)
+    assert store.state == CircuitState.HALF_OPEN
+
+    flaky_store.failing = False
+    assert store.restore_state(STATE_ADDR) == b"state"
+    assert store.state == CircuitState.CLOSED
+    assert store.metrics["transitions_to_open"] == 1
+    assert store.metrics["transitions_to_half_open"] == 1
+    assert store.metrics["transitions_to_closed"] == 1
+
+
+def test_slow_calls_count_as_failures(flaky_store):
+    store = CircuitBreakerStateStore(
+        flaky_store, failure_threshold=1, latency_budgets={"save_state": -1}
+    )
+    store.save_state(STATE_ADDR, b"state")
+    assert store.state == CircuitState.OPEN
+    assert store.metrics["slow_calls"] == 1
+
+
+def test_success_resets_consecutive_failures(flaky_store):
+    store = CircuitBreakerStateStore(flaky_store, failure_threshold=2)
+    flaky_store.failing = True
+    with pytest.raises(ConnectionError):
+        store.restore_state(STATE_ADDR)
+    flaky_store.failing = False
+    store.restore_state(STATE_ADDR)
+    flaky_store.failing = True
+    with pytest.raises(ConnectionError):
+        store.restore_state(STATE_ADDR)
+    assert store.state == CircuitState.CLOSED
+
+
+def test_open_circuit_skips_session_quota_checks(flaky_store, monkeypatch):
+    store = CircuitBreakerStateStore(flaky_store, failure_threshold=1)
+    state_manager = StateManager(
+        serializer=PickleStateSerializer(), store=store, session_quota=100
+    )
+    flaky_store.failing = True
+    with pytest.raises(ConnectionError):
+        store.restore_state(STATE_ADDR)
+    assert store.state == CircuitState.OPEN
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The wrapped store must not be called")
+
+    monkeypatch.setattr(flaky_store, "get_session_usage", fail)
+    monkeypatch.setattr(flaky_store, "save_state", fail)
+    state_manager.set_component_state(STATE_ADDR, {"count": 0})
+    assert store.metrics["rejected_calls"] == 2
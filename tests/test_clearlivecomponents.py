@@ -0,0 +1,22 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+from livecomponents.types import StateAddress
+
+STATE_ADDR = StateAddress(session_id="session_id", component_id="|root:0")
+
+
+def test_clearlivecomponents_deletes_all_sessions(state_manager):
+    state_manager.store.save_state(STATE_ADDR, b"state")
+
+    call_command("clearlivecomponents", "--no-input")
+    assert not state_manager.session_exists("session_id")
+
+
+def test_clearlivecomponents_asks_for_confirmation(state_manager, monkeypatch):
+    state_manager.store.save_state(STATE_ADDR, b"state")
+    monkeypatch.setattr("builtins.input", lambda prompt: "no")
+
+    with pytest.raises(CommandError):
+        call_command("clearlivecomponents")
+    assert state_manager.session_exists("session_id")
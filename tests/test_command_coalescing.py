@@ -0,0 +1,169 @@
+import threading
+import time
+
+import pytest
+from django_components.component_registry import registry
+
+from livecomponents.component import LiveComponent, command
+from livecomponents.exceptions import CommandSuperseded, InvalidCommandArguments
+from livecomponents.manager.manager import StateManager
+from livecomponents.manager.serializers import PickleStateSerializer
+from livecomponents.manager.stores import (
+    DjangoCacheStateStore,
+    MemoryStateStore,
+    SQLiteStateStore,
+)
+from livecomponents.types import StateAddress
+
+SEARCH = StateAddress(session_id="session_id", component_id="|test_search:0")
+RESULTS = SEARCH.with_component_id("|test_search:0|test_results:0")
+
+
+class Search(LiveComponent):
+    def init_state(self, context):
+        return {"search": ""}
+
+    @command(coalesce=True)
+    def update_search(self, call_context, search: str):
+        call_context.state["search"] = search
+        results = call_context.state_address.with_component_id(RESULTS.component_id)
+        call_context.state_manager.set_component_state(results, {"search": search})
+
+    @command(coalesce=True, coalesce_window=0.2)
+    def wait_and_update_search(self, call_context, search: str):
+        call_context.state["search"] = search
+
+    @command
+    def reset(self, call_context):
+        call_context.state["search"] = ""
+
+
+@pytest.fixture
+def state_manager():
+    registry.register("test_search", Search)
+    state_manager = StateManager(
+        serializer=PickleStateSerializer(), store=MemoryStateStore()
+    )
+    state_manager.set_component_state(SEARCH, {"search": ""})
+    yield state_manager
+    registry.unregister("test_search")
+
+
+def update_search(state_manager, rf, search, sequence):
+    return state_manager.call_component_command(
+        rf.post("/"),
+        SEARCH,
+        "update_search",
+        {"search": search},
+        command_sequence=sequence,
+    )
+
+
+def test_command_options():
+    assert Search._commands["update_search"].coalesce is True
+    assert Search._commands["update_search"].coalesce_window == 0.0
+    assert Search._commands["wait_and_update_search"].coalesce_window == 0.2
+    assert Search._commands["reset"].coalesce is False
+
+
+def test_last_coalesced_command_wins(state_manager, rf, monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda seconds: pytest.fail("Waited"))
+    first = state_manager.start_coalesced_command(
+        SEARCH, "update_search", {"search": "a"}
+    )
+    second = state_manager.start_coalesced_command(
+        SEARCH, "update_search", {"search": "ab"}
+    )
+    update_search(state_manager, rf, "ab", second)
+
+    # The earlier request finishes last, but doesn't overwrite the newer states.
+    with pytest.raises(CommandSuperseded):
+        update_search(state_manager, rf, "a", first)
+    assert state_manager.get_component_state(SEARCH) == {"search": "ab"}
+    assert state_manager.get_component_state(RESULTS) == {"search": "ab"}
+
+
+def test_commands_that_do_not_overlap_are_saved(state_manager, rf):
+    for search in ["a", "ab"]:
+        sequence = state_manager.start_coalesced_command(
+            SEARCH, "update_search", {"search": search}
+        )
+        update_search(state_manager, rf, search, sequence)
+        assert state_manager.get_component_state(SEARCH) == {"search": search}
+        assert state_manager.get_component_state(RESULTS) == {"search": search}
+
+
+def test_window_skips_superseded_commands(state_manager):
+    results = {}
+
+    def send(number):
+        try:
+            results[number] = state_manager.start_coalesced_command(
+                SEARCH, "wait_and_update_search", {"search": str(number)}
+            )
+        except CommandSuperseded:
+            results[number] = None
+
+    first = threading.Thread(target=send, args=(1,))
+    first.start()
+    while not state_manager.store.get_command_sequence(
+        "session_id", "|test_search:0:wait_and_update_search"
+    ):
+        time.sleep(0.01)
+    send(2)
+    first.join()
+    assert results == {1: None, 2: 2}
+
+
+def test_other_commands_are_not_coalesced(state_manager):
+    assert state_manager.start_coalesced_command(SEARCH, "reset") == 0
+    assert (
+        state_manager.store.get_command_sequence("session_id", "|test_search:0:reset")
+        == 0
+    )
+
+
+def test_stores_without_sequences_disable_coalescing(state_manager, tmp_path):
+    state_manager.store = SQLiteStateStore(
+        path=str(tmp_path / "db.sqlite3"), gc_interval=None
+    )
+    sequence = state_manager.start_coalesced_command(
+        SEARCH, "update_search", {"search": "a"}
+    )
+    assert sequence == 0
+    assert not state_manager.is_command_superseded(SEARCH, "update_search", sequence)
+
+
+def test_invalid_arguments_are_rejected_before_waiting(state_manager, monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda seconds: pytest.fail("Waited"))
+    with pytest.raises(InvalidCommandArguments):
+        state_manager.start_coalesced_command(
+            SEARCH, "wait_and_update_search", {"q": "a"}
+        )
+    assert (
+        state_manager.store.get_command_sequence(
+            "session_id", "|test_search:0:wait_and_update_search"
+        )
+        == 0
+    )
+
+
+@pytest.mark.parametrize("store_name", ["memory", "redis", "django_cache"])
+def test_command_sequences(store_name, request, settings):
+    if store_name == "memory":
+        store = MemoryStateStore()
+    elif store_name == "redis":
+        store = request.getfixturevalue("redis_state_store")
+        store.clear_all_sessions()
+    else:
+        settings.CACHES = {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        }
+        store = DjangoCacheStateStore()
+    store.save_state(SEARCH, b"state")
+
+    assert store.get_command_sequence("session_id", "key") == 0
+    assert store.next_command_sequence("session_id", "key") == 1
+    assert store.next_command_sequence("session_id", "key") == 2
+    assert store.next_command_sequence("session_id", "other") == 1
+    assert store.get_command_sequence("session_id", "key") == 2
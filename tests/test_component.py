@@ -0,0 +1,145 @@
+import pytest
+from django.core.exceptions import BadRequest
+from django_components.component_registry import registry
+
+from livecomponents.component import LiveComponent, command
+from livecomponents.exceptions import InvalidCommandArguments
+from livecomponents.manager.manager import StateManager
+from livecomponents.manager.serializers import PickleStateSerializer
+from livecomponents.manager.stores import MemoryStateStore
+from livecomponents.types import StateAddress
+
+
+class BaseCounter(LiveComponent):
+    def init_state(self, context):
+        return {"count": 0}
+
+    @command
+    def increment(self, call_context, value: int = 1):
+        call_context.state["count"] += value
+
+    def not_a_command(self, call_context):
+        pass
+
+
+class Counter(BaseCounter):
+    @classmethod
+    @command
+    def reset(cls, call_context):
+        call_context.state["count"] = 0
+
+    @staticmethod
+    @command
+    def noop(call_context, *, reason: str):
+        pass
+
+
+class CountingStore(MemoryStateStore):
+    def __init__(self):
+        super().__init__()
+        self.restored = 0
+
+    def restore_state(self, state_addr):
+        self.restored += 1
+        return super().restore_state(state_addr)
+
+
+@pytest.fixture
+def counter_address():
+    registry.register("test_counter", Counter)
+    yield StateAddress(session_id="session_id", component_id="|test_counter:0")
+    registry.unregister("test_counter")
+
+
+def test_command_table_includes_inherited_commands():
+    assert set(Counter._commands) == {"increment", "reset", "noop"}
+    assert set(BaseCounter._commands) == {"increment"}
+
+
+def test_command_signature_skips_self_and_call_context():
+    assert str(Counter._commands["increment"].signature) == "(value: int = 1)"
+    assert str(Counter._commands["reset"].signature) == "()"
+    assert str(Counter._commands["noop"].signature) == "(*, reason: str)"
+
+
+def test_get_command_binds_to_instance():
+    component = Counter()
+    assert component.get_command("increment").__self__ is component
+    assert component.get_command("reset").__self__ is Counter
+
+
+@pytest.mark.parametrize("command_name", ["not_a_command", "init_state", "missing"])
+def test_get_command_rejects_unknown_commands(command_name):
+    with pytest.raises(BadRequest):
+        Counter().get_command(command_name)
+
+
+def test_unknown_command_is_rejected_before_loading_state(counter_address, rf):
+    store = CountingStore()
+    state_manager = StateManager(serializer=PickleStateSerializer(), store=store)
+    state_manager.set_component_state(counter_address, {"count": 0})
+
+    with pytest.raises(BadRequest):
+        state_manager.call_component_command(rf.post("/"), counter_address, "missing")
+    assert store.restored == 0
+
+    state_manager.call_component_command(
+        rf.post("/"), counter_address, "increment", {"value": "2"}
+    )
+    assert state_manager.get_component_state(counter_address) == {"count": 2}
+
+
+def test_validate_kwargs_coerces_annotated_arguments():
+    assert Counter._commands["increment"].validate_kwargs({"value": "5"}) == {
+        "value": 5
+    }
+    assert Counter._commands["increment"].validate_kwargs({}) == {}
+
+
+def test_validate_kwargs_coerces_numbers_to_strings():
+    class Search(LiveComponent):
+        def init_state(self, context):
+            return {}
+
+        @command
+        def update_search(self, call_context, search: str):
+            pass
+
+    validate_kwargs = Search._commands["update_search"].validate_kwargs
+    assert validate_kwargs({"search": 42}) == {"search": "42"}
+    assert validate_kwargs({"search": 4.5}) == {"search": "4.5"}
+
+
+def test_validate_kwargs_rejects_invalid_arguments():
+    with pytest.raises(InvalidCommandArguments) as exc_info:
+        Counter._commands["noop"].validate_kwargs({"other": "1"})
+    assert [error["type"] for error in exc_info.value.errors] == [
+        "missing",
+        "extra_forbidden",
+    ]
+
+
+def test_validate_kwargs_passes_var_keyword_arguments():
+    class Form(LiveComponent):
+        def init_state(self, context):
+            return {}
+
+        @command
+        def submit(self, call_context, untyped, **form_data):
+            pass
+
+    assert Form._commands["submit"].validate_kwargs({"untyped": "1", "name": "x"}) == {
+        "untyped": "1",
+        "name": "x",
+    }
+
+
+def test_invalid_arguments_are_rejected_before_loading_state(counter_address, rf):
+    store = CountingStore()
+    state_manager = StateManager(serializer=PickleStateSerializer(), store=store)
+
+    with pytest.raises(InvalidCommandArguments):
+        state_manager.call_component_command(
+            rf.post("/"), counter_address, "increment", {"value": "x"}
+        )
+    assert store.restored == 0
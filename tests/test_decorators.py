@@ -0,0 +1,106 @@
+import pytest
+from django.core.cache import caches
+from django.test import RequestFactory
+from myapp.models import CoffeeBean
+
+from livecomponents.component import ExtraContextRequest
+from livecomponents.decorators import memoize_extra_context
+from livecomponents.manager.manager import StateManager
+from livecomponents.manager.serializers import PickleStateSerializer
+from livecomponents.manager.stores import MemoryStateStore
+from livecomponents.types import StateAddress
+from livecomponents.utils import LiveComponentsModel
+
+
+class TableState(LiveComponentsModel):
+    search: str = ""
+    page_size: int = 10
+
+
+class Table:
+    calls = 0
+
+    @memoize_extra_context(fields=["search"], invalidate_on=[CoffeeBean])
+    def get_extra_context_data(self, extra_context_request):
+        type(self).calls += 1
+        return {"search": extra_context_request.state.search, "calls": self.calls}
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+    caches["default"].clear()
+    Table.calls = 0
+
+
+def get_extra_context(session_id="session_id", **state_fields):
+    state_manager = StateManager(
+        serializer=PickleStateSerializer(), store=MemoryStateStore()
+    )
+    extra_context_request = ExtraContextRequest(
+        request=RequestFactory().get("/"),
+        state=TableState(**state_fields),
+        state_manager=state_manager,
+        state_addr=StateAddress(session_id=session_id, component_id="|table:0"),
+        component_kwargs={},
+    )
+    return Table().get_extra_context_data(extra_context_request)
+
+
+def test_values_are_reused_for_same_fields():
+    assert get_extra_context(search="kenya") == {"search": "kenya", "calls": 1}
+    assert get_extra_context(session_id="other", search="kenya", page_size=20) == {
+        "search": "kenya",
+        "calls": 1,
+    }
+    assert Table.calls == 1
+
+
+def test_values_are_computed_for_other_fields():
+    get_extra_context(search="kenya")
+    assert get_extra_context(search="brazil") == {"search": "brazil", "calls": 2}
+
+
+def test_invalidate():
+    get_extra_context(search="kenya")
+    Table.get_extra_context_data.invalidate()
+    assert get_extra_context(search="kenya") == {"search": "kenya", "calls": 2}
+
+
+@pytest.mark.django_db
+def test_model_changes_invalidate_values():
+    get_extra_context(search="kenya")
+    bean = CoffeeBean.objects.create(
+        name="AA", origin="Kenya", roast_level="Light", flavor_notes="Berry"
+    )
+    assert get_extra_context(search="kenya")["calls"] == 2
+    bean.delete()
+    assert get_extra_context(search="kenya")["calls"] == 3
+
+
+def test_hit_reads_value_and_generation_in_one_call(monkeypatch):
+    get_extra_context(search="kenya")
+    cache = caches["default"]
+    get_many_calls = []
+    get_many = cache.get_many
+
+    def spy_get_many(keys):
+        get_many_calls.append(keys)
+        # LocMemCache.get_many() calls get(), which is not a separate round trip.
+        with monkeypatch.context() as patch:
+            patch.setattr(cache, "get", type(cache).get.__get__(cache))
+            return get_many(keys)
+
+    monkeypatch.setattr(cache, "get", lambda *args, **kwargs: pytest.fail("GET"))
+    monkeypatch.setattr(cache, "get_many", spy_get_many)
+    assert get_extra_context(search="kenya")["calls"] == 1
+    assert len(get_many_calls) == 1
+
+
+def test_values_of_previous_generation_are_ignored():
+    get_extra_context(search="kenya")
+    caches["default"].delete(Table.get_extra_context_data.get_generation_key())
+    assert get_extra_context(search="kenya")["calls"] == 2
+    assert get_extra_context(search="kenya")["calls"] == 2
@@ -0,0 +1,50 @@
+import datetime
+import threading
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+
+from livecomponents.types import StateAddress
+
+STATE_ADDR = StateAddress(session_id="session_id", component_id="|root:0")
+
+
+def test_reads_extend_value_lifetime_once_per_touch_interval(
+    django_cache_state_store, monkeypatch
+):
+    store = django_cache_state_store
+    store.save_state(STATE_ADDR, b"state")
+    touches = []
+    touch = LocMemCache.touch
+
+    def spy(cache, key, timeout=DEFAULT_TIMEOUT, version=None):
+        touches.append((key, threading.current_thread()))
+        return touch(cache, key, timeout, version)
+
+    # Values are touched in a thread with its own cache connection.
+    monkeypatch.setattr(LocMemCache, "touch", spy)
+
+    store.restore_state(STATE_ADDR)
+    store._get_touch_executor().submit(lambda: None).result()
+    assert touches == []
+
+    store.touch_interval = datetime.timedelta(0)
+    store.restore_state(STATE_ADDR)
+    store._get_touch_executor().submit(lambda: None).result()
+    assert len(touches) == 1
+    assert touches[0][1] is not threading.current_thread()
+
+
+def test_clear_all_sessions_keeps_unrelated_keys(django_cache_state_store):
+    store = django_cache_state_store
+    store.save_state(STATE_ADDR, b"state")
+    store.cache.set("unrelated", b"value")
+
+    store.clear_all_sessions()
+    assert not store.session_exists("session_id")
+    assert store.restore_state(STATE_ADDR) is None
+    assert store.get_component_ids("session_id") == set()
+    assert store.cache.get("unrelated") == b"value"
+
+    store.save_state(STATE_ADDR, b"new state")
+    assert store.restore_state(STATE_ADDR) == b"new state"
@@ -0,0 +1,95 @@
+import datetime
+import threading
+
+from livecomponents.manager.stores import MemoryStateStore
+from livecomponents.types import StateAddress
+
+
+def addr(session_id: str, component_id: str = "|root:0") -> StateAddress:
+    return StateAddress(session_id=session_id, component_id=component_id)
+
+
+def test_session_exists_and_clear_session():
+    store = MemoryStateStore(ttl_gc=datetime.timedelta(0))
+    store.save_state(addr("a"), b"state")
+    store.save_state(addr("b"), b"state")
+    assert store.session_exists("a")
+
+    store.clear_session("a")
+    assert not store.session_exists("a")
+    assert store.session_exists("b")
+
+
+def test_accessing_cleared_session_recovers_ttl():
+    store = MemoryStateStore()
+    store.save_state(addr("a"), b"state")
+    store.clear_session("a")
+    assert store.session_exists("a")
+    # Accessing the session again recovers the TTL
+    assert store.restore_state(addr("a")) == b"state"
+    assert "a" not in store._cleared_sessions
+
+
+def test_session_expires_after_ttl():
+    store = MemoryStateStore(ttl=datetime.timedelta(0))
+    store.save_state(addr("a"), b"state")
+    assert not store.session_exists("a")
+    assert store.restore_state(addr("a")) is None
+    assert store.total_bytes == 0
+
+
+def test_total_bytes_accounts_for_overwrites_and_deletions():
+    store = MemoryStateStore()
+    store.save_state(addr("a"), b"1234")
+    store.save_state(addr("a"), b"12")
+    store.save_component_template(addr("a"), b"<div></div>")
+    component_id_size = len("|root:0")
+    assert store.total_bytes == 2 * component_id_size + 2 + 11
+
+    store.delete_components("a", ["|root:0"])
+    assert store.total_bytes == 0
+
+
+def test_least_recently_used_sessions_are_evicted():
+    store = MemoryStateStore(max_bytes=100)
+    store.save_state(addr("a"), b"x" * 40)
+    store.save_state(addr("b"), b"x" * 40)
+    store.restore_state(addr("a"))
+    store.save_state(addr("c"), b"x" * 40)
+
+    assert store.session_exists("a")
+    assert not store.session_exists("b")
+    assert store.session_exists("c")
+    assert store.total_bytes <= 100
+
+
+def test_cleared_sessions_are_evicted_first():
+    store = MemoryStateStore(max_bytes=100)
+    store.save_state(addr("a"), b"x" * 40)
+    store.save_state(addr("b"), b"x" * 40)
+    store.clear_session("b")
+    store.save_state(addr("c"), b"x" * 40)
+
+    assert store.session_exists("a")
+    assert not store.session_exists("b")
+
+
+def test_concurrent_writes():
+    store = MemoryStateStore(max_bytes=10_000)
+
+    def write(thread_id: int):
+        for i in range(500):
+            store.save_state(addr(f"{thread_id}-{i % 20}", f"|c:{i}"), b"x" * 10)
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    expected_size = sum(
+        len(component_id) + 10
+        for session_id in store.get_session_ids()
+        for component_id in store.get_component_ids(session_id)
+    )
+    assert store.total_bytes == expected_size <= 10_000
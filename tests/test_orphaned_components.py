@@ -0,0 +1,80 @@
+import pytest
+from django.core.management import call_command
+
+from livecomponents.management.commands.prunelivecomponents import (
+    find_orphaned_component_ids,
+)
+from livecomponents.manager.manager import StateManager
+from livecomponents.manager.serializers import PickleStateSerializer
+from livecomponents.manager.stores import MemoryStateStore
+from livecomponents.types import StateAddress
+
+TABLE = StateAddress(session_id="session_id", component_id="|table:0")
+
+
+def make_state_manager(gc_orphaned_components: bool) -> StateManager:
+    state_manager = StateManager(
+        serializer=PickleStateSerializer(),
+        store=MemoryStateStore(),
+        gc_orphaned_components=gc_orphaned_components,
+    )
+    for state_addr in [TABLE, TABLE | ("row", "1"), TABLE | ("row", "2")]:
+        state_manager.store.save_state(state_addr, b"state")
+        state_manager.store.save_component_template(state_addr, b"<div></div>")
+    return state_manager
+
+
+def test_collect_orphaned_components_deletes_not_rendered_children():
+    state_manager = make_state_manager(gc_orphaned_components=True)
+    with state_manager.collect_orphaned_components(TABLE):
+        state_manager.record_rendered_component(TABLE)
+        state_manager.record_rendered_component(TABLE | ("row", "1"))
+
+    assert state_manager.store.get_component_ids("session_id") == {
+        "|table:0",
+        "|table:0|row:1",
+    }
+
+
+def test_collect_orphaned_components_does_nothing_when_disabled():
+    state_manager = make_state_manager(gc_orphaned_components=False)
+    with state_manager.collect_orphaned_components(TABLE):
+        state_manager.record_rendered_component(TABLE)
+
+    assert len(state_manager.store.get_component_ids("session_id")) == 3
+
+
+def test_collect_orphaned_components_keeps_children_on_error():
+    state_manager = make_state_manager(gc_orphaned_components=True)
+    with pytest.raises(RuntimeError):
+        with state_manager.collect_orphaned_components(TABLE):
+            raise RuntimeError()
+
+    assert len(state_manager.store.get_component_ids("session_id")) == 3
+
+
+def test_find_orphaned_component_ids():
+    component_ids = {
+        "|table:0",
+        "|table:0|row:1",
+        "|form:0|input:1",
+        "|form:0|input:1|error:0",
+    }
+    assert find_orphaned_component_ids(component_ids) == {
+        "|form:0|input:1",
+        "|form:0|input:1|error:0",
+    }
+
+
+def test_prunelivecomponents_deletes_orphans(state_manager):
+    store = state_manager.store
+    store.save_state(TABLE, b"state")
+    store.save_state(TABLE | "row", b"state")
+    store.save_state(StateAddress(session_id="other", component_id="|a:0|b:0"), b"")
+
+    call_command("prunelivecomponents", "--dry-run")
+    assert store.get_component_ids("other") == {"|a:0|b:0"}
+
+    call_command("prunelivecomponents")
+    assert store.get_component_ids("other") == set()
+    assert store.get_component_ids("session_id") == {"|table:0", "|table:0|row:0"}
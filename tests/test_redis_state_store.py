@@ -1,3 +1,12 @@
+import datetime
+
+import pytest
+from redis.client import Pipeline
+
+from livecomponents.manager.stores import (
+    RedisStateStore,
+    _reset_redis_state_stores_after_fork,
+)
 from livecomponents.types import StateAddress
 
 
@@ -45,7 +54,230 @@ def test_clear_session_and_then_save_state_recovers_ttl(redis_state_store):
     )
 
 
+def test_template_blobs_are_read_from_replica(redis_node_urls):
+    primary_url, replica_url = redis_node_urls[:2]
+    store = RedisStateStore(redis_url=primary_url, replica_urls=[replica_url])
+    replica_store = RedisStateStore(redis_url=replica_url)
+    store.clear_all_sessions()
+    replica_store.clear_all_sessions()
+
+    state_addr = StateAddress(session_id="session_id", component_id="|root:0")
+    store.save_component_template(state_addr, b"<div>new</div>")
+    # The replica lags and refers to the previous template
+    replica_store.save_component_template(state_addr, b"<div>old</div>")
+    store._template_blobs.clear()
+    assert store.restore_component_template(state_addr) == b"<div>new</div>"
+
+    # The blob itself is read from the replica
+    store.client.delete(*store.client.keys("lc:template_cache:*"))
+    other_addr = StateAddress(session_id="other", component_id="|root:0")
+    replica_store.save_component_template(other_addr, b"<div>new</div>")
+    store._template_blobs.clear()
+    assert store.restore_component_template(state_addr) == b"<div>new</div>"
+
+
+def test_states_are_read_from_primary_by_default(redis_node_urls):
+    primary_url, replica_url = redis_node_urls[:2]
+    store = RedisStateStore(redis_url=primary_url, replica_urls=[replica_url])
+    replica_store = RedisStateStore(redis_url=replica_url)
+
+    state_addr = StateAddress(session_id="session_id", component_id="|root:0")
+    store.save_state(state_addr, b"primary")
+    replica_store.save_state(state_addr, b"replica")
+    assert store.restore_state(state_addr) == b"primary"
+
+
+def test_states_are_read_from_replica_outside_sticky_window(redis_node_urls):
+    primary_url, replica_url = redis_node_urls[:2]
+    store = RedisStateStore(
+        redis_url=primary_url,
+        replica_urls=[replica_url],
+        replica_reads=["states"],
+        replica_sticky_window=datetime.timedelta(minutes=1),
+    )
+    replica_store = RedisStateStore(redis_url=replica_url)
+
+    state_addr = StateAddress(session_id="session_id", component_id="|root:0")
+    store.save_state(state_addr, b"primary")
+    replica_store.save_state(state_addr, b"replica")
+    # Just written: read from the primary
+    assert store.restore_state(state_addr) == b"primary"
+
+    store.replica_sticky_window = datetime.timedelta(0)
+    assert store.restore_state(state_addr) == b"replica"
+
+
+def test_replica_state_hits_dont_touch_the_primary(redis_node_urls, monkeypatch):
+    primary_url, replica_url = redis_node_urls[:2]
+    store = RedisStateStore(
+        redis_url=primary_url,
+        replica_urls=[replica_url],
+        replica_reads=["states"],
+        replica_sticky_window=datetime.timedelta(0),
+    )
+    replica_store = RedisStateStore(redis_url=replica_url)
+    state_addr = StateAddress(session_id="session_id", component_id="|root:0")
+    replica_store.save_state(state_addr, b"replica")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The primary must not be called")
+
+    monkeypatch.setattr(store.client, "pipeline", fail)
+    monkeypatch.setattr(store.client, "execute_command", fail)
+    assert store.restore_state(state_addr) == b"replica"
+
+
+def test_unknown_replica_reads_key_type_raises_value_error():
+    with pytest.raises(ValueError):
+        RedisStateStore(replica_reads=["sessions"])
+
+
 def get_state_key(redis_state_store, state_addr):
     return redis_state_store._get_key_name(
         redis_state_store.key_prefix, state_addr.session_id
     )
+
+
+def test_connection_options_are_passed_to_pool():
+    store = RedisStateStore(
+        max_connections=5, socket_timeout=1.5, health_check_interval=30
+    )
+    pool = store.client.connection_pool
+    assert pool.max_connections == 5
+    assert pool.connection_kwargs["socket_timeout"] == 1.5
+    assert pool.connection_kwargs["health_check_interval"] == 30
+
+
+def test_warm_up_opens_connections(redis_node_urls):
+    store = RedisStateStore(redis_url=redis_node_urls[0], warm_up_connections=3)
+    store.warm_up()
+    assert len(store.client.connection_pool._available_connections) == 3
+
+
+def test_fork_handler_resets_connections(redis_node_urls):
+    store = RedisStateStore(redis_url=redis_node_urls[0], warm_up_connections=2)
+    store.warm_up()
+    _reset_redis_state_stores_after_fork()
+    assert store.client.connection_pool._available_connections == []
+
+
+def test_template_blobs_are_read_from_redis_once(redis_node_urls):
+    writer = RedisStateStore(redis_url=redis_node_urls[0])
+    writer.clear_all_sessions()
+    reader = RedisStateStore(redis_url=redis_node_urls[0])
+    state_addr = StateAddress(session_id="session_id", component_id="|root:0")
+    writer.save_component_template(state_addr, b"<div></div>")
+
+    assert reader.restore_component_template(state_addr) == b"<div></div>"
+    reader.client.delete(get_template_cache_key(reader, b"<div></div>"))
+    assert reader.restore_component_template(state_addr) == b"<div></div>"
+
+
+def test_expired_template_blobs_are_saved_again(redis_node_urls):
+    store = RedisStateStore(redis_url=redis_node_urls[0])
+    store.clear_all_sessions()
+    state_addr = StateAddress(session_id="session_id", component_id="|root:0")
+    store.save_component_template(state_addr, b"<div></div>")
+    cache_key = get_template_cache_key(store, b"<div></div>")
+    store.client.delete(cache_key)
+
+    store.save_component_template(state_addr, b"<div></div>")
+    assert store.client.get(cache_key) == b"<div></div>"
+
+
+def test_save_component_template_makes_one_round_trip(redis_node_urls, monkeypatch):
+    store = RedisStateStore(redis_url=redis_node_urls[0])
+    store.clear_all_sessions()
+    state_addr = StateAddress(session_id="session_id", component_id="|root:0")
+    round_trips = []
+    execute = Pipeline.execute
+    monkeypatch.setattr(
+        Pipeline, "execute", lambda pipe: round_trips.append(1) or execute(pipe)
+    )
+    monkeypatch.setattr(store.client, "expire", None)
+
+    store.save_component_template(state_addr, b"<div></div>")
+    store.save_component_template(state_addr, b"<div></div>")
+    assert len(round_trips) == 2
+    assert store.restore_component_template(state_addr) == b"<div></div>"
+    cache_key = get_template_cache_key(store, b"<div></div>")
+    assert store.client.ttl(cache_key) > store.ttl.total_seconds() - 10
+
+
+def test_template_blob_cache_is_bounded(redis_node_urls):
+    store = RedisStateStore(redis_url=redis_node_urls[0], template_blob_cache_size=1)
+    store.clear_all_sessions()
+    first = StateAddress(session_id="session_id", component_id="|root:0")
+    second = StateAddress(session_id="session_id", component_id="|root:1")
+    store.save_component_template(first, b"<div>1</div>")
+    store.save_component_template(second, b"<div>2</div>")
+    store.client.delete(get_template_cache_key(store, b"<div>1</div>"))
+
+    assert store.restore_component_template(first) is None
+    assert store.restore_component_template(second) == b"<div>2</div>"
+
+
+def get_template_cache_key(redis_state_store, html_bytes):
+    hashed_value = redis_state_store._get_hashed_value(html_bytes)
+    return f"{redis_state_store.template_cache_prefix}{hashed_value}"
+
+
+def test_clear_all_sessions_keeps_unrelated_keys(redis_state_store):
+    state_addr = StateAddress(session_id="session_id", component_id="|root:0")
+    redis_state_store.save_state(state_addr, b"state")
+    redis_state_store.save_component_template(state_addr, b"<div></div>")
+    redis_state_store.client.set("unrelated", b"value")
+
+    redis_state_store.clear_all_sessions()
+    assert not redis_state_store.session_exists("session_id")
+    assert redis_state_store.client.keys() == [b"unrelated"]
+    redis_state_store.client.delete("unrelated")
+
+
+def test_clear_all_sessions_reports_progress_in_batches(redis_state_store):
+    redis_state_store.clear_all_sessions()
+    for i in range(5):
+        state_addr = StateAddress(session_id=f"session-{i}", component_id="|root:0")
+        redis_state_store.save_state(state_addr, b"state")
+
+    progress = []
+    redis_state_store.clear_all_sessions(batch_size=2, progress=progress.append)
+    assert progress == [2, 4, 5]
+
+
+def test_clear_all_sessions_is_rate_limited(redis_state_store, monkeypatch):
+    redis_state_store.clear_all_sessions()
+    for i in range(4):
+        state_addr = StateAddress(session_id=f"session-{i}", component_id="|root:0")
+        redis_state_store.save_state(state_addr, b"state")
+    sleeps = []
+    monkeypatch.setattr("livecomponents.manager.stores.time.sleep", sleeps.append)
+
+    redis_state_store.clear_all_sessions(batch_size=2, max_keys_per_second=1)
+    assert len(sleeps) == 2
+    assert sum(sleeps) > 3
+
+
+def test_new_sessions_get_ttl_initial(redis_node_urls):
+    store = RedisStateStore(
+        redis_url=redis_node_urls[0], ttl_initial=datetime.timedelta(minutes=10)
+    )
+    state_addr = StateAddress(session_id="session_id", component_id="|root:0")
+    store.save_state(state_addr, b"state")
+    assert store.client.ttl(get_state_key(store, state_addr)) <= 600
+
+
+def test_first_command_extends_all_session_keys_to_ttl(redis_node_urls):
+    store = RedisStateStore(
+        redis_url=redis_node_urls[0], ttl_initial=datetime.timedelta(minutes=10)
+    )
+    state_addr = StateAddress(session_id="session_id", component_id="|root:0")
+    store.save_state(state_addr, b"state")
+    store.save_context(state_addr, b"context")
+    store.save_component_template(state_addr, b"<div></div>")
+
+    with store.interaction():
+        store.restore_state(state_addr)
+    for prefix in (store.key_prefix, store.context_prefix, store.templates_prefix):
+        ttl = store.client.ttl(f"{prefix}session_id")
+        assert ttl > store.ttl.total_seconds() - 10
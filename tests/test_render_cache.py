@@ -0,0 +1,183 @@
+import pytest
+from django.template import Context, Template
+from django_components.component_registry import registry
+
+from livecomponents.component import LiveComponent
+from livecomponents.manager.render_cache import (
+    DjangoCacheRenderCache,
+    MemoryRenderCache,
+)
+from livecomponents.types import StateAddress
+from livecomponents.utils import LiveComponentsModel
+
+BADGE = StateAddress(session_id="session_id", component_id="|test_badge:0")
+
+
+class BadgeState(LiveComponentsModel):
+    label: str = "new"
+
+
+class Badge(LiveComponent[BadgeState]):
+    cache_render = True
+    cache_render_context = ["theme"]
+    extra_context_calls = 0
+
+    def get_template_string(self, context):
+        return (
+            "{% load component_tags %}"
+            '<span class="{{ theme }}">{{ label }} {{ label_length }}</span>'
+            '{% slot "footer" %}{% endslot %}'
+        )
+
+    def init_state(self, context):
+        return BadgeState()
+
+    def get_extra_context_data(self, extra_context_request):
+        type(self).extra_context_calls += 1
+        return {"label_length": len(extra_context_request.state.label)}
+
+
+class BadgeWithChild(Badge):
+    def get_template_string(self, context):
+        return '{% load livecomponents %}{% livecomponent "test_child" %}'
+
+
+class Child(LiveComponent[BadgeState]):
+    def get_template_string(self, context):
+        return "<b>{{ label }}</b>"
+
+    def init_state(self, context):
+        return BadgeState()
+
+
+class CachedChild(Child):
+    cache_render = True
+
+
+@pytest.fixture
+def render_cache(state_manager):
+    registry.register("test_badge", Badge)
+    registry.register("test_child", Child)
+    Badge.extra_context_calls = 0
+    state_manager.render_cache.clear()
+    state_manager.render_cache.metrics.clear()
+    yield state_manager.render_cache
+    registry.unregister("test_badge")
+    registry.unregister("test_child")
+
+
+def render_badge(rf, theme="light"):
+    template = Template('{% load livecomponents %}{% livecomponent "test_badge" %}')
+    context = {
+        "request": rf.get("/"),
+        "LIVECOMPONENTS_SESSION_ID": "session_id",
+        "theme": theme,
+    }
+    return template.render(Context(context))
+
+
+def test_cache_hit_skips_render_and_extra_context(rf, render_cache):
+    assert render_badge(rf) == '<span class="light">new 3</span>'
+    assert render_badge(rf) == '<span class="light">new 3</span>'
+    assert Badge.extra_context_calls == 1
+    assert render_cache.metrics == {"misses": 1, "sets": 1, "hits": 1}
+
+
+def test_state_change_misses_cache(rf, state_manager, render_cache):
+    render_badge(rf)
+    state_manager.set_component_state(BADGE, BadgeState(label="hot"))
+    assert render_badge(rf) == '<span class="light">hot 3</span>'
+    assert Badge.extra_context_calls == 2
+
+
+def test_cache_render_context_is_part_of_key(rf, render_cache):
+    render_badge(rf)
+    assert render_badge(rf, theme="dark") == '<span class="dark">new 3</span>'
+    assert render_cache.metrics["hits"] == 0
+
+
+def test_components_with_nested_live_components_are_not_cached(rf, render_cache):
+    registry.unregister("test_badge")
+    registry.register("test_badge", BadgeWithChild)
+    assert render_badge(rf) == "<b>new</b>"
+    assert render_badge(rf) == "<b>new</b>"
+    assert render_cache.metrics["sets"] == 0
+
+
+def test_components_with_nested_cached_live_components_are_not_cached(
+    rf, state_manager, render_cache
+):
+    registry.unregister("test_badge")
+    registry.register("test_badge", BadgeWithChild)
+    registry.unregister("test_child")
+    registry.register("test_child", CachedChild)
+    assert render_badge(rf) == "<b>new</b>"
+    # The child is served from the cache, and the parent renders again.
+    assert render_badge(rf) == "<b>new</b>"
+    assert render_cache.metrics["hits"] == 1
+
+    child = StateAddress(session_id="session_id", component_id="|test_child:0")
+    state_manager.set_component_state(child, BadgeState(label="hot"))
+    assert render_badge(rf) == "<b>hot</b>"
+    assert render_cache.metrics["sets"] == 2
+
+
+def test_components_with_slot_fills_are_not_cached(rf, render_cache):
+    template = Template(
+        "{% load livecomponents component_tags %}"
+        '{% livecomponent_block "test_badge" %}{% fill "footer" %}!{% endfill %}'
+        "{% endlivecomponent_block %}"
+    )
+    context = {"request": rf.get("/"), "LIVECOMPONENTS_SESSION_ID": "session_id"}
+    template.render(Context(context))
+    template.render(Context(context))
+    assert Badge.extra_context_calls == 2
+    assert render_cache.metrics["sets"] == 0
+
+
+def test_memory_render_cache_evicts_least_recently_used():
+    cache = MemoryRenderCache(max_entries=2)
+    cache.set("a", "<a>")
+    cache.set("b", "<b>")
+    assert cache.get("a") == "<a>"
+    cache.set("c", "<c>")
+    assert cache.get("b") is None
+    assert cache.get("a") == "<a>"
+    assert cache.get("c") == "<c>"
+    assert cache.metrics["evictions"] == 1
+
+
+def test_memory_render_cache_limits_bytes():
+    cache = MemoryRenderCache(max_bytes=10)
+    cache.set("a", "12345")
+    cache.set("b", "12345")
+    cache.set("c", "1")
+    assert cache.get("a") is None
+    assert cache.get("b") == "12345"
+    assert cache.metrics["evictions"] == 1
+
+
+def test_django_cache_render_cache(settings):
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+    cache = DjangoCacheRenderCache()
+    assert cache.get("a") is None
+    cache.set("a", "<a>")
+    assert cache.get("a") == "<a>"
+    assert cache.metrics == {"misses": 1, "sets": 1, "hits": 1}
+
+
+def test_django_cache_render_cache_clear_keeps_unrelated_keys(settings):
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+    cache = DjangoCacheRenderCache()
+    cache.set("a", "<a>")
+    cache.cache.set("unrelated", "value")
+
+    cache.clear()
+    assert cache.get("a") is None
+    assert cache.cache.get("unrelated") == "value"
+    cache.set("a", "<b>")
+    assert cache.get("a") == "<b>"
@@ -0,0 +1,123 @@
+import pytest
+from django.template import Context, Template
+from django_components.component_registry import registry
+
+from livecomponents.component import LiveComponent, RecordingContextDict, command
+from livecomponents.manager.manager import ALL_FIELDS
+from livecomponents.types import StateAddress
+from livecomponents.utils import LiveComponentsModel
+
+PROFILE = StateAddress(session_id="session_id", component_id="|test_profile:0")
+
+
+class ProfileState(LiveComponentsModel):
+    name: str = "Alice"
+    visits: int = 0
+
+
+class Profile(LiveComponent[ProfileState]):
+    def get_template_string(self, context):
+        return "<div>{{ name }}</div>"
+
+    def init_state(self, context):
+        return ProfileState()
+
+    @command
+    def rename(self, call_context, name: str):
+        call_context.state.name = name
+
+    @command
+    def visit(self, call_context):
+        call_context.state.visits += 1
+
+
+class ProfileWithVisits(Profile):
+    def get_template_string(self, context):
+        return "<div>{{ name }} ({{ visits_str }})</div>"
+
+    def get_extra_context_data(self, extra_context_request):
+        return {"visits_str": f"{extra_context_request.state.visits:,}"}
+
+
+@pytest.fixture
+def state_manager(state_manager, monkeypatch):
+    monkeypatch.setattr(state_manager, "skip_unchanged_renders", True)
+    monkeypatch.setattr(state_manager, "track_render_dependencies", True)
+    registry.register("test_profile", Profile)
+    yield state_manager
+    registry.unregister("test_profile")
+
+
+def render_profile(rf):
+    template = Template('{% load livecomponents %}{% livecomponent "test_profile" %}')
+    context = {"request": rf.get("/"), "LIVECOMPONENTS_SESSION_ID": "session_id"}
+    return template.render(Context(context))
+
+
+def call_profile_command(rf, state_manager, command_name, **kwargs):
+    call_context = state_manager.call_component_command(
+        rf.post("/"), PROFILE, command_name, kwargs
+    )
+    return call_context.execution_results.dirty_components
+
+
+def get_dependencies(state_manager):
+    state = state_manager.get_component_state(PROFILE)
+    fingerprint = state_manager.get_state_fingerprint(state)
+    return state_manager.get_render_dependencies(PROFILE, fingerprint)
+
+
+def test_render_records_state_fields_read_by_template(rf, state_manager):
+    assert render_profile(rf) == "<div>Alice</div>"
+    assert get_dependencies(state_manager) == {"name"}
+
+
+def test_command_that_changes_unread_fields_skips_render(rf, state_manager):
+    render_profile(rf)
+    assert call_profile_command(rf, state_manager, "visit") == set()
+    assert state_manager.get_component_state(PROFILE).visits == 1
+
+
+def test_command_that_changes_read_fields_marks_component_dirty(rf, state_manager):
+    render_profile(rf)
+    assert call_profile_command(rf, state_manager, "rename", name="Bob") == {PROFILE}
+
+
+def test_unknown_dependencies_mark_component_dirty(rf, state_manager):
+    render_profile(rf)
+    call_profile_command(rf, state_manager, "visit")
+    # The component hasn't been rendered with the new state.
+    assert call_profile_command(rf, state_manager, "visit") == {PROFILE}
+
+
+def test_extra_context_counts_as_reading_all_fields(rf, state_manager):
+    registry.unregister("test_profile")
+    registry.register("test_profile", ProfileWithVisits)
+    assert render_profile(rf) == "<div>Alice (0)</div>"
+    assert get_dependencies(state_manager) is None
+    assert call_profile_command(rf, state_manager, "visit") == {PROFILE}
+
+
+def test_dependencies_are_not_recorded_by_default(rf, state_manager):
+    state_manager.track_render_dependencies = False
+    render_profile(rf)
+    assert get_dependencies(state_manager) is None
+
+
+def test_recording_context_dict():
+    context = RecordingContextDict(
+        {"name": "Alice", "visits": 0, "visits_str": "0", "title": "Profile"},
+        state_fields={"name", "visits"},
+        extra_keys={"visits_str"},
+    )
+    assert context["name"] == "Alice"
+    assert context.get("title") == "Profile"
+    assert context.read_fields == {"name"}
+    assert context["visits_str"] == "0"
+    assert context.read_fields == {"name", ALL_FIELDS}
+
+
+def test_iterating_over_recording_context_dict_reads_all_fields():
+    context = RecordingContextDict({"name": "Alice"}, {"name"}, set())
+    assert dict(context) == {"name": "Alice"}
+    assert ALL_FIELDS in context.read_fields
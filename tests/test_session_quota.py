@@ -0,0 +1,122 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from livecomponents.exceptions import SessionQuotaExceeded
+from livecomponents.manager.manager import StateManager
+from livecomponents.manager.serializers import IStateSerializer
+from livecomponents.manager.stores import (
+    CircuitBreakerStateStore,
+    MemoryStateStore,
+    RedisStateStore,
+)
+from livecomponents.types import StateAddress
+
+TABLE = StateAddress(session_id="session_id", component_id="|table:0")
+ROW_1 = TABLE | ("row", "1")
+ROW_2 = TABLE | ("row", "2")
+
+
+class BytesSerializer(IStateSerializer):
+    def serialize(self, state) -> bytes:
+        return state
+
+    def deserialize(self, raw_state: bytes):
+        return raw_state
+
+
+def make_state_manager(policy: str, store=None) -> StateManager:
+    return StateManager(
+        serializer=BytesSerializer(),
+        store=store or MemoryStateStore(),
+        session_quota=100,
+        session_quota_policy=policy,
+    )
+
+
+def test_memory_store_tracks_usage_in_save_order():
+    store = MemoryStateStore()
+    store.save_state(ROW_1, b"x" * 10)
+    store.save_component_template(TABLE, b"x" * 20)
+    store.save_state(TABLE, b"x" * 30)
+    store.save_state(ROW_1, b"x" * 5)
+
+    assert list(store.get_session_usage("session_id").items()) == [
+        (("templates", "|table:0"), 20),
+        (("states", "|table:0"), 30),
+        (("states", "|table:0|row:1"), 5),
+    ]
+
+
+def test_redis_store_tracks_usage(redis_node_urls):
+    store = RedisStateStore(redis_url=redis_node_urls[0], track_usage=True)
+    store.clear_all_sessions()
+    store.save_state(ROW_1, b"x" * 10)
+    store.save_component_template(TABLE, b"x" * 20)
+    store.save_context(TABLE, b"x" * 30)
+    store.delete_components("session_id", ["|table:0|row:1"])
+
+    assert store.get_session_usage("session_id") == {
+        ("templates", "|table:0"): 20,
+        ("contexts", "|table:0"): 30,
+    }
+
+
+def test_quota_requires_store_that_tracks_usage():
+    with pytest.raises(ImproperlyConfigured):
+        make_state_manager("log", store=RedisStateStore(track_usage=False))
+    with pytest.raises(ImproperlyConfigured):
+        make_state_manager("log", store=CircuitBreakerStateStore(RedisStateStore()))
+
+    store = CircuitBreakerStateStore(RedisStateStore(track_usage=True))
+    assert make_state_manager("log", store=store).session_quota == 100
+
+
+def test_get_session_size():
+    state_manager = make_state_manager("log")
+    state_manager.set_component_state(TABLE, b"x" * 30)
+    state_manager.store.save_context(TABLE, b"x" * 20)
+    assert state_manager.get_session_size("session_id") == 50
+
+
+def test_replacing_state_counts_only_new_size():
+    state_manager = make_state_manager("reject")
+    state_manager.set_component_state(TABLE, b"x" * 80)
+    with state_manager.interaction():
+        state_manager.set_component_state(TABLE, b"x" * 90)
+    assert state_manager.get_session_size("session_id") == 90
+
+
+def test_reject_policy_rejects_commands_over_quota():
+    state_manager = make_state_manager("reject")
+    state_manager.set_component_state(TABLE, b"x" * 80)
+    with state_manager.interaction(), pytest.raises(SessionQuotaExceeded):
+        state_manager.set_component_state(ROW_1, b"x" * 30)
+    assert state_manager.get_component_state(ROW_1) is None
+
+
+def test_reject_policy_only_logs_outside_of_commands():
+    state_manager = make_state_manager("reject")
+    state_manager.set_component_state(TABLE, b"x" * 80)
+    state_manager.set_component_state(ROW_1, b"x" * 30)
+    assert state_manager.get_session_size("session_id") == 110
+
+
+def test_evict_policy_deletes_least_recently_saved_components():
+    state_manager = make_state_manager("evict")
+    state_manager.set_component_state(TABLE, b"x" * 10)
+    state_manager.set_component_state(ROW_1, b"x" * 40)
+    state_manager.set_component_state(ROW_2, b"x" * 40)
+    state_manager.set_component_state(ROW_2 | ("cell", "0"), b"x" * 40)
+
+    # The table is the oldest, but it's an ancestor of the saved component.
+    assert state_manager.store.get_component_ids("session_id") == {
+        "|table:0",
+        "|table:0|row:2",
+        "|table:0|row:2|cell:0",
+    }
+
+
+def test_log_policy_saves_state_over_quota():
+    state_manager = make_state_manager("log")
+    state_manager.set_component_state(TABLE, b"x" * 200)
+    assert state_manager.get_component_state(TABLE) == b"x" * 200
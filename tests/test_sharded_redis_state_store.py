@@ -0,0 +1,97 @@
+from livecomponents.manager.stores import ConsistentHashRing, ShardedRedisStateStore
+from livecomponents.types import StateAddress
+
+SESSION_IDS = [f"session-{i}" for i in range(1000)]
+
+
+def test_hash_ring_spreads_keys_across_nodes():
+    ring = ConsistentHashRing(["a", "b", "c"])
+    counts = {"a": 0, "b": 0, "c": 0}
+    for session_id in SESSION_IDS:
+        counts[ring.get_node(session_id)] += 1
+    assert all(count > 200 for count in counts.values())
+
+
+def test_hash_ring_adding_node_moves_keys_only_to_new_node():
+    ring = ConsistentHashRing(["a", "b", "c"])
+    before = {session_id: ring.get_node(session_id) for session_id in SESSION_IDS}
+    ring.add_node("d")
+    after = {session_id: ring.get_node(session_id) for session_id in SESSION_IDS}
+
+    moved = [key for key in SESSION_IDS if before[key] != after[key]]
+    assert all(after[key] == "d" for key in moved)
+    # About 1/4 of the keys move to the new node
+    assert 150 < len(moved) < 350
+
+
+def test_hash_ring_removing_node_restores_previous_mapping():
+    ring = ConsistentHashRing(["a", "b", "c"])
+    before = {session_id: ring.get_node(session_id) for session_id in SESSION_IDS}
+    ring.add_node("d")
+    ring.remove_node("d")
+    assert sorted(ring.nodes) == ["a", "b", "c"]
+    assert {key: ring.get_node(key) for key in SESSION_IDS} == before
+
+
+def test_sharded_store_keeps_session_keys_on_one_node(sharded_redis_state_store):
+    store = sharded_redis_state_store
+    state_addr = StateAddress(session_id="session-1", component_id="|root:0")
+    store.save_state(state_addr, b"state")
+    store.save_context(state_addr, b"context")
+    store.save_component_template(state_addr, b"<div></div>")
+
+    client = store._get_session_client("session-1")
+    assert client.exists(store._get_key_name(store.key_prefix, "session-1"))
+    assert client.exists(store._get_key_name(store.context_prefix, "session-1"))
+    assert client.exists(store._get_key_name(store.templates_prefix, "session-1"))
+
+    assert store.session_exists("session-1")
+    assert store.restore_state(state_addr) == b"state"
+    assert store.restore_context(state_addr) == b"context"
+    assert store.restore_component_template(state_addr) == b"<div></div>"
+
+
+def test_sharded_store_spreads_sessions_across_nodes(sharded_redis_state_store):
+    store = sharded_redis_state_store
+    for session_id in SESSION_IDS[:50]:
+        state_addr = StateAddress(session_id=session_id, component_id="|root:0")
+        store.save_state(state_addr, b"state")
+    assert all(client.dbsize() > 0 for client in store.clients.values())
+
+
+def test_sharded_store_adding_node_keeps_unmoved_sessions(sharded_redis_state_store):
+    redis_node_urls = list(sharded_redis_state_store.clients)
+    store = ShardedRedisStateStore(redis_urls=redis_node_urls[:2])
+    for session_id in SESSION_IDS[:100]:
+        state_addr = StateAddress(session_id=session_id, component_id="|root:0")
+        store.save_state(state_addr, b"state")
+        store.save_component_template(state_addr, b"<div></div>")
+
+    bigger_store = sharded_redis_state_store
+    moved = [
+        session_id
+        for session_id in SESSION_IDS[:100]
+        if bigger_store.ring.get_node(session_id) == redis_node_urls[2]
+    ]
+    assert moved
+    for session_id in SESSION_IDS[:100]:
+        state_addr = StateAddress(session_id=session_id, component_id="|root:0")
+        if session_id in moved:
+            assert not bigger_store.session_exists(session_id)
+        else:
+            assert bigger_store.restore_state(state_addr) == b"state"
+            # Template blobs are found even if their node changed
+            assert bigger_store.restore_component_template(state_addr) == b"<div></div>"
+
+
+def test_sharded_store_clears_sessions_on_their_nodes(sharded_redis_state_store):
+    store = sharded_redis_state_store
+    for session_id in SESSION_IDS[:20]:
+        state_addr = StateAddress(session_id=session_id, component_id="|root:0")
+        store.save_state(state_addr, b"state")
+
+    store.clear_sessions(SESSION_IDS[:20])
+    for session_id in SESSION_IDS[:20]:
+        key_name = store._get_key_name(store.key_prefix, session_id)
+        ttl = store._get_session_client(session_id).ttl(key_name)
+        assert 0 < ttl <= store.ttl_gc.total_seconds()
@@ -0,0 +1,61 @@
+import datetime
+import multiprocessing
+import os
+
+from livecomponents.manager.stores import SharedMemoryStateStore
+from livecomponents.types import StateAddress
+
+STATE_ADDR = StateAddress(session_id="session_id", component_id="|root:0")
+
+
+def test_session_id_is_not_used_in_paths(shared_memory_state_store):
+    state_addr = StateAddress(session_id="../../etc", component_id="|root:0")
+    shared_memory_state_store.save_state(state_addr, b"state")
+    assert shared_memory_state_store.restore_state(state_addr) == b"state"
+    assert sorted(os.listdir(shared_memory_state_store.directory)) == [
+        "sessions",
+        "template_cache",
+    ]
+
+
+def test_templates_are_stored_once(shared_memory_state_store):
+    store = shared_memory_state_store
+    for component_id in ["|a:0", "|b:0"]:
+        state_addr = StateAddress(session_id="session_id", component_id=component_id)
+        store.save_component_template(state_addr, b"<div></div>")
+    assert len(os.listdir(store._template_cache_dir)) == 1
+
+
+def test_collect_garbage_deletes_expired_sessions(tmp_path):
+    store = SharedMemoryStateStore(
+        directory=str(tmp_path), ttl_gc=datetime.timedelta(0)
+    )
+    store.save_state(STATE_ADDR, b"state")
+    store.save_state(StateAddress(session_id="other", component_id="|a:0"), b"")
+    store.clear_session("session_id")
+    store.collect_garbage()
+    assert list(store.get_session_ids()) == ["other"]
+    assert len(os.listdir(store._sessions_dir)) == 1
+
+
+def write_state(directory: str, session_id: str):
+    store = SharedMemoryStateStore(directory=directory)
+    for i in range(50):
+        state_addr = StateAddress(session_id=session_id, component_id=f"|c:{i}")
+        store.save_state(state_addr, f"{session_id}-{i}".encode())
+
+
+def test_state_is_shared_between_processes(tmp_path):
+    processes = [
+        multiprocessing.Process(target=write_state, args=(str(tmp_path), f"s{i}"))
+        for i in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    store = SharedMemoryStateStore(directory=str(tmp_path))
+    assert sorted(store.get_session_ids()) == ["s0", "s1", "s2", "s3"]
+    state_addr = StateAddress(session_id="s2", component_id="|c:49")
+    assert store.restore_state(state_addr) == b"s2-49"
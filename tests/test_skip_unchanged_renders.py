@@ -0,0 +1,80 @@
+import pytest
+from django.test import RequestFactory
+from django_components.component_registry import registry
+
+from livecomponents.component import LiveComponent, command
+from livecomponents.manager.execution_results import ComponentDirty, ExecutionResults
+from livecomponents.manager.manager import StateManager
+from livecomponents.manager.serializers import PickleStateSerializer
+from livecomponents.manager.stores import MemoryStateStore
+from livecomponents.types import StateAddress
+
+COUNTER = StateAddress(session_id="session_id", component_id="|test_counter:0")
+
+
+class Counter(LiveComponent):
+    def init_state(self, context):
+        return {"value": 0}
+
+    @command
+    def set_value(self, call_context, value: int):
+        call_context.state["value"] = value
+
+    @command
+    def refresh(self, call_context):
+        return ComponentDirty()
+
+
+def get_dirty_components(state_manager, command_name, **kwargs):
+    call_context = state_manager.call_component_command(
+        RequestFactory().post("/"), COUNTER, command_name, kwargs
+    )
+    return call_context.execution_results.dirty_components
+
+
+@pytest.fixture
+def state_manager():
+    registry.register("test_counter", Counter)
+    state_manager = StateManager(
+        serializer=PickleStateSerializer(),
+        store=MemoryStateStore(),
+        skip_unchanged_renders=True,
+    )
+    state_manager.set_component_state(COUNTER, {"value": 0})
+    yield state_manager
+    registry.unregister("test_counter")
+
+
+def test_changed_state_marks_component_dirty(state_manager):
+    assert get_dirty_components(state_manager, "set_value", value=1) == {COUNTER}
+    assert state_manager.get_component_state(COUNTER) == {"value": 1}
+
+
+def test_unchanged_state_does_not_mark_component_dirty(state_manager):
+    assert get_dirty_components(state_manager, "set_value", value=0) == set()
+
+
+def test_explicit_component_dirty_is_kept(state_manager):
+    assert get_dirty_components(state_manager, "refresh") == {COUNTER}
+
+
+def test_option_is_off_by_default(state_manager):
+    state_manager.skip_unchanged_renders = False
+    assert get_dirty_components(state_manager, "set_value", value=0) == {COUNTER}
+
+
+def test_process_returned_value_with_unchanged_state():
+    results = ExecutionResults()
+    results.process_returned_value(COUNTER, None, state_changed=False)
+    assert results.dirty_components == set()
+    results.process_returned_value(COUNTER, ComponentDirty(), state_changed=False)
+    assert results.dirty_components == {COUNTER}
+
+
+def test_state_fingerprint(state_manager):
+    assert state_manager.get_state_fingerprint(
+        {"value": 1}
+    ) == state_manager.get_state_fingerprint({"value": 1})
+    assert state_manager.get_state_fingerprint(
+        {"value": 1}
+    ) != state_manager.get_state_fingerprint({"value": 2})
@@ -0,0 +1,88 @@
+import datetime
+import multiprocessing
+import threading
+
+import pytest
+
+from livecomponents.manager.stores import SQLiteStateStore
+from livecomponents.types import StateAddress
+
+STATE_ADDR = StateAddress(session_id="session_id", component_id="|root:0")
+
+
+def test_templates_are_stored_once(sqlite_state_store):
+    store = sqlite_state_store
+    for component_id in ["|a:0", "|b:0"]:
+        state_addr = StateAddress(session_id="session_id", component_id=component_id)
+        store.save_component_template(state_addr, b"<div></div>")
+    connection = store._get_connection()
+    (count,) = connection.execute("SELECT COUNT(*) FROM lc_template_cache").fetchone()
+    assert count == 1
+
+
+def test_collect_garbage_deletes_expired_sessions(sqlite_state_store):
+    store = sqlite_state_store
+    store.ttl_gc = datetime.timedelta(0)
+    store.save_state(STATE_ADDR, b"state")
+    store.save_state(StateAddress(session_id="other", component_id="|a:0"), b"")
+    store.clear_session("session_id")
+    store.collect_garbage()
+
+    connection = store._get_connection()
+    rows = connection.execute("SELECT DISTINCT session_id FROM lc_values").fetchall()
+    assert rows == [("other",)]
+
+
+def test_write_batch_saves_writes_in_one_transaction(sqlite_state_store):
+    store = sqlite_state_store
+    statements = []
+    store._get_connection().set_trace_callback(statements.append)
+    with store.interaction():
+        store.save_state(STATE_ADDR, b"state")
+        store.save_context(STATE_ADDR, b"context")
+        store.save_component_template(STATE_ADDR, b"<div></div>")
+        # Reads see the buffered writes.
+        assert store.session_exists("session_id")
+        assert store.component_initialized(STATE_ADDR)
+        assert store.restore_state(STATE_ADDR) == b"state"
+        assert store.restore_component_template(STATE_ADDR) == b"<div></div>"
+        assert statements == []
+
+    assert statements.count("BEGIN IMMEDIATE") == 1
+    assert store.restore_context(STATE_ADDR) == b"context"
+    assert store.restore_component_template(STATE_ADDR) == b"<div></div>"
+
+
+def test_write_batch_saves_writes_if_block_raises(sqlite_state_store):
+    store = sqlite_state_store
+    with pytest.raises(ValueError):
+        with store.write_batch():
+            store.save_state(STATE_ADDR, b"state")
+            raise ValueError
+    assert store.restore_state(STATE_ADDR) == b"state"
+
+
+def test_threads_use_own_connections(sqlite_state_store):
+    connections = []
+    thread = threading.Thread(
+        target=lambda: connections.append(sqlite_state_store._get_connection())
+    )
+    thread.start()
+    thread.join()
+    assert connections[0] is not sqlite_state_store._get_connection()
+
+
+def _save_state_in_child(path):
+    store = SQLiteStateStore(path=path, gc_interval=None)
+    store.save_state(STATE_ADDR, b"from child")
+
+
+def test_sessions_are_shared_between_processes(tmp_path):
+    path = str(tmp_path / "lc.sqlite3")
+    store = SQLiteStateStore(path=path, gc_interval=None)
+    process = multiprocessing.get_context("spawn").Process(
+        target=_save_state_in_child, args=(path,)
+    )
+    process.start()
+    process.join()
+    assert store.restore_state(STATE_ADDR) == b"from child"
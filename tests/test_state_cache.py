@@ -0,0 +1,85 @@
+import pytest
+
+from livecomponents.manager.manager import StateManager
+from livecomponents.manager.serializers import PickleStateSerializer
+from livecomponents.manager.stores import MemoryStateStore
+from livecomponents.types import StateAddress
+
+TABLE = StateAddress(session_id="session_id", component_id="|table:0")
+ROW = TABLE | ("row", "1")
+
+
+class CountingStore(MemoryStateStore):
+    def __init__(self):
+        super().__init__()
+        self.restored = 0
+        self.saved = 0
+
+    def restore_state(self, state_addr):
+        self.restored += 1
+        return super().restore_state(state_addr)
+
+    def save_state(self, state_addr, raw_state):
+        self.saved += 1
+        return super().save_state(state_addr, raw_state)
+
+
+@pytest.fixture
+def state_manager():
+    state_manager = StateManager(
+        serializer=PickleStateSerializer(), store=CountingStore()
+    )
+    state_manager.set_component_state(TABLE, {"count": 0})
+    state_manager.store.saved = 0
+    return state_manager
+
+
+def test_state_cache_reads_and_writes_states_once(state_manager):
+    with state_manager.state_cache():
+        for _ in range(3):
+            state = state_manager.get_component_state(TABLE)
+            state["count"] += 1
+            state_manager.set_component_state(TABLE, state)
+        assert state_manager.store.saved == 0
+
+    assert state_manager.store.restored == 1
+    assert state_manager.store.saved == 1
+    assert state_manager.get_component_state(TABLE) == {"count": 3}
+
+
+def test_state_cache_saves_states_as_of_the_last_save(state_manager):
+    with state_manager.state_cache():
+        state = state_manager.get_component_state(TABLE)
+        state["count"] = 1
+        state_manager.set_component_state(TABLE, state)
+        state["count"] = 2
+
+    assert state_manager.get_component_state(TABLE) == {"count": 1}
+
+
+def test_state_cache_discards_states_if_block_raises(state_manager):
+    with pytest.raises(RuntimeError):
+        with state_manager.state_cache():
+            state_manager.set_component_state(TABLE, {"count": 1})
+            state_manager.set_component_state(ROW, {"count": 1})
+            raise RuntimeError()
+
+    assert state_manager.store.saved == 0
+    assert state_manager.get_component_state(TABLE) == {"count": 0}
+    assert state_manager.get_component_state(ROW) is None
+
+
+def test_state_cache_forgets_deleted_components(state_manager):
+    with state_manager.state_cache():
+        state_manager.set_component_state(ROW, {"count": 0})
+        assert state_manager.component_initialized(ROW)
+        state_manager.delete_components("session_id", [ROW.component_id])
+
+    assert state_manager.get_component_state(ROW) is None
+
+
+def test_state_cache_is_not_shared_between_state_managers(state_manager):
+    other = StateManager(serializer=PickleStateSerializer(), store=MemoryStateStore())
+    with state_manager.state_cache():
+        other.set_component_state(TABLE, {"count": 5})
+        assert other.store.restore_state(TABLE) is not None
@@ -0,0 +1,96 @@
+"""Behavior that every state store must share.
+
+Store-specific behavior is tested in the test module of the store.
+"""
+import datetime
+
+import pytest
+
+from livecomponents.types import StateAddress
+
+STATE_ADDR = StateAddress(session_id="session_id", component_id="|root:0")
+
+
+@pytest.fixture(
+    params=[
+        "memory_state_store",
+        "shared_memory_state_store",
+        "sqlite_state_store",
+        "django_cache_state_store",
+        "redis_state_store",
+    ]
+)
+def state_store(request):
+    store = request.getfixturevalue(request.param)
+    store.clear_all_sessions()
+    return store
+
+
+@pytest.fixture(
+    params=[
+        "memory_state_store",
+        "shared_memory_state_store",
+        "sqlite_state_store",
+        "redis_state_store",
+    ]
+)
+def listing_state_store(request):
+    """Stores that can list their sessions."""
+    store = request.getfixturevalue(request.param)
+    store.clear_all_sessions()
+    return store
+
+
+def test_save_and_restore(state_store):
+    store = state_store
+    assert not store.session_exists("session_id")
+    store.save_state(STATE_ADDR, b"state")
+    store.save_context(STATE_ADDR, b"context")
+    store.save_component_template(STATE_ADDR, b"<div></div>")
+
+    assert store.session_exists("session_id")
+    assert store.component_initialized(STATE_ADDR)
+    assert store.restore_state(STATE_ADDR) == b"state"
+    assert store.restore_context(STATE_ADDR) == b"context"
+    assert store.restore_component_template(STATE_ADDR) == b"<div></div>"
+    assert store.get_component_ids("session_id") == {"|root:0"}
+
+
+def test_get_session_ids(listing_state_store):
+    listing_state_store.save_state(STATE_ADDR, b"state")
+    assert list(listing_state_store.get_session_ids()) == ["session_id"]
+
+
+def test_clear_session_keeps_session_for_ttl_gc(state_store):
+    store = state_store
+    store.save_state(STATE_ADDR, b"state")
+    store.clear_session("session_id")
+    assert store.session_exists("session_id")
+    assert store.restore_state(STATE_ADDR) == b"state"
+
+    store.ttl_gc = datetime.timedelta(seconds=-1)
+    store.clear_session("session_id")
+    assert not store.session_exists("session_id")
+    assert store.restore_state(STATE_ADDR) is None
+
+
+def test_expired_session_starts_empty(state_store):
+    store = state_store
+    store.ttl_gc = datetime.timedelta(seconds=-1)
+    store.save_state(STATE_ADDR, b"state")
+    store.clear_session("session_id")
+    store.save_context(STATE_ADDR, b"context")
+
+    assert store.restore_state(STATE_ADDR) is None
+    assert store.restore_context(STATE_ADDR) == b"context"
+
+
+def test_delete_components(state_store):
+    store = state_store
+    child = StateAddress(session_id="session_id", component_id="|root:0|a:0")
+    store.save_state(STATE_ADDR, b"state")
+    store.save_state(child, b"state")
+    store.delete_components("session_id", ["|root:0|a:0"])
+
+    assert store.get_component_ids("session_id") == {"|root:0"}
+    assert store.restore_state(child) is None
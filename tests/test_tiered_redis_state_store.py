@@ -0,0 +1,92 @@
+import pytest
+
+from livecomponents.manager.stores import TieredRedisStateStore
+from livecomponents.types import StateAddress
+
+
+@pytest.fixture
+def tiered_redis_state_store(redis_node_urls):
+    store = TieredRedisStateStore(redis_url=redis_node_urls[0])
+    store.clear_all_sessions()
+    return store
+
+
+def test_tiered_store_serves_own_writes_from_cache(tiered_redis_state_store):
+    store = tiered_redis_state_store
+    state_addr = StateAddress(session_id="session-1", component_id="|root:0")
+    store.save_state(state_addr, b"state")
+    store.save_context(state_addr, b"context")
+
+    assert store.restore_state(state_addr) == b"state"
+    assert store.restore_context(state_addr) == b"context"
+    assert store.metrics["l1_hits"] == 2
+    assert store.metrics["l1_misses"] == 0
+
+
+def test_tiered_store_invalidates_cache_after_foreign_write(
+    tiered_redis_state_store, redis_node_urls
+):
+    store = tiered_redis_state_store
+    other_store = TieredRedisStateStore(redis_url=redis_node_urls[0])
+    state_addr = StateAddress(session_id="session-1", component_id="|root:0")
+    store.save_state(state_addr, b"old")
+    other_store.save_state(state_addr, b"new")
+
+    assert store.restore_state(state_addr) == b"new"
+    assert store.metrics["l1_misses"] == 1
+    assert store.restore_state(state_addr) == b"new"
+    assert store.metrics["l1_hits"] == 1
+
+
+def test_tiered_store_caches_values_read_from_redis(
+    tiered_redis_state_store, redis_node_urls
+):
+    store = tiered_redis_state_store
+    other_store = TieredRedisStateStore(redis_url=redis_node_urls[0])
+    state_addr = StateAddress(session_id="session-1", component_id="|root:0")
+    other_store.save_state(state_addr, b"state")
+
+    assert store.restore_state(state_addr) == b"state"
+    assert store.restore_state(state_addr) == b"state"
+    assert store.metrics["l1_misses"] == 1
+    assert store.metrics["l1_hits"] == 1
+
+
+def test_tiered_store_serves_template_blobs_from_cache(tiered_redis_state_store):
+    store = tiered_redis_state_store
+    state_addr = StateAddress(session_id="session-1", component_id="|root:0")
+    store.save_component_template(state_addr, b"<div></div>")
+    store.client.delete(
+        f"{store.template_cache_prefix}{store._get_hashed_value(b'<div></div>')}"
+    )
+
+    assert store.restore_component_template(state_addr) == b"<div></div>"
+
+
+def test_tiered_store_forgets_deleted_components(tiered_redis_state_store):
+    store = tiered_redis_state_store
+    state_addr = StateAddress(session_id="session-1", component_id="|root:0")
+    store.save_state(state_addr, b"state")
+    store.delete_components("session-1", ["|root:0"])
+
+    assert store.restore_state(state_addr) is None
+
+
+def test_tiered_store_delete_components_sets_version_ttl(tiered_redis_state_store):
+    store = tiered_redis_state_store
+    store.delete_components("session-1", ["|root:0"])
+
+    version_key = store._get_key_name(store.version_prefix, "session-1")
+    assert 0 < store.client.ttl(version_key) <= store.ttl.total_seconds()
+
+
+def test_tiered_store_evicts_least_recently_used_sessions(redis_node_urls):
+    store = TieredRedisStateStore(redis_url=redis_node_urls[0], l1_max_sessions=1)
+    store.clear_all_sessions()
+    first = StateAddress(session_id="session-1", component_id="|root:0")
+    second = StateAddress(session_id="session-2", component_id="|root:0")
+    store.save_state(first, b"first")
+    store.save_state(second, b"second")
+
+    assert store.restore_state(first) == b"first"
+    assert store.metrics["l1_misses"] == 1
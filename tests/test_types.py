@@ -1,4 +1,7 @@
+import pickle
+
 import pytest
+from pydantic import BaseModel
 
 from livecomponents.types import ComponentId, StateAddress
 
@@ -49,3 +52,84 @@ def test_state_address_get_parent():
     assert state_address.get_parent() == StateAddress(
         session_id="session_id", component_id="|root:0|a:1|b:2"
     )
+
+
+def test_state_address_get_parent_of_root_component():
+    state_address = StateAddress(session_id="session_id", component_id="|root:0")
+    assert state_address.get_parent() is None
+
+
+def test_state_address_get_parent_is_memoized():
+    state_address = StateAddress(session_id="session_id", component_id="|root:0|a:1")
+    assert state_address.get_parent() is state_address.get_parent()
+
+
+def test_state_address_get_component_name():
+    state_address = StateAddress(session_id="session_id", component_id="|root:0|a:1")
+    assert state_address.get_component_name() == "a"
+
+
+def test_state_address_hash_and_equality():
+    first = StateAddress(session_id="session_id", component_id="|root:0")
+    second = StateAddress(session_id="session_id", component_id=ComponentId("|root:0"))
+    assert first == second
+    assert len({first, second}) == 1
+    assert first != StateAddress(session_id="other", component_id="|root:0")
+
+
+def test_state_address_is_immutable():
+    state_address = StateAddress(session_id="session_id", component_id="|root:0")
+    with pytest.raises(AttributeError):
+        state_address.session_id = "other"  # type: ignore[misc]
+
+
+def test_state_address_model_copy_and_dump():
+    state_address = StateAddress(session_id="session_id", component_id="|root:0")
+    copied = state_address.model_copy(update={"component_id": "|root:0|a:0"})
+    assert isinstance(copied.component_id, ComponentId)
+    assert copied.model_dump() == {
+        "session_id": "session_id",
+        "component_id": "|root:0|a:0",
+    }
+
+
+def test_state_address_pickle_roundtrip():
+    state_address = StateAddress(session_id="session_id", component_id="|root:0|a:1")
+    state_address.get_parent()
+    restored = pickle.loads(pickle.dumps(state_address))
+    assert restored == state_address
+    assert isinstance(restored.component_id, ComponentId)
+
+
+# pickle.dumps(StateAddress(...), protocol=5) of the previous Pydantic model
+PYDANTIC_STATE_ADDRESS_PICKLE = (
+    b"\x80\x05\x95\xd4\x00\x00\x00\x00\x00\x00\x00\x8c\x14livecomponents.types"
+    b"\x94\x8c\x0cStateAddress\x94\x93\x94)\x81\x94}\x94(\x8c\x08__dict__\x94}"
+    b"\x94(\x8c\nsession_id\x94h\x07\x8c\x0ccomponent_id\x94h\x00\x8c\x0bComponentId"
+    b"\x94\x93\x94\x8c\r|root:0|row:1\x94\x85\x94\x81\x94u\x8c\x12__pydantic_extra__"
+    b"\x94N\x8c\x17__pydantic_fields_set__\x94\x8f\x94(h\x07h\x08\x90\x8c\x14"
+    b"__pydantic_private__\x94Nub."
+)
+
+
+def test_state_address_unpickles_pickles_of_pydantic_model():
+    restored = pickle.loads(PYDANTIC_STATE_ADDRESS_PICKLE)
+    assert restored == StateAddress(
+        session_id="session_id", component_id="|root:0|row:1"
+    )
+    assert isinstance(restored.component_id, ComponentId)
+    assert restored.get_parent() == StateAddress(
+        session_id="session_id", component_id="|root:0"
+    )
+    assert pickle.loads(pickle.dumps(restored)) == restored
+
+
+def test_state_address_as_pydantic_field():
+    class Model(BaseModel):
+        state_address: StateAddress
+
+    model = Model(state_address={"session_id": "s", "component_id": "|root:0"})
+    assert model.state_address == StateAddress(session_id="s", component_id="|root:0")
+    assert model.model_dump() == {
+        "state_address": {"session_id": "s", "component_id": "|root:0"}
+    }
@@ -1,11 +1,28 @@
 import json
 from urllib.parse import urlencode
 
+from django.template import Context, Template
 from django.urls import reverse
+from django_components.component_registry import registry
 
+from livecomponents.component import LiveComponent, command
+from livecomponents.types import StateAddress
 from livecomponents.views import parse_body
 
 
+class Unchanged(LiveComponent):
+    def init_state(self, context):
+        return {"value": 0}
+
+    @command
+    def noop(self, call_context):
+        pass
+
+    @command
+    def nothing_dirty(self, call_context):
+        return []
+
+
 def test_missing_session_returns_410_gone(client, state_manager):
     url = reverse("livecomponents:call-command")
     kwargs = {
@@ -43,3 +60,240 @@ def test_parse_body_understands_urlencoded_form_data(rf):
         content_type="application/x-www-form-urlencoded",
     )
     assert parse_body(request) == {"foo": "bar"}
+
+
+def test_clear_session_accepts_several_session_ids(client, state_manager):
+    for session_id in ["a", "b", "c"]:
+        state_addr = StateAddress(session_id=session_id, component_id="|root:0")
+        state_manager.store.save_state(state_addr, b"state")
+    url = f"{reverse('livecomponents:clear-session')}?session_id=a"
+
+    resp = client.post(
+        url,
+        data=urlencode([("session_id", "b"), ("session_id", "c")]),
+        content_type="application/x-www-form-urlencoded",
+    )
+    assert resp.status_code == 200
+    for session_id in ["a", "b", "c"]:
+        key_name = state_manager.store._get_key_name(
+            state_manager.store.key_prefix, session_id
+        )
+        ttl = state_manager.store.client.ttl(key_name)
+        assert ttl <= state_manager.store.ttl_gc.total_seconds()
+
+
+def test_clear_session_accepts_json_list(client, state_manager):
+    url = reverse("livecomponents:clear-session")
+    resp = client.post(
+        url, data={"session_id": ["a", "b"]}, content_type="application/json"
+    )
+    assert resp.status_code == 200
+
+
+def test_clear_session_limits_number_of_session_ids(client, state_manager, settings):
+    settings.LIVECOMPONENTS = {"max_cleared_sessions": 2}
+    url = reverse("livecomponents:clear-session")
+    resp = client.post(
+        url, data={"session_id": ["a", "b", "c"]}, content_type="application/json"
+    )
+    assert resp.status_code == 400
+
+
+def test_call_command_returns_400_for_invalid_arguments(client, state_manager):
+    state_addr = StateAddress(session_id="session_id", component_id="|clickcounter:0")
+    state_manager.store.save_state(state_addr, b"state")
+    url = reverse("livecomponents:call-command")
+    kwargs = {
+        "session_id": "session_id",
+        "component_id": "|clickcounter:0",
+        "command_name": "increment",
+    }
+
+    resp = client.post(
+        f"{url}?{urlencode(kwargs)}",
+        data=urlencode({"value": "many", "unknown": "1"}),
+        content_type="application/x-www-form-urlencoded",
+    )
+    assert resp.status_code == 400
+    assert resp.json() == {
+        "error": "invalid_arguments",
+        "command": "increment",
+        "errors": [
+            {
+                "type": "int_parsing",
+                "loc": ["value"],
+                "msg": "Input should be a valid integer, "
+                "unable to parse string as an integer",
+            },
+            {
+                "type": "extra_forbidden",
+                "loc": ["unknown"],
+                "msg": "Extra inputs are not permitted",
+            },
+        ],
+    }
+
+
+def render_simplecounter(rf, session_id: str):
+    template = Template('{% load livecomponents %}{% livecomponent "simplecounter" %}')
+    context = {"request": rf.get("/"), "LIVECOMPONENTS_SESSION_ID": session_id}
+    return template.render(Context(context))
+
+
+def call_commands_url(session_id: str) -> str:
+    url = reverse("livecomponents:call-commands")
+    return f"{url}?{urlencode({'session_id': session_id})}"
+
+
+def test_call_commands_runs_commands_in_order_and_renders_once(
+    client, rf, state_manager
+):
+    render_simplecounter(rf, "session_id")
+    commands = [
+        {"component_id": "|simplecounter:0", "command_name": name}
+        for name in ["increment", "increment", "decrement", "increment"]
+    ]
+
+    resp = client.post(
+        call_commands_url("session_id"),
+        data={"commands": commands},
+        content_type="application/json",
+    )
+    assert resp.status_code == 200
+    assert resp.content.decode().count("Count: 2") == 1
+    state_addr = StateAddress(session_id="session_id", component_id="|simplecounter:0")
+    assert state_manager.get_component_state(state_addr).count == 2
+
+
+def test_call_command_returns_204_when_state_is_unchanged(
+    client, state_manager, monkeypatch
+):
+    monkeypatch.setattr(state_manager, "skip_unchanged_renders", True)
+    registry.register("test_unchanged", Unchanged)
+    try:
+        state_addr = StateAddress(
+            session_id="session_id", component_id="|test_unchanged:0"
+        )
+        state_manager.set_component_state(state_addr, {"value": 0})
+        url = reverse("livecomponents:call-command")
+        kwargs = {
+            "session_id": "session_id",
+            "component_id": "|test_unchanged:0",
+            "command_name": "noop",
+        }
+        resp = client.post(f"{url}?{urlencode(kwargs)}")
+    finally:
+        registry.unregister("test_unchanged")
+    assert resp.status_code == 204
+    assert resp.content == b""
+
+
+def test_commands_to_evicted_component_return_410_gone(client, rf, state_manager):
+    render_simplecounter(rf, "session_id")
+    other_addr = StateAddress(session_id="session_id", component_id="|root:0")
+    state_manager.store.save_state(other_addr, b"state")
+    # Evicted by the "evict" quota policy, while the session still exists
+    state_manager.store.delete_components("session_id", ["|simplecounter:0"])
+    url = reverse("livecomponents:call-command")
+    kwargs = {
+        "session_id": "session_id",
+        "component_id": "|simplecounter:0",
+        "command_name": "increment",
+    }
+
+    resp = client.post(f"{url}?{urlencode(kwargs)}")
+    assert resp.status_code == 410
+
+    commands = [{"component_id": "|simplecounter:0", "command_name": "increment"}]
+    resp = client.post(
+        call_commands_url("session_id"),
+        data={"commands": commands},
+        content_type="application/json",
+    )
+    assert resp.status_code == 410
+
+
+def test_call_command_returns_200_without_dirty_components_by_default(
+    client, state_manager
+):
+    assert not state_manager.skip_unchanged_renders
+    registry.register("test_unchanged", Unchanged)
+    try:
+        state_addr = StateAddress(
+            session_id="session_id", component_id="|test_unchanged:0"
+        )
+        state_manager.set_component_state(state_addr, {"value": 0})
+        url = reverse("livecomponents:call-command")
+        kwargs = {
+            "session_id": "session_id",
+            "component_id": "|test_unchanged:0",
+            "command_name": "nothing_dirty",
+        }
+        resp = client.post(f"{url}?{urlencode(kwargs)}")
+    finally:
+        registry.unregister("test_unchanged")
+    assert resp.status_code == 200
+    assert resp.content == b""
+
+
+def test_call_commands_rejects_the_batch_with_invalid_command(
+    client, rf, state_manager
+):
+    render_simplecounter(rf, "session_id")
+    commands = [
+        {"component_id": "|simplecounter:0", "command_name": "increment"},
+        {
+            "component_id": "|simplecounter:0",
+            "command_name": "increment",
+            "kwargs": {"x": 1},
+        },
+    ]
+
+    resp = client.post(
+        call_commands_url("session_id"),
+        data={"commands": commands},
+        content_type="application/json",
+    )
+    assert resp.status_code == 400
+    assert resp.json()["error"] == "invalid_arguments"
+    state_addr = StateAddress(session_id="session_id", component_id="|simplecounter:0")
+    assert state_manager.get_component_state(state_addr).count == 0
+
+
+def test_call_commands_doesnt_save_states_of_rejected_batch(client, rf, state_manager):
+    render_simplecounter(rf, "session_id")
+    commands = [
+        {"component_id": "|simplecounter:0", "command_name": "increment"},
+        {"component_id": "|simplecounter:1", "command_name": "increment"},
+    ]
+
+    resp = client.post(
+        call_commands_url("session_id"),
+        data={"commands": commands},
+        content_type="application/json",
+    )
+    assert resp.status_code == 410
+    state_addr = StateAddress(session_id="session_id", component_id="|simplecounter:0")
+    assert state_manager.get_component_state(state_addr).count == 0
+
+
+def test_call_commands_validates_request_body(client, state_manager, settings):
+    state_addr = StateAddress(session_id="session_id", component_id="|root:0")
+    state_manager.store.save_state(state_addr, b"state")
+
+    resp = client.post(
+        call_commands_url("session_id"),
+        data={"commands": [{"component_id": "|root:0"}]},
+        content_type="application/json",
+    )
+    assert resp.status_code == 400
+    assert resp.json()["errors"][0]["loc"] == ["commands", 0, "command_name"]
+
+    settings.LIVECOMPONENTS = {"max_batch_commands": 1}
+    command = {"component_id": "|root:0", "command_name": "x"}
+    resp = client.post(
+        call_commands_url("session_id"),
+        data={"commands": [command, command]},
+        content_type="application/json",
+    )
+    assert resp.status_code == 400